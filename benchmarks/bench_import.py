@@ -0,0 +1,114 @@
+"""
+Import-time benchmark of the Snail modules.
+
+Every sample imports the module in a fresh interpreter, so nothing is cached in sys.modules.
+Heavy optional dependencies that the import pulls in are listed, they should only be loaded on first use:
+
+    python benchmarks/bench_import.py --output benchmarks/baselines/import.json
+    python benchmarks/bench_import.py --compare benchmarks/baselines/import.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import statistics
+import subprocess
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ("snail.cot_dsgen", "snail.backends", "snail.batch")
+# Dependencies that are only needed by some methods, e.g. push_to_hf
+HEAVY_MODULES = ("google.genai", "datasets", "huggingface_hub", "pyarrow", "pandas")
+
+_SCRIPT = """
+import sys, json, time
+started = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - started
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def sample(module: str) -> Dict[str, Any]:
+    """Import `module` in a fresh interpreter and return the import time and the heavy modules it loaded."""
+    script = _SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    completed = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def run_module(module: str, repeats: int) -> Dict[str, Any]:
+    samples = [sample(module) for _ in range(repeats)]
+    seconds = [s["seconds"] for s in samples]
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(seconds) * 1000, 2),
+        "min_ms": round(min(seconds) * 1000, 2),
+        "max_ms": round(max(seconds) * 1000, 2),
+        "heavy_loaded": samples[-1]["loaded"],
+    }
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+    """Print the change against a baseline and return True if an import got slower by more than `threshold`."""
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path}, nothing to compare. Create it with --output {baseline_path}")
+        return False
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    baseline = {r["module"]: r for r in saved["results"]}
+    print(f"\nBaseline of {saved.get('created_at')} on {saved.get('machine')}, {saved.get('cpus')} CPUs, Python {saved.get('python')}")
+
+    regressed = False
+    print(f"\n{'module':<20}{'median ms':>12}{'baseline':>12}{'change':>9}")
+    for result in results:
+        base = baseline.get(result["module"])
+        if base is None or not base.get("median_ms"):
+            continue
+        change = result["median_ms"] / base["median_ms"] - 1
+        flag = ""
+        if change > threshold:
+            regressed = True
+            flag = "  REGRESSION"
+        print(f"{result['module']:<20}{result['median_ms']:>12.1f}{base['median_ms']:>12.1f}{change:>+9.1%}{flag}")
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modules", default=",".join(MODULES), help="Comma separated modules to import")
+    parser.add_argument("--repeats", type=int, default=10, help="Fresh interpreters per module")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare the results with this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.20, help="Import time increase reported as a regression")
+    args = parser.parse_args(argv)
+
+    results = []
+    for module in [module for module in args.modules.split(",") if module]:
+        result = run_module(module, args.repeats)
+        results.append(result)
+        print(f"{module:<20}{result['median_ms']:>10.1f} ms median  {result['min_ms']:.1f}-{result['max_ms']:.1f} ms"
+              f"  heavy modules loaded: {', '.join(result['heavy_loaded']) or 'none'}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "processor": platform.processor() or platform.machine(),
+                "cpus": os.cpu_count(),
+                "settings": vars(args),
+                "results": results,
+            }, f, indent=2)
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
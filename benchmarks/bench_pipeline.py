@@ -0,0 +1,275 @@
+"""
+Benchmarks of the Snail pipeline stages against the offline FakeBackend.
+
+Every (stage, size) pair runs in a fresh process so that its peak RSS is its own.
+Results are written as a JSON baseline that later runs can be compared against:
+
+    python benchmarks/bench_pipeline.py --sizes 10,1000,100000,1000000 --output benchmarks/baselines/main.json
+    python benchmarks/bench_pipeline.py --sizes 10,1000,100000,1000000 --compare benchmarks/baselines/main.json
+"""
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import platform
+import resource
+import tempfile
+import statistics
+import multiprocessing
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+STAGES = ("search", "extraction", "generation", "serialization", "push", "push_memory")
+
+
+class TimedBackend:
+    """Wraps a backend and records the latency of every request."""
+
+    def __init__(self, backend: Any) -> None:
+        self.backend = backend
+        self.latencies: List[float] = []
+
+    def generate(self, model: str, contents: Any, config: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return self.backend.generate(model, contents, config)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+    async def agenerate(self, model: str, contents: Any, config: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await self.backend.agenerate(model, contents, config)
+        finally:
+            self.latencies.append(time.perf_counter() - started)
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Return the q-th percentile (0-100) of the samples, 0 if there are none."""
+    if not samples:
+        return 0.0
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method='inclusive')[min(98, max(0, int(q) - 1))]
+
+
+def make_generator(size: int, args: argparse.Namespace, backend: Any = None) -> Any:
+    from snail.backends import FakeBackend
+    from snail.cot_dsgen import CoTDatasetGenerator
+
+    backend = backend or FakeBackend(seed=0, latency=args.latency, latency_distribution="constant",
+                                     output_tokens=args.output_tokens, listing_size=size)
+    return CoTDatasetGenerator(google_api_key=None, model_id="fake", role="mathematician",
+                               user_query=f"List {size} math problems", backend=backend,
+                               verbosity="quiet")
+
+
+def synthetic_instructions(size: int) -> List[str]:
+    return [f"**Problem {i}** Compute the sum of the first {i} odd numbers." for i in range(size)]
+
+
+def synthetic_records(size: int) -> List[Any]:
+    from snail.records import CoTRecord
+
+    output = "<thought>" + "reason " * 200 + "</thought>\n<answer>42</answer>"
+    return [CoTRecord(i, instruction, output, None) for i, instruction in enumerate(synthetic_instructions(size))]
+
+
+def run_stage(stage: str, size: int, args: argparse.Namespace, work_dir: str) -> Dict[str, Any]:
+    """Run one stage on `size` items and return its measurements (without peak RSS)."""
+    latencies: List[float] = []
+    bytes_written = 0
+
+    if stage in ("search", "extraction"):
+        snail = make_generator(size, args)
+        started = time.perf_counter()
+        listings = snail.searching()
+        if stage == "search":
+            latencies.append(time.perf_counter() - started)
+            for _ in range(args.repeats - 1):
+                started = time.perf_counter()
+                snail.searching()
+                latencies.append(time.perf_counter() - started)
+        else:
+            for _ in range(args.repeats):
+                started = time.perf_counter()
+                snail.extract_listings(listings)
+                latencies.append(time.perf_counter() - started)
+        items = size * args.repeats
+        seconds = sum(latencies)
+
+    elif stage == "generation":
+        from snail.backends import FakeBackend
+
+        backend = TimedBackend(FakeBackend(seed=0, latency=args.latency, latency_distribution="constant",
+                                           output_tokens=args.output_tokens))
+        snail = make_generator(size, args, backend=backend)
+        started = time.perf_counter()
+        items = sum(1 for _ in snail.iter_results(synthetic_instructions(size)))
+        seconds = time.perf_counter() - started
+        latencies = backend.latencies
+
+    elif stage == "serialization":
+        snail = make_generator(size, args)
+        records = synthetic_records(size)
+        os.chdir(work_dir)
+        started = time.perf_counter()
+        output_file, _ = snail.transform_alpaca_format(records)
+        seconds = time.perf_counter() - started
+        latencies.append(seconds)
+        bytes_written = os.path.getsize(output_file)
+        items = size
+
+    elif stage in ("push", "push_memory"):
+        # The upload needs the Hub, so this measures the local work of push_to_hf: building the dataset,
+        # from the serialised file ("push") or from the records in memory ("push_memory"),
+        # and encoding it as Parquet for the upload
+        os.environ["HF_DATASETS_CACHE"] = os.path.join(work_dir, "hf_cache")
+        import datasets  # noqa: F401, imported before the timer like in a warm process
+
+        snail = make_generator(size, args)
+        os.chdir(work_dir)
+        records = synthetic_records(size)
+        json_path = None
+        if stage == "push":
+            json_path, _ = snail.transform_alpaca_format(records, keep_data=False)
+            records = None
+        started = time.perf_counter()
+        dataset = snail._build_hf_dataset(json_path, records)
+        dataset = dataset["train"] if json_path else dataset
+        parquet_path = os.path.join(work_dir, "train.parquet")
+        dataset.to_parquet(parquet_path)
+        seconds = time.perf_counter() - started
+        latencies.append(seconds)
+        bytes_written = os.path.getsize(parquet_path)
+        items = size
+
+    else:
+        raise ValueError(f"Unknown stage '{stage}'")
+
+    return {
+        "stage": stage,
+        "size": size,
+        "items": items,
+        "seconds": round(seconds, 6),
+        "items_per_sec": round(items / seconds, 2) if seconds else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "bytes_written": bytes_written,
+    }
+
+
+def _child(stage: str, size: int, args: argparse.Namespace, results: Any) -> None:
+    logging.disable(logging.WARNING)
+    with tempfile.TemporaryDirectory() as work_dir:
+        try:
+            result = run_stage(stage, size, args, work_dir)
+        except Exception as e:
+            result = {"stage": stage, "size": size, "error": repr(e)}
+    # ru_maxrss is in KiB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    result["peak_rss_mb"] = round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    results.put(result)
+
+
+def run_isolated(stage: str, size: int, args: argparse.Namespace) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    process = context.Process(target=_child, args=(stage, size, args, results))
+    process.start()
+    while True:
+        try:
+            result = results.get(timeout=1.0)
+            break
+        except queue.Empty:
+            # A child killed for running out of memory never reports back
+            if not process.is_alive():
+                try:
+                    result = results.get(timeout=1.0)
+                except queue.Empty:
+                    result = {"stage": stage, "size": size, "error": f"Process exited with code {process.exitcode}"}
+                break
+    process.join()
+    return result
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, threshold: float) -> bool:
+    """Print the change against a baseline and return True if a stage regressed by more than `threshold`."""
+    if not os.path.exists(baseline_path):
+        print(f"\nNo baseline at {baseline_path}, nothing to compare. Create it with --output {baseline_path}")
+        return False
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        saved = json.load(f)
+    baseline = {(r["stage"], r["size"]): r for r in saved["results"]}
+    print(f"\nBaseline of {saved.get('created_at')} on {saved.get('machine')}, {saved.get('cpus')} CPUs, Python {saved.get('python')}")
+
+    regressed = False
+    print(f"\n{'stage':<14}{'size':>10}{'items/s':>14}{'baseline':>14}{'change':>9}{'p99 ms':>11}{'baseline':>11}")
+    for result in results:
+        base = baseline.get((result["stage"], result["size"]))
+        if base is None or "error" in result or not base.get("items_per_sec"):
+            continue
+        change = result["items_per_sec"] / base["items_per_sec"] - 1
+        flag = ""
+        if change < -threshold:
+            regressed = True
+            flag = "  REGRESSION"
+        print(f"{result['stage']:<14}{result['size']:>10}{result['items_per_sec']:>14.1f}{base['items_per_sec']:>14.1f}"
+              f"{change:>+9.1%}{result['p99_ms']:>11.2f}{base['p99_ms']:>11.2f}{flag}")
+    return regressed
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,1000,100000", help="Comma separated item counts, up to 1000000")
+    parser.add_argument("--stages", default=",".join(STAGES), help="Comma separated stages to run")
+    parser.add_argument("--latency", type=float, default=0.0, help="Fake model latency in seconds")
+    parser.add_argument("--output-tokens", type=int, default=300, help="Fake output tokens per entry")
+    parser.add_argument("--repeats", type=int, default=5, help="Repeats of the search and extraction stages")
+    parser.add_argument("--output", help="Write the results to this JSON file")
+    parser.add_argument("--compare", help="Compare the results with this JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="Throughput drop reported as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    stages = [stage for stage in args.stages.split(",") if stage]
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f"Unknown stage '{stage}', expected one of {', '.join(STAGES)}")
+
+    results = []
+    for stage in stages:
+        for size in sizes:
+            result = run_isolated(stage, size, args)
+            results.append(result)
+            if "error" in result:
+                print(f"{stage:<14}{size:>10}  failed: {result['error']}")
+            else:
+                print(f"{stage:<14}{size:>10}{result['items_per_sec'] or 0:>14.1f} items/s"
+                      f"  p50 {result['p50_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms"
+                      f"  peak RSS {result['peak_rss_mb']} MB  written {result['bytes_written']} B")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "processor": platform.processor() or platform.machine(),
+                "cpus": os.cpu_count(),
+                "settings": vars(args),
+                "results": results,
+            }, f, indent=2)
+
+    if args.compare:
+        return 1 if compare(results, args.compare, args.threshold) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,7 @@
+import logging
 from getpass import getpass
 from snail.cot_dsgen import CoTDatasetGenerator
+from snail.logs import configure_logging
 
 from rich.console import Console
 from rich.panel import Panel
@@ -17,6 +19,8 @@ repo_id: str = ""
 # Do not forget to run `!huggingface-cli login` to push ds to HF
 
 def main():
+    configure_logging(logging.INFO)
+
     snail = CoTDatasetGenerator(google_api_key=google_api_key, model_id=model_id, user_query=user_query, role=role)
 
     result_of_serching = snail.searching()
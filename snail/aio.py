@@ -0,0 +1,66 @@
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+
+# A single long-lived event loop shared by all synchronous entry points.
+# Running every coroutine on the same loop keeps the GenAI async HTTP client
+# bound to one loop, and works inside Colab/Jupyter where a loop is already running.
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def _background_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the shared background event loop, starting it on first use.
+
+    Returns:
+        asyncio.AbstractEventLoop: The event loop running in a daemon thread.
+    """
+    global _loop
+    with _loop_lock:
+        if _loop is None or _loop.is_closed():
+            _loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=_loop.run_forever, name="snail-event-loop", daemon=True)
+            thread.start()
+    return _loop
+
+
+def run_sync(coro: Awaitable[Any]) -> Any:
+    """
+    Run a coroutine to completion from synchronous code and return its result.
+
+    Args:
+        coro (Awaitable[Any]): The coroutine to run.
+
+    Returns:
+        Any: The value returned by the coroutine.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _background_loop())
+    try:
+        return future.result()
+    except BaseException:
+        # Propagate KeyboardInterrupt and friends to the running coroutine as well
+        future.cancel()
+        raise
+
+
+def iterate_sync(agen: AsyncIterator[Any]) -> Iterator[Any]:
+    """
+    Iterate an async generator from synchronous code, one item at a time.
+
+    Args:
+        agen (AsyncIterator[Any]): The async generator to consume.
+
+    Yields:
+        Any: The items produced by the async generator.
+    """
+    try:
+        while True:
+            try:
+                yield run_sync(agen.__anext__())
+            except StopAsyncIteration:
+                return
+    finally:
+        # Runs the generator's cleanup when the caller stops early
+        run_sync(agen.aclose())
@@ -0,0 +1,382 @@
+import re
+import json
+import math
+import time
+import random
+import asyncio
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, Optional
+
+
+logger = logging.getLogger('LLMBackend')
+
+
+class LLMBackend(ABC):
+    """Interface of the model API used by the dataset generators."""
+
+    @abstractmethod
+    def generate(self, model: str, contents: Any, config: Any) -> Any:
+        """
+        Generate a response.
+
+        Args:
+            model (str): The identifier of the generative model.
+            contents (Any): The contents sent to the model.
+            config (Any): The `GenerateContentConfig` of the request.
+
+        Returns:
+            Any: A response with `text` and `usage_metadata` attributes.
+        """
+        pass
+
+    @abstractmethod
+    async def agenerate(self, model: str, contents: Any, config: Any) -> Any:
+        """
+        Asynchronously generate a response.
+
+        Args:
+            model (str): The identifier of the generative model.
+            contents (Any): The contents sent to the model.
+            config (Any): The `GenerateContentConfig` of the request.
+
+        Returns:
+            Any: A response with `text` and `usage_metadata` attributes.
+        """
+        pass
+
+    def stream(self, model: str, contents: Any, config: Any) -> Iterator[Any]:
+        """
+        Generate a response in chunks, as they are produced by the model.
+        Backends without streaming yield the whole response as a single chunk.
+
+        Args:
+            model (str): The identifier of the generative model.
+            contents (Any): The contents sent to the model.
+            config (Any): The `GenerateContentConfig` of the request.
+
+        Yields:
+            Any: Chunks with `text` and `usage_metadata` attributes, the usage of the last one covers the request.
+        """
+        yield self.generate(model=model, contents=contents, config=config)
+
+    async def astream(self, model: str, contents: Any, config: Any) -> AsyncIterator[Any]:
+        """
+        Asynchronously generate a response in chunks, as they are produced by the model.
+        Backends without streaming yield the whole response as a single chunk.
+
+        Args:
+            model (str): The identifier of the generative model.
+            contents (Any): The contents sent to the model.
+            config (Any): The `GenerateContentConfig` of the request.
+
+        Yields:
+            Any: Chunks with `text` and `usage_metadata` attributes, the usage of the last one covers the request.
+        """
+        yield await self.agenerate(model=model, contents=contents, config=config)
+
+
+class GenAIBackend(LLMBackend):
+    """Backend calling the Google GenAI API."""
+
+    def __init__(self, api_key: Optional[str] = None, client: Any = None) -> None:
+        """
+        Initialise the backend with an API key or an existing client.
+
+        Args:
+            api_key (Optional[str]): The API key for accessing Google's GenAI services.
+            client (Any): An existing `genai.Client`, used instead of creating one.
+        """
+        if client is None:
+            from google import genai
+            client = genai.Client(api_key=api_key)
+        self.client = client
+
+    def generate(self, model: str, contents: Any, config: Any) -> Any:
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    async def agenerate(self, model: str, contents: Any, config: Any) -> Any:
+        return await self.client.aio.models.generate_content(model=model, contents=contents, config=config)
+
+    def stream(self, model: str, contents: Any, config: Any) -> Iterator[Any]:
+        yield from self.client.models.generate_content_stream(model=model, contents=contents, config=config)
+
+    async def astream(self, model: str, contents: Any, config: Any) -> AsyncIterator[Any]:
+        async for chunk in await self.client.aio.models.generate_content_stream(model=model, contents=contents, config=config):
+            yield chunk
+
+
+class FakeAPIError(Exception):
+    """Error raised by `FakeBackend`, shaped like the GenAI API errors (`code` and `status`)."""
+
+    def __init__(self, code: int, status: str, message: str) -> None:
+        super().__init__(f"{code} {status}. {message}")
+        self.code = code
+        self.status = status
+
+
+_ITEM_HEADER = re.compile(r'^### Item (\d+)$', re.MULTILINE)
+_LISTING = re.compile(r'^\d+\.\s+\*\*(.+?)\*\*\s*(.*)$', re.MULTILINE)
+_WORDS = ("first", "consider", "the", "given", "values", "then", "apply", "rule", "so", "we", "obtain",
+          "result", "check", "each", "step", "carefully", "because", "it", "follows", "that")
+# Share of the latency before the first chunk of a streamed response (the time to first token)
+_FIRST_CHUNK_SHARE = 0.3
+
+
+class FakeBackend(LLMBackend):
+    """
+    Deterministic offline backend for load tests and benchmarks.
+
+    Latency, token usage, 429 bursts and malformed outputs are simulated from a seeded
+    random generator, so two runs with the same seed and the same request order see the
+    same behaviour. Search requests (with tools) get a numbered list of problems; CoT
+    requests get <thought>/<answer> outputs, one `### Item <n>` section per packed entry.
+    """
+
+    def __init__(self,
+                 seed: int = 0,
+                 latency: float = 0.5,
+                 latency_distribution: str = "lognormal",
+                 latency_sigma: float = 0.5,
+                 output_tokens: int = 300,
+                 thoughts_tokens: int = 0,
+                 burst_probability: float = 0.0,
+                 burst_length: int = 10,
+                 max_concurrency: Optional[int] = None,
+                 malformed_rate: float = 0.0,
+                 listing_size: int = 20,
+                 chunk_words: int = 16,
+                 runaway_rate: float = 0.0) -> None:
+        """
+        Initialise the fake backend.
+
+        Args:
+            seed (int): Seed of the random generator.
+            latency (float): Mean latency of a request in seconds.
+            latency_distribution (str): One of "constant", "uniform", "exponential" or "lognormal".
+            latency_sigma (float): Shape of the lognormal distribution (standard deviation of the log).
+            output_tokens (int): Mean number of output tokens of one entry.
+            thoughts_tokens (int): Thinking tokens reported for every request.
+            burst_probability (float): Probability that a request starts a burst of 429 errors.
+            burst_length (int): Number of consecutive requests rejected by a burst.
+            max_concurrency (Optional[int]): Requests in flight above this value are rejected with 429.
+            malformed_rate (float): Probability that an output lacks its <thought>/<answer> tags.
+            listing_size (int): Number of problems in the response to a search request, as a numbered list.
+                Requests with `response_mime_type="application/json"` get the numbered problems of their
+                contents as JSON, and are rejected with 400 if they also have tools, like on the Gemini API.
+            chunk_words (int): Words per chunk of a streamed response.
+            runaway_rate (float): Probability that an output gets stuck in a repetition loop until `max_output_tokens`.
+
+        Raises:
+            ValueError: If `latency_distribution` is unknown or a rate is not within [0, 1].
+        """
+        if latency_distribution not in ("constant", "uniform", "exponential", "lognormal"):
+            logger.error(f"Unknown latency distribution '{latency_distribution}'")
+            raise ValueError(f"Unknown latency distribution '{latency_distribution}'")
+        for name, value in (("Burst probability", burst_probability), ("Malformed rate", malformed_rate),
+                            ("Runaway rate", runaway_rate)):
+            if not 0 <= value <= 1:
+                logger.error(f"{name} must be within [0, 1]")
+                raise ValueError(f"{name} must be within [0, 1], got {value}")
+
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_sigma = latency_sigma
+        self.output_tokens = output_tokens
+        self.thoughts_tokens = thoughts_tokens
+        self.burst_probability = burst_probability
+        self.burst_length = burst_length
+        self.max_concurrency = max_concurrency
+        self.malformed_rate = malformed_rate
+        self.listing_size = listing_size
+        self.chunk_words = chunk_words
+        self.runaway_rate = runaway_rate
+
+        self.requests = 0  # Requests received, including rejected ones
+        self.rejected = 0  # Requests rejected with 429
+        self.in_flight = 0
+        self._burst_left = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _sample_latency(self) -> float:
+        if self.latency_distribution == "constant":
+            return self.latency
+        if self.latency_distribution == "uniform":
+            return self._random.uniform(0, 2 * self.latency)
+        if self.latency_distribution == "exponential":
+            return self._random.expovariate(1 / self.latency) if self.latency > 0 else 0.0
+        if self.latency <= 0:
+            return 0.0
+        # Lognormal with the requested mean
+        mu = math.log(self.latency) - self.latency_sigma ** 2 / 2
+        return self._random.lognormvariate(mu, self.latency_sigma)
+
+    def _admit(self) -> float:
+        # Decide under the lock whether the request is rejected, and how long it takes
+        with self._lock:
+            self.requests += 1
+            if self._burst_left == 0 and self._random.random() < self.burst_probability:
+                self._burst_left = self.burst_length
+            overloaded = self.max_concurrency is not None and self.in_flight >= self.max_concurrency
+            if self._burst_left > 0 or overloaded:
+                self._burst_left = max(0, self._burst_left - 1)
+                self.rejected += 1
+                raise FakeAPIError(429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota).")
+            self.in_flight += 1
+            return self._sample_latency()
+
+    def _release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def _filler(self, seed: str, tokens: int) -> str:
+        # Deterministic pseudo text of about `tokens` tokens (one token per word), without the periodic
+        # word patterns that a repetition check would take for a generation loop
+        words = random.Random(hashlib.sha256(seed.encode('utf-8')).digest()).choices(_WORDS, k=max(1, tokens))
+        return " ".join(words)
+
+    def _output_tokens(self) -> int:
+        with self._lock:
+            return max(1, int(self._random.gauss(self.output_tokens, self.output_tokens / 4)))
+
+    def _cot_output(self, instruction: str, max_tokens: Optional[int] = None) -> str:
+        tokens = self._output_tokens()
+        thought = self._filler(instruction, tokens - 10)
+        answer = f"The answer to '{instruction[:40]}' is {int(hashlib.sha256(instruction.encode('utf-8')).hexdigest()[:6], 16) % 1000}."
+        with self._lock:
+            malformed = self._random.random() < self.malformed_rate
+            runaway = self._random.random() < self.runaway_rate
+        if malformed:
+            return f"{thought} {thought}"
+        if runaway:
+            # Starts well, then repeats the same sentence until the output limit
+            loop = " so we check the result again and then we apply the same step".split()
+            words = thought.split()[:max(1, tokens // 4)]
+            limit = max_tokens or 4 * self.output_tokens
+            return "<thought>" + " ".join(words + [loop[i % len(loop)] for i in range(max(0, limit - len(words)))])
+        return f"<thought>{thought}</thought>\n<answer>{answer}</answer>"
+
+    def respond(self, contents: Any, config: Any = None) -> SimpleNamespace:
+        """
+        Build the response to a request without simulating latency or errors.
+
+        Args:
+            contents (Any): The contents sent to the model.
+            config (Any): The `GenerateContentConfig` of the request.
+
+        Returns:
+            SimpleNamespace: A response with `text` and `usage_metadata` attributes.
+        """
+        contents = contents if isinstance(contents, str) else str(contents)
+        if getattr(config, "response_mime_type", None) == "application/json":
+            # A structuring request: the numbered problems of the contents as a JSON list
+            text = json.dumps([{"title": title, "problem": problem} for title, problem in _LISTING.findall(contents)])
+        elif getattr(config, "tools", None):
+            text = "Here are the problems:\n" + "\n".join(
+                f"{number}. **Problem {number}** {self._filler(f'{contents}{number}', 20)}?"
+                for number in range(1, self.listing_size + 1)
+            )
+        elif _ITEM_HEADER.search(contents):
+            sections = re.split(_ITEM_HEADER, contents)[1:]
+            text = "\n\n".join(f"### Item {number}\n{self._cot_output(item.strip())}"
+                               for number, item in zip(sections[::2], sections[1::2]))
+        else:
+            text = self._cot_output(contents, getattr(config, "max_output_tokens", None))
+
+        system_instruction = getattr(config, "system_instruction", None) or ""
+        prompt_tokens = (len(contents) + len(str(system_instruction))) // 4
+        candidates_tokens = len(text.split())
+        usage = SimpleNamespace(
+            prompt_token_count=prompt_tokens,
+            candidates_token_count=candidates_tokens,
+            thoughts_token_count=self.thoughts_tokens,
+            total_token_count=prompt_tokens + candidates_tokens + self.thoughts_tokens,
+        )
+        return SimpleNamespace(text=text, usage_metadata=usage)
+
+    @staticmethod
+    def _check_config(config: Any) -> None:
+        # Like the Gemini API, a response schema cannot be combined with tools
+        if getattr(config, "tools", None) and getattr(config, "response_mime_type", None) == "application/json":
+            raise FakeAPIError(400, "INVALID_ARGUMENT", "Tool use with a response mime type: 'application/json' is unsupported")
+
+    def generate(self, model: str, contents: Any, config: Any) -> Any:
+        self._check_config(config)
+        latency = self._admit()
+        try:
+            time.sleep(latency)
+            return self.respond(contents, config)
+        finally:
+            self._release()
+
+    async def agenerate(self, model: str, contents: Any, config: Any) -> Any:
+        self._check_config(config)
+        latency = self._admit()
+        try:
+            await asyncio.sleep(latency)
+            return self.respond(contents, config)
+        finally:
+            self._release()
+
+    def _chunks(self, contents: Any, config: Any) -> Any:
+        # The response split in chunks of `chunk_words` words, the last one carries the usage
+        response = self.respond(contents, config)
+        words = re.split(r'(?<=\s)(?=\S)', response.text)
+        texts = ["".join(words[start:start + self.chunk_words]) for start in range(0, len(words), max(1, self.chunk_words))]
+        return [SimpleNamespace(text=text, usage_metadata=response.usage_metadata if number == len(texts) - 1 else None)
+                for number, text in enumerate(texts)]
+
+    def stream(self, model: str, contents: Any, config: Any) -> Iterator[Any]:
+        self._check_config(config)
+        latency = self._admit()
+        try:
+            chunks = self._chunks(contents, config)
+            for number, chunk in enumerate(chunks):
+                time.sleep(self._chunk_delay(latency, number, len(chunks)))
+                yield chunk
+        finally:
+            self._release()
+
+    async def astream(self, model: str, contents: Any, config: Any) -> AsyncIterator[Any]:
+        self._check_config(config)
+        latency = self._admit()
+        try:
+            chunks = self._chunks(contents, config)
+            for number, chunk in enumerate(chunks):
+                await asyncio.sleep(self._chunk_delay(latency, number, len(chunks)))
+                yield chunk
+        finally:
+            self._release()
+
+    @staticmethod
+    def _chunk_delay(latency: float, number: int, count: int) -> float:
+        # The first chunk arrives after a share of the latency, the others are spread over the rest
+        if number == 0:
+            return latency * _FIRST_CHUNK_SHARE
+        return latency * (1 - _FIRST_CHUNK_SHARE) / max(1, count - 1)
+
+    def batch_handler(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Answer one request of a batch job file, for use with `LocalBatchTransport`.
+
+        Args:
+            request (Dict[str, Any]): The request of a job line.
+
+        Returns:
+            Dict[str, Any]: The response JSON as returned by the batch API.
+        """
+        instruction = "".join(part.get("text", "") for content in request["contents"] for part in content["parts"])
+        response = self.respond(instruction)
+        usage = response.usage_metadata
+        return {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": response.text}]}}],
+            "usageMetadata": {
+                "promptTokenCount": usage.prompt_token_count,
+                "candidatesTokenCount": usage.candidates_token_count,
+                "totalTokenCount": usage.total_token_count,
+            },
+        }
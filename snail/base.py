@@ -1,33 +1,86 @@
-from typing import List, Tuple, Dict
+from typing import Any, List, Tuple, Dict, Optional, Union, Iterable, Iterator, AsyncIterator
 from abc import ABC, abstractmethod
 
+from .records import CoTRecord
+
 
 class BaseDatasetGenerator(ABC):
 
     @abstractmethod
-    def searching(self) -> str:
+    def searching(self, queries: Optional[List[str]] = None, concurrency: Optional[int] = None) -> Union[str, List[str]]:
         """
         Generate content based on the user query using the Google Search tool.
 
+        Args:
+            queries (Optional[List[str]]): Several queries to send concurrently instead of the user query.
+            concurrency (Optional[int]): Fixed number of requests in flight for `queries`.
+
         Returns:
-            str: The generated text response from the GenAI model.
+            Union[str, List[str]]: The generated text response from the GenAI model,
+            or the merged listings of every query when `queries` is given.
         """
         pass
 
     @abstractmethod
-    def get_result(self, data: List[str], delay: int) -> List[str]:
+    def get_result(self, data: List[str], delay: Optional[float], concurrency: Optional[int]) -> List[str]:
         """
         Process a list of data entries using the Chain of Thought (CoT) framework and return results.
 
         Args:
             data (List[str]): List of data entries (e.g., statements or quotes) to analyze.
-            delay (int): Time in seconds to wait between processing each entry to avoid rate limits.
+            delay (Optional[float]): Minimum seconds between two requests, None to use the generator's rate limits.
+            concurrency (Optional[int]): Maximum number of requests in flight, None to adapt it automatically.
 
         Returns:
             List[str]: List of generated text responses for each data entry.
         """
         pass
 
+    @abstractmethod
+    async def aget_result(self, data: List[str], delay: Optional[float], concurrency: Optional[int]) -> List[str]:
+        """
+        Asynchronously process a list of data entries using the Chain of Thought (CoT) framework.
+
+        Args:
+            data (List[str]): List of data entries (e.g., statements or quotes) to analyze.
+            delay (Optional[float]): Minimum seconds between two requests, None to use the generator's rate limits.
+            concurrency (Optional[int]): Maximum number of requests in flight, None to adapt it automatically.
+
+        Returns:
+            List[str]: List of generated text responses for each data entry, in input order.
+        """
+        pass
+
+    @abstractmethod
+    def iter_results(self, data: List[str], delay: Optional[float], concurrency: Optional[int]) -> Iterator[CoTRecord]:
+        """
+        Process a list of data entries, yielding every record as soon as it is completed.
+
+        Args:
+            data (List[str]): List of data entries (e.g., statements or quotes) to analyze.
+            delay (Optional[float]): Minimum seconds between two requests, None to use the generator's rate limits.
+            concurrency (Optional[int]): Maximum number of requests in flight, None to adapt it automatically.
+
+        Yields:
+            CoTRecord: The index, instruction, output and usage of each completed entry.
+        """
+        pass
+
+    @abstractmethod
+    def aiter_results(self, data: List[str], delay: Optional[float], concurrency: Optional[int]) -> AsyncIterator[CoTRecord]:
+        """
+        Asynchronously process a list of data entries, yielding every record as soon as it is completed.
+
+        Args:
+            data (List[str]): List of data entries (e.g., statements or quotes) to analyze.
+            delay (Optional[float]): Minimum seconds between two requests, None to use the generator's rate limits.
+            concurrency (Optional[int]): Maximum number of requests in flight, None to adapt it automatically.
+
+        Yields:
+            CoTRecord: The index, instruction, output and usage of each completed entry.
+        """
+        pass
+
     @abstractmethod
     def create_ds(self, instruction: List[str], output: List[str]) -> Dict[str, str]:
         """
@@ -43,27 +96,35 @@ class BaseDatasetGenerator(ABC):
         pass
 
     @abstractmethod
-    def transform_alpaca_format(self, dataset: Dict[str, str]) -> Tuple[str, List[Dict[str, str]]]:
+    def transform_alpaca_format(self,
+                                dataset: Union[Dict[str, str], Iterable[CoTRecord]],
+                                output_format: str = "jsonl",
+                                keep_data: bool = True,
+                                split_output: bool = False) -> Tuple[str, List[Dict[str, str]]]:
         """
-        Transform a dictionary dataset into Alpaca format and save to a JSON file.
+        Transform a dictionary dataset into Alpaca format and stream it to a JSON Lines (or JSON) file.
 
         Args:
-            dataset (Dict[str, str]): A dictionary of instructions and outputs.
+            dataset (Union[Dict[str, str], Iterable[CoTRecord]]): A dictionary of instructions and outputs, or generated records.
+            output_format (str): "jsonl" for one entry per line, "json" for an indented JSON array.
+            keep_data (bool): Also return the transformed entries.
+            split_output (bool): Add the "thought" and "answer" fields of every output and drop invalid outputs.
 
         Returns:
             Tuple[str, List[Dict]]:
-            - The filename of the saved JSON file
+            - The filename of the saved file
             - The list of transformed data entries
         """
         pass
 
     @abstractmethod
-    def push_to_hf(self, json_path: str, repo_id: str) -> None:
+    def push_to_hf(self, json_path: Optional[str], repo_id: str, data: Any = None) -> None:
         """
         Push a JSON dataset and its dataset card to a new Hugging Face dataset repository.
 
         Args:
-            json_path (str): File path to the JSON file containing the dataset.
+            json_path (Optional[str]): File path to the JSON file containing the dataset.
             repo_id (str): Repository identifier in the format 'username/reponame'.
+            data (Any): The dataset in memory instead of a file, e.g. generated records or a `pyarrow.Table`.
         """
         pass
\ No newline at end of file
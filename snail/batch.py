@@ -0,0 +1,253 @@
+import os
+import re
+import json
+import uuid
+import shutil
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+
+logger = logging.getLogger('BatchTransport')
+
+# Job states, named as in the GenAI batch API
+JOB_STATE_PENDING = "JOB_STATE_PENDING"
+JOB_STATE_RUNNING = "JOB_STATE_RUNNING"
+JOB_STATE_SUCCEEDED = "JOB_STATE_SUCCEEDED"
+JOB_STATE_FAILED = "JOB_STATE_FAILED"
+JOB_STATE_PARTIALLY_SUCCEEDED = "JOB_STATE_PARTIALLY_SUCCEEDED"
+FINISHED_STATES = {JOB_STATE_SUCCEEDED, JOB_STATE_FAILED, "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED",
+                   JOB_STATE_PARTIALLY_SUCCEEDED}
+
+
+def build_request(instruction: str, system_instruction: str, generation_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Build the `GenerateContentRequest` of one entry in the JSON shape of a batch job line.
+
+    Args:
+        instruction (str): The data entry sent to the model.
+        system_instruction (str): The system instruction of the request.
+        generation_config (Optional[Dict[str, Any]]): Extra generation parameters, e.g. max_output_tokens.
+
+    Returns:
+        Dict[str, Any]: The request.
+    """
+    request = {
+        "contents": [{"role": "user", "parts": [{"text": instruction}]}],
+        "system_instruction": {"parts": [{"text": system_instruction}]},
+    }
+    if generation_config:
+        request["generation_config"] = generation_config
+    return request
+
+
+def write_job_file(path: str, requests: Iterator[Tuple[str, Dict[str, Any]]]) -> int:
+    """
+    Serialise keyed requests to a JSONL batch job file.
+
+    Args:
+        path (str): File path of the job file.
+        requests (Iterator[Tuple[str, Dict[str, Any]]]): Pairs of key and request.
+
+    Returns:
+        int: The number of requests written.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for key, request in requests:
+            f.write(json.dumps({"key": key, "request": request}, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def _snake_case(name: str) -> str:
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).lower()
+
+
+def parse_result_line(line: str) -> Tuple[str, Optional[str], Dict[str, Any], Optional[Any]]:
+    """
+    Parse one line of a batch results file.
+
+    Args:
+        line (str): A JSON line holding "key" and either "response" or "error".
+
+    Returns:
+        Tuple[str, Optional[str], Dict[str, Any], Optional[Any]]:
+        - The key of the request
+        - The text of the response, None if the request failed
+        - The token usage with snake_case names
+        - The error, None if the request succeeded
+    """
+    result = json.loads(line)
+    response = result.get("response") or {}
+    error = result.get("error")
+
+    text = None
+    candidates = response.get("candidates") or []
+    if candidates:
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        # Thought summaries are not part of the answer
+        text = "".join(part.get("text", "") for part in parts if not part.get("thought"))
+    usage = {_snake_case(name): value for name, value in (response.get("usageMetadata") or response.get("usage_metadata") or {}).items()}
+
+    if text is None and error is None:
+        error = response.get("promptFeedback") or "Response without candidates"
+    return result["key"], text, usage, error
+
+
+class BatchTransport(ABC):
+    """Submits batch job files to a batch service and retrieves their results."""
+
+    @abstractmethod
+    def submit(self, job_path: str, model_id: str) -> str:
+        """
+        Submit a JSONL job file.
+
+        Args:
+            job_path (str): File path of the job file.
+            model_id (str): The identifier of the generative model.
+
+        Returns:
+            str: The name of the created job.
+        """
+        pass
+
+    @abstractmethod
+    def poll(self, job_name: str) -> str:
+        """
+        Get the state of a job.
+
+        Args:
+            job_name (str): The name returned by `submit`.
+
+        Returns:
+            str: The job state, e.g. "JOB_STATE_RUNNING" or "JOB_STATE_SUCCEEDED".
+        """
+        pass
+
+    @abstractmethod
+    def download(self, job_name: str, results_path: str) -> None:
+        """
+        Download the JSONL results of a finished job.
+
+        Args:
+            job_name (str): The name returned by `submit`.
+            results_path (str): File path the results are written to.
+        """
+        pass
+
+
+class GenAIBatchTransport(BatchTransport):
+    """Runs batch jobs with the GenAI batch API: the job file is uploaded, and results are downloaded as a file."""
+
+    def __init__(self, client: Any) -> None:
+        """
+        Initialise the transport.
+
+        Args:
+            client (Any): The `genai.Client` used to upload files and create jobs.
+        """
+        self.client = client
+
+    def submit(self, job_path: str, model_id: str) -> str:
+        uploaded = self.client.files.upload(
+            file=job_path,
+            config={"display_name": os.path.basename(job_path), "mime_type": "jsonl"}
+        )
+        job = self.client.batches.create(
+            model=model_id,
+            src=uploaded.name,
+            config={"display_name": os.path.basename(job_path)}
+        )
+        return job.name
+
+    def poll(self, job_name: str) -> str:
+        job = self.client.batches.get(name=job_name)
+        return job.state.name if hasattr(job.state, "name") else str(job.state)
+
+    def download(self, job_name: str, results_path: str) -> None:
+        job = self.client.batches.get(name=job_name)
+        content = self.client.files.download(file=job.dest.file_name)
+        with open(results_path, 'wb') as f:
+            f.write(content)
+
+
+class LocalBatchTransport(BatchTransport):
+    """
+    Stand-in for a batch service that processes job files offline in a background thread.
+    Every request of a job is passed to `handler`, which returns the response JSON
+    (as the API would) or raises to record an error for that request.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Dict[str, Any]], work_dir: str = ".snail_batches") -> None:
+        """
+        Initialise the transport.
+
+        Args:
+            handler (Callable[[Dict[str, Any]], Dict[str, Any]]): Produces the response of one request.
+            work_dir (str): Directory where submitted jobs and their results are kept.
+        """
+        self.handler = handler
+        self.work_dir = work_dir
+        self._states: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _path(self, job_name: str, suffix: str) -> str:
+        return os.path.join(self.work_dir, f"{job_name.replace('/', '_')}.{suffix}.jsonl")
+
+    def submit(self, job_path: str, model_id: str) -> str:
+        job_name = f"batches/{uuid.uuid4().hex}"
+        shutil.copyfile(job_path, self._path(job_name, "input"))
+        with self._lock:
+            self._states[job_name] = JOB_STATE_PENDING
+        threading.Thread(target=self._run, args=(job_name,), name=f"snail-{job_name}", daemon=True).start()
+        return job_name
+
+    def _run(self, job_name: str) -> None:
+        with self._lock:
+            self._states[job_name] = JOB_STATE_RUNNING
+        try:
+            with open(self._path(job_name, "input"), 'r', encoding='utf-8') as source, \
+                    open(self._path(job_name, "output"), 'w', encoding='utf-8') as destination:
+                for line in source:
+                    line = json.loads(line)
+                    try:
+                        result = {"key": line["key"], "response": self.handler(line["request"])}
+                    except Exception as e:
+                        result = {"key": line["key"], "error": {"message": str(e), "code": getattr(e, "code", None)}}
+                    destination.write(json.dumps(result, ensure_ascii=False) + "\n")
+            state = JOB_STATE_SUCCEEDED
+        except Exception as e:
+            logger.error(f"Local batch job '{job_name}' failed: {e}")
+            state = JOB_STATE_FAILED
+        with self._lock:
+            self._states[job_name] = state
+
+    def poll(self, job_name: str) -> str:
+        with self._lock:
+            if job_name not in self._states:
+                logger.error(f"Unknown batch job '{job_name}'")
+                raise ValueError(f"Unknown batch job '{job_name}'")
+            return self._states[job_name]
+
+    def download(self, job_name: str, results_path: str) -> None:
+        shutil.copyfile(self._path(job_name, "output"), results_path)
+
+
+def read_results(path: str) -> Iterator[Tuple[str, Optional[str], Dict[str, Any], Optional[Any]]]:
+    """
+    Read a batch results file line by line.
+
+    Args:
+        path (str): File path of the JSONL results.
+
+    Yields:
+        Tuple[str, Optional[str], Dict[str, Any], Optional[Any]]: The parsed lines, see `parse_result_line`.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield parse_result_line(line)
+
@@ -0,0 +1,171 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional
+
+from .records import usage_to_dict
+
+
+logger = logging.getLogger('ResponseCache')
+
+
+class ResponseCache:
+    """
+    Persistent SQLite cache of model responses.
+    Entries expire after `ttl` seconds, and the least recently used ones are evicted
+    once the cache holds more than `max_entries` entries or `max_bytes` bytes of text.
+    """
+
+    def __init__(self,
+                 path: str,
+                 ttl: Optional[float] = None,
+                 max_entries: Optional[int] = None,
+                 max_bytes: Optional[int] = None) -> None:
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path (str): File path of the SQLite database.
+            ttl (Optional[float]): Seconds an entry stays valid, None to keep entries forever.
+            max_entries (Optional[int]): Maximum number of entries, None for no limit.
+            max_bytes (Optional[int]): Maximum total size of the cached texts in bytes, None for no limit.
+
+        Raises:
+            ValueError: If `path` is empty or a limit is not positive.
+        """
+        if not path:
+            logger.error("Cache path is missing or empty")
+            raise ValueError("Cache path is missing or empty")
+        for name, value in (("TTL", ttl), ("Max entries", max_entries), ("Max bytes", max_bytes)):
+            if value is not None and value <= 0:
+                logger.error(f"{name} must be greater than zero")
+                raise ValueError(f"{name} must be greater than zero, got {value}")
+
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, usage TEXT NOT NULL, "
+            "size INTEGER NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+        self._connection.commit()
+
+    @staticmethod
+    def key(model_id: str, contents: Any, config: Any) -> str:
+        """
+        Compute the cache key of a request.
+
+        Args:
+            model_id (str): The identifier of the generative model.
+            contents (Any): The contents sent to the model.
+            config (Any): The `GenerateContentConfig` of the request, including the system instruction.
+
+        Returns:
+            str: The hexadecimal SHA-256 of the request.
+        """
+        if hasattr(config, "model_dump"):
+            config = config.model_dump(mode="json", exclude_none=True)
+        payload = json.dumps([model_id, contents, config], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    @property
+    def hit_rate(self) -> float:
+        """float: The share of lookups answered from the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response.
+
+        Args:
+            key (str): The `key` of the request.
+
+        Returns:
+            Optional[Dict[str, Any]]: The cached "text" and "usage", or None on a miss.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT text, usage, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self.ttl is not None and now - row[2] > self.ttl:
+                self._connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._connection.commit()
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._connection.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._connection.commit()
+            self.hits += 1
+            return {"text": row[0], "usage": json.loads(row[1])}
+
+    def set(self, key: str, text: str, usage: Any = None) -> None:
+        """
+        Store a response and evict entries over the size limits.
+
+        Args:
+            key (str): The `key` of the request.
+            text (str): The generated text response.
+            usage (Any): The `usage_metadata` of the response.
+        """
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, text, usage, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, text, json.dumps(usage_to_dict(usage)), len(text.encode('utf-8')), now, now)
+            )
+            self._evict()
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        if self.max_entries is not None:
+            self._connection.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+
+        if self.max_bytes is not None:
+            total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            # Walk the entries from least to most recently used until enough bytes are freed
+            evicted = []
+            for key, size in self._connection.execute("SELECT key, size FROM responses ORDER BY accessed_at ASC"):
+                if total <= self.max_bytes:
+                    break
+                evicted.append((key,))
+                total -= size
+            self._connection.executemany("DELETE FROM responses WHERE key = ?", evicted)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._connection.execute("DELETE FROM responses")
+            self._connection.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._connection.close()
@@ -0,0 +1,145 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Optional
+
+
+logger = logging.getLogger('AdaptiveConcurrency')
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD (additive increase, multiplicative decrease) limit on the number of requests in flight.
+
+    The limit grows by one after each window of `concurrency` successful requests and is halved
+    when the API answers with resource exhausted (429) or unavailable (503). The limit is kept
+    between runs, so long runs settle on the highest rate the API key sustains.
+    """
+
+    def __init__(self,
+                 initial: int = 4,
+                 min_concurrency: int = 1,
+                 max_concurrency: int = 64) -> None:
+        """
+        Initialise the controller.
+
+        Args:
+            initial (int): The starting number of requests allowed in flight.
+            min_concurrency (int): The limit never goes below this value.
+            max_concurrency (int): The limit never goes above this value.
+
+        Raises:
+            ValueError: If the bounds are not positive or `initial` is outside of them.
+        """
+        if min_concurrency <= 0 or max_concurrency < min_concurrency:
+            logger.error("Concurrency bounds must be positive and min must not exceed max")
+            raise ValueError(f"Concurrency bounds must be positive and min must not exceed max, got {min_concurrency} and {max_concurrency}")
+        if not min_concurrency <= initial <= max_concurrency:
+            logger.error("Initial concurrency must be within the bounds")
+            raise ValueError(f"Initial concurrency must be within [{min_concurrency}, {max_concurrency}], got {initial}")
+
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self._limit = initial
+        self._in_flight = 0
+        self._successes = 0
+        # Requests started before the last decrease must not halve the limit again
+        self._epoch = 0
+        self._completions: Deque[float] = deque()
+        self._started_at = time.monotonic()
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @classmethod
+    def fixed(cls, concurrency: int) -> "AdaptiveConcurrency":
+        """
+        Build a controller that never changes its limit.
+
+        Args:
+            concurrency (int): The number of requests allowed in flight.
+
+        Returns:
+            AdaptiveConcurrency: A controller with equal bounds.
+        """
+        return cls(initial=concurrency, min_concurrency=concurrency, max_concurrency=concurrency)
+
+    @property
+    def concurrency(self) -> int:
+        """int: The current number of requests allowed in flight."""
+        return self._limit
+
+    @property
+    def in_flight(self) -> int:
+        """int: The number of requests currently in flight."""
+        return self._in_flight
+
+    @property
+    def observed_rpm(self) -> float:
+        """float: Requests completed successfully during the last minute."""
+        now = time.monotonic()
+        self._forget_old_completions(now)
+        # Scale up during the first minute so the value is comparable to a per-minute quota
+        window = min(60.0, max(now - self._started_at, 1.0))
+        return len(self._completions) * 60.0 / window
+
+    def _forget_old_completions(self, now: float) -> None:
+        while self._completions and now - self._completions[0] > 60:
+            self._completions.popleft()
+
+    def _get_condition(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = loop
+        return self._condition
+
+    async def acquire(self) -> int:
+        """
+        Wait until a request may be sent and take a slot.
+
+        Returns:
+            int: A token identifying the limit the request was sent under, to pass to `release`.
+        """
+        condition = self._get_condition()
+        async with condition:
+            await condition.wait_for(lambda: self._in_flight < self._limit)
+            self._in_flight += 1
+            return self._epoch
+
+    async def release(self, token: int, overloaded: bool = False, succeeded: bool = True) -> None:
+        """
+        Give a slot back and adapt the limit to the outcome of the request.
+
+        Args:
+            token (int): The value returned by `acquire`.
+            overloaded (bool): True if the API answered with 429/503.
+            succeeded (bool): True if the request produced a response.
+        """
+        condition = self._get_condition()
+        async with condition:
+            self._in_flight -= 1
+            if overloaded:
+                self._on_overload(token)
+            elif succeeded:
+                self._on_success()
+            condition.notify_all()
+
+    def _on_success(self) -> None:
+        now = time.monotonic()
+        self._completions.append(now)
+        self._forget_old_completions(now)
+
+        self._successes += 1
+        if self._successes >= self._limit and self._limit < self.max_concurrency:
+            self._limit += 1
+            self._successes = 0
+            logger.debug(f"Concurrency increased to {self._limit}")
+
+    def _on_overload(self, token: int) -> None:
+        if token != self._epoch:
+            return
+        self._epoch += 1
+        self._successes = 0
+        self._limit = max(self.min_concurrency, self._limit // 2)
+        logger.warning(f"API is overloaded, concurrency decreased to {self._limit}")
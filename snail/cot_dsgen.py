@@ -1,33 +1,81 @@
-import logging
-
-logging.basicConfig(
-    level = logging.DEBUG,
-    format = '%(asctime)s : %(name)s : %(levelname)s : %(message)s',
-    datefmt = "%m-%d-%Y %H:%M:%S",
-    force = True
-)
-
+import os
 import re
 import time
-import json
+import uuid
+import itertools
+import asyncio
+import logging
 from datetime import datetime
-from typing import List, Dict, Tuple
-from google import genai
-from google.genai.types import Tool, GenerateContentConfig, GoogleSearch
-from datasets import load_dataset
-from huggingface_hub import create_repo, DatasetCard
+from types import SimpleNamespace
+from collections import defaultdict
+from typing import Any, List, Dict, Tuple, Optional, Iterable, Iterator, AsyncIterable, AsyncIterator, Union
 
 from rich.console import Console
 from rich.panel import Panel
 
+from .aio import run_sync, iterate_sync
+from .backends import LLMBackend, GenAIBackend
 from .base import BaseDatasetGenerator
+from .concurrency import AdaptiveConcurrency
+from .report import RunReport, GenerationStats
+from .retry import RetryPolicy
+from .rate_limiter import RateLimiter, total_tokens
+from .progress import ProgressDisplay, VERBOSITY_LEVELS
+from .records import CoTRecord, usage_from_dict
+from .journal import Journal, item_key
+from .cache import ResponseCache
+from .dedup import DedupIndex, SingleFlight
+from .guard import OutputGuard, OutputAborted
+from .cot_output import parse_cot_output
+from .listings import ListingStreamParser, parse_listings
+from .batch import BatchTransport, GenAIBatchTransport, FINISHED_STATES, JOB_STATE_SUCCEEDED, JOB_STATE_PARTIALLY_SUCCEEDED, build_request, write_job_file, read_results
+from .packing import PACKED_INSTRUCTION, pack_prompt, split_packed_response, split_usage, choose_pack_size
+from .writers import loads, open_writer, remove_output, records_to_table
+from .hub import HubClient, HFHubClient, ShardUploader
+from .slots import RequestSlot
 
 
 logger = logging.getLogger('CoTDatasetGenerator')
 
+# Marks the end of a generation run in the output queue of `aiter_results`
+_DONE = object()
+
 # Set up Rich console for pretty prints
 console = Console()
 
+# Appended to `user_query` to ask for the next page of a paginated search
+CONTINUE_INSTRUCTION = """
+List {page_size} items numbered from {first} to {last}, in the same format.
+{seen_count} items are already listed, do not repeat any of them.{digest}
+"""
+
+_TITLE = re.compile(r'\*\*(.+?)\*\*')
+_CODE_FENCE = re.compile(r'^```[a-zA-Z]*\s*|\s*```$')
+
+# Formats of the search response, see `search_output`
+SEARCH_OUTPUTS = ("text", "json")
+
+# System instruction of the request that turns a grounded search response into JSON, see `search_output`
+STRUCTURE_INSTRUCTION = """Extract every numbered item of the text into a JSON list, in the same order.
+For each item, "title" is its short name (often in bold) and "problem" is its complete text, without the number.
+Do not add, merge or leave out items."""
+
+# Output tokens of the keys, quotes and separators of one {title, problem} object
+JSON_ITEM_OVERHEAD_TOKENS = 16
+
+# Response schema of the "json" search output, a list of {title, problem}
+LISTING_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {
+            "title": {"type": "STRING"},
+            "problem": {"type": "STRING"},
+        },
+        "required": ["title", "problem"],
+    },
+}
+
 DATASET_CARD = \
 """---
 license: apache-2.0
@@ -50,15 +98,364 @@ size_categories:
 """
 
 
+class _GenerationRun:
+    """
+    State of one `aiter_results` run: its entries, their deduplication and journal, the queue of
+    requests and the workers that send them.
+
+    Completed records, a worker exception, or `_DONE` once every entry is finished are put in `outputs`.
+    """
+
+    def __init__(self,
+                 generator: "CoTDatasetGenerator",
+                 data: List[str],
+                 source: Optional[AsyncIterable[str]],
+                 pack_size: int,
+                 rate_limiter: RateLimiter,
+                 controller: AdaptiveConcurrency,
+                 journal_path: Optional[str]) -> None:
+        self.generator = generator
+        self.data = data  # Entries of a streamed `source` are added as they arrive
+        self.source = source
+        self.pack_size = pack_size
+        self.rate_limiter = rate_limiter
+        self.controller = controller
+        self.loop = asyncio.get_running_loop()
+        self.n_workers = controller.max_concurrency if source is not None else min(controller.max_concurrency, len(data))
+        self.outputs: asyncio.Queue = asyncio.Queue(maxsize=2 * self.n_workers)
+        # Every queue item is a list of entry indices sent in one request
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.workers: List[asyncio.Task] = []
+        # Kept local so that concurrent runs do not mix their per-entry statistics
+        self.run_stats = generator.report.generation = GenerationStats(attempts=[0] * len(data))
+        self.stats = generator.report.stage("generation")
+        self.stats.calls += 1
+        self.started = time.perf_counter()
+        self.display = ProgressDisplay(len(data), console, in_flight=lambda: controller.in_flight,
+                                       enabled=generator.verbosity != "quiet")
+
+        # Entries completed by an earlier run are replayed from the journal instead of being sent
+        self.journal = Journal(journal_path) if journal_path else None
+        self.journaled = self.journal.load() if self.journal else {}
+        self.keys = [self._key(d) for d in data] if self.journal else []
+
+        # Entries equal to an earlier one (exactly or after normalisation) are sent once and share its output
+        self.dedup_index = DedupIndex()
+        self.leaders: List[int] = []
+        self.duplicates: Dict[int, List[int]] = defaultdict(list)
+        self.resumed: Dict[int, CoTRecord] = {}
+        # Outputs of finished leaders, for duplicates of a streamed source arriving after them
+        self.finished: Dict[int, Optional[CoTRecord]] = {}
+
+        for index, d in enumerate(data):
+            self.admit(index, d)
+
+        self.run_stats.resumed = len(self.resumed)
+        self.run_stats.deduplicated = sum(len(followers) for followers in self.duplicates.values())
+        if self.journal and source is None:
+            logger.info(f"Resuming from journal '{journal_path}': {len(self.resumed)} of {len(data)} entries already done")
+        self.pending = len(self.leaders)
+        self.feeding = source is not None  # The streamed source may still add entries
+
+    def _key(self, d: str) -> str:
+        return item_key(d, self.generator.system_instruction_cot, self.generator.model_id)
+
+    def start(self) -> None:
+        """Queue the entries to send and start the workers."""
+        for start in range(0, len(self.leaders), self.pack_size):
+            self.queue.put_nowait(self.leaders[start:start + self.pack_size])
+        self.run_stats.pack_size = self.pack_size
+        if self.pending == 0 and not self.feeding:
+            self.outputs.put_nowait(_DONE)
+
+        self.display.start(done=len(self.resumed))
+        n_workers = self.n_workers if self.feeding else min(self.n_workers, self.pending)
+        self.workers = [asyncio.create_task(self.worker()) for _ in range(n_workers)]
+        if self.feeding:
+            self.workers.append(asyncio.create_task(self.feed()))
+
+    def stop(self) -> None:
+        """Cancel the workers and close the journal and the progress display."""
+        for task in self.workers:
+            task.cancel()
+        if self.journal:
+            self.journal.close()
+        self.display.stop()
+        self.stats.seconds += time.perf_counter() - self.started
+
+    def admit(self, index: int, d: str) -> Tuple[str, Optional[CoTRecord]]:
+        # "send" for a new entry, "resumed" with its record, "follower" of a leader in progress,
+        # or "late" with the record (None if it failed) of a leader already finished
+        leader, is_new = self.dedup_index.add(d, index) if self.generator.deduplicate else (index, True)
+        entry = self.journaled.get(self.keys[index]) if self.journal else None
+        if entry is not None:
+            self.resumed[index] = CoTRecord(index, d, entry["output"], usage_from_dict(entry["usage"]))
+            return "resumed", self.resumed[index]
+        if is_new:
+            self.leaders.append(index)
+            return "send", None
+        if leader in self.resumed:
+            self.resumed[index] = self.resumed[leader]._replace(index=index, instruction=d)
+            return "resumed", self.resumed[index]
+        if leader in self.finished:
+            record = self.finished[leader]
+            return "late", record._replace(index=index, instruction=d) if record is not None else None
+        self.duplicates[leader].append(index)
+        return "follower", None
+
+    async def finish(self, index: int, record: Optional[CoTRecord]) -> None:
+        followers = self.duplicates.pop(index, [])
+        if self.source is not None:
+            self.finished[index] = record
+        if record is None:
+            self.run_stats.failed.extend([index, *followers])
+            self.stats.failures += 1 + len(followers)
+            self.display.advance(failed=1 + len(followers))
+        else:
+            self.stats.items += 1 + len(followers)
+            self.display.advance(done=1 + len(followers))
+            for follower in [record] + [record._replace(index=i, instruction=self.data[i]) for i in followers]:
+                if self.journal:
+                    self.journal.append(self.keys[follower.index], follower.instruction, follower.output, follower.usage)
+                await self.outputs.put(follower)
+        self.pending -= 1
+        if self.pending == 0 and not self.feeding:
+            await self.outputs.put(_DONE)
+
+    async def feed(self) -> None:
+        # Sends the entries of the streamed source as they arrive, packed by `pack_size`
+        pack: List[int] = []
+        try:
+            async for d in self.source:
+                index = len(self.data)
+                self.data.append(d)
+                self.run_stats.attempts.append(0)
+                if self.journal:
+                    self.keys.append(self._key(d))
+                self.display.total += 1
+                status, record = self.admit(index, d)
+                if status == "send":
+                    self.pending += 1
+                    pack.append(index)
+                    if len(pack) == self.pack_size:
+                        self.queue.put_nowait(pack)
+                        pack = []
+                    continue
+                if status == "resumed":
+                    self.run_stats.resumed += 1
+                else:
+                    self.run_stats.deduplicated += 1
+                if status == "late" and record is None:
+                    self.run_stats.failed.append(index)
+                    self.stats.failures += 1
+                    self.display.advance(failed=1)
+                elif record is not None:
+                    if status == "late":
+                        self.stats.items += 1
+                        if self.journal:
+                            self.journal.append(self.keys[index], record.instruction, record.output, record.usage)
+                    self.display.advance(done=1)
+                    await self.outputs.put(record)
+            if pack:
+                self.queue.put_nowait(pack)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.outputs.put(e)  # Re-raised by the consumer
+        finally:
+            self.feeding = False
+            if self.pending == 0:
+                await self.outputs.put(_DONE)
+
+    def request_slot(self, contents: str) -> RequestSlot:
+        return RequestSlot(self.generator.report, "generation", self.controller, self.rate_limiter,
+                           on_done=lambda usage: self.display.request(total_tokens(usage)), prompt=contents)
+
+    async def send(self, d: str, config: Any) -> Any:
+        async with self.request_slot(d) as slot:
+            # Generate content for each data entry using CoT configuration
+            response = await self.generator.backend.agenerate(
+                model=self.generator.model_id,
+                config=config,
+                contents=d
+            )
+            slot.usage, slot.succeeded = getattr(response, "usage_metadata", None), True
+            return response
+
+    async def send_streamed(self, d: str, config: Any) -> Any:
+        # Like `send`, but the output is streamed through `output_guard` and cancelled as soon as it goes wrong
+        generator = self.generator
+        monitor = generator.output_guard.monitor()
+        chunks: List[str] = []
+        async with self.request_slot(d) as slot:
+            stream = generator.backend.astream(model=generator.model_id, config=config, contents=d)
+            try:
+                async for chunk in stream:
+                    slot.usage = getattr(chunk, "usage_metadata", None) or slot.usage
+                    text = getattr(chunk, "text", None) or ""
+                    slot.received(text)
+                    chunks.append(text)
+                    reason = monitor.feed(text)
+                    if reason:
+                        tokens = getattr(slot.usage, "candidates_token_count", None) or monitor.words
+                        # A loop would have run to the output limit, other outputs to about the usual length
+                        expected = generator.max_output_tokens if monitor.looping else generator._output_tokens_per_item
+                        raise OutputAborted(reason, "".join(chunks), tokens, max(0, int(expected) - tokens))
+            finally:
+                await stream.aclose()  # Cancels the request when the output is aborted
+            slot.succeeded = True
+            text = "".join(chunks)
+            # Unclosed or missing sections are only known at the end, such outputs are not kept either
+            parsed = parse_cot_output(text)
+            if not parsed.valid:
+                raise OutputAborted(", ".join(parsed.errors), text, monitor.words, 0)
+            return SimpleNamespace(text=text, usage_metadata=slot.usage)
+
+    def print_panel(self, index: int, d: str, text: str, usage: Any) -> None:
+        # Rendering every response floods the terminal on long runs, so only debug runs and sampled entries print
+        verbosity, panel_every = self.generator.verbosity, self.generator.panel_every
+        if verbosity == "debug" or (verbosity == "progress" and panel_every and index % panel_every == 0):
+            panel_content = (
+                f"[bold]Data:[/bold] {d}\n\n"
+                f"[bold green]Response:[/bold green] {text}\n\n"
+                f"[bold yellow]Usage tokens:[/bold yellow] {usage}"
+            )
+            console.print(Panel(panel_content, title="CoT Processing Output", expand=False))
+
+    async def worker(self) -> None:
+        try:
+            while True:
+                indices = await self.queue.get()
+                if len(indices) > 1:
+                    await self.process_pack(indices)
+                else:
+                    await self.process_one(indices[0], self.data[indices[0]])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await self.outputs.put(e)  # Re-raised by the consumer
+
+    async def process_one(self, index: int, d: str) -> None:
+        from google.genai.types import GenerateContentConfig
+
+        generator = self.generator
+        config = GenerateContentConfig(
+            system_instruction=generator.system_instruction_cot
+        )
+        request_key = ResponseCache.key(generator.model_id, d, config)
+        cached = generator.cache.get(request_key) if generator.cache is not None else None
+        if cached is not None:
+            self.run_stats.cached += 1
+            await self.finish(index, CoTRecord(index, d, cached["text"], usage_from_dict(cached["usage"])))
+            return
+
+        self.run_stats.attempts[index] += 1
+        attempt = self.run_stats.attempts[index]
+        response = None
+        shared = False
+        sender = self.send_streamed if generator.output_guard is not None else self.send
+        try:
+            # Identical requests already in flight (e.g. from another run) are awaited instead of sent
+            response, shared = await generator._single_flight.do(request_key, lambda: sender(d, config))
+        except OutputAborted as e:
+            self.run_stats.aborted += 1
+            self.stats.tokens_saved += e.tokens_saved
+            if attempt < generator.retry_policy.max_attempts:
+                logger.warning(f"Attempt {attempt} for data '{d}' aborted, sending it again: {e}")
+                self.queue.put_nowait([index])
+                return
+            logger.error(f"Error occurred while processing data '{d}' after {attempt} attempt(s): {e}")
+        except Exception as e:
+            if generator.retry_policy.should_retry(e, attempt):
+                backoff = generator.retry_policy.backoff(attempt)
+                logger.warning(f"Attempt {attempt} failed for data '{d}', retrying in {backoff:.1f}s: {e}")
+                self.stats.retries += 1
+                self.loop.call_later(backoff, self.queue.put_nowait, [index])
+                return
+            # Log errors with consistent f-string formatting
+            logger.error(f"Error occurred while processing data '{d}' after {attempt} attempt(s): {e}")
+
+        if not response:  # Ensure response is valid before yielding it
+            await self.finish(index, None)
+            return
+
+        generator._observe_output_tokens(response.usage_metadata)
+        if shared:
+            self.run_stats.coalesced += 1
+        elif generator.cache is not None and response.text is not None:
+            generator.cache.set(request_key, response.text, response.usage_metadata)
+
+        # Print detailed output
+        self.print_panel(index, d, response.text, response.usage_metadata)
+        await self.finish(index, CoTRecord(index, d, response.text, response.usage_metadata))
+
+    async def process_pack(self, indices: List[int]) -> None:
+        from google.genai.types import GenerateContentConfig
+
+        generator = self.generator
+        texts = [self.data[index] for index in indices]
+        config = GenerateContentConfig(
+            system_instruction=generator.system_instruction_cot + PACKED_INSTRUCTION,
+            max_output_tokens=generator.max_output_tokens
+        )
+        contents = pack_prompt(texts)
+        for index in indices:
+            self.run_stats.attempts[index] += 1
+        attempt = max(self.run_stats.attempts[index] for index in indices)
+
+        request_key = ResponseCache.key(generator.model_id, contents, config)
+        cached = generator.cache.get(request_key) if generator.cache is not None else None
+        try:
+            if cached is not None:
+                self.run_stats.cached += len(indices)
+                text, usage = cached["text"], usage_from_dict(cached["usage"])
+            else:
+                response, _ = await generator._single_flight.do(request_key, lambda: self.send(contents, config))
+                text, usage = response.text, response.usage_metadata
+                if generator.cache is not None and text is not None:
+                    generator.cache.set(request_key, text, usage)
+        except Exception as e:
+            if generator.retry_policy.should_retry(e, attempt):
+                backoff = generator.retry_policy.backoff(attempt)
+                logger.warning(f"Attempt {attempt} failed for a pack of {len(indices)} entries, retrying in {backoff:.1f}s: {e}")
+                self.stats.retries += 1
+                self.loop.call_later(backoff, self.queue.put_nowait, indices)
+            else:
+                # The pack itself may be the problem (e.g. too long), send the entries on their own
+                logger.warning(f"Pack of {len(indices)} entries failed, sending them individually: {e}")
+                for index in indices:
+                    self.queue.put_nowait([index])
+            return
+
+        sections = split_packed_response(text, len(indices))
+        item_usage = split_usage(usage, len(indices))
+        for index, d, section in zip(indices, texts, sections):
+            if section is None:
+                # Missing or malformed section, the entry is sent again on its own
+                self.run_stats.unpacked += 1
+                self.queue.put_nowait([index])
+                continue
+            generator._observe_output_tokens(item_usage)
+            self.print_panel(index, d, section, item_usage)
+            await self.finish(index, CoTRecord(index, d, section, item_usage))
+
+
 class CoTDatasetGenerator(BaseDatasetGenerator):
     """A class for generating CoT dataset using Google's GenAI API with search and Chain of Thought (CoT) capabilities."""
 
     def __init__(self,
-                 google_api_key: str,
+                 google_api_key: Optional[str],
                  model_id: str,
                  role: str,
                  user_query: str,
-                 max_output_tokens: int = 2048) -> None:
+                 max_output_tokens: int = 2048,
+                 rpm: Optional[float] = None,
+                 tpm: Optional[float] = None,
+                 cache: Optional[ResponseCache] = None,
+                 backend: Optional[LLMBackend] = None,
+                 verbosity: str = "progress",
+                 panel_every: int = 0,
+                 search_output: str = "text") -> None:
         """
         Initialise the CoTDatasetGenerator class with the necessary parameters to generate CoT ds.
         Very important for the step where you will push your dataset to HF,
@@ -97,11 +494,24 @@ class CoTDatasetGenerator(BaseDatasetGenerator):
             >>> ds['train']
 
         Args:
-            google_api_key (str): The API key for accessing Google's GenAI services.
+            google_api_key (Optional[str]): The API key for accessing Google's GenAI services, not needed with `backend`.
             model_id (str): The identifier for the generative model to use.
             role (str): The expert role to define the context (e.g., 'political', 'technical') in system instruction for google search.
             user_query (str): The user's query to process.
             max_output_tokens (int): The maximum number of tokens in the generated output.
+            rpm (Optional[float]): Requests per minute allowed for the API key, None means no limit.
+            tpm (Optional[float]): Tokens per minute allowed for the API key, None means no limit.
+            cache (Optional[ResponseCache]): Opt-in on-disk cache of responses for `searching` and `get_result`,
+                e.g. `ResponseCache("snail_cache.sqlite")`. Identical requests are then answered without API calls.
+            backend (Optional[LLMBackend]): The model API to use, defaults to the GenAI API with `google_api_key`.
+                Pass a `FakeBackend` to run the pipeline offline, e.g. for load tests.
+            verbosity (str): Output of `get_result`: "quiet" for none, "progress" for a live status line,
+                "debug" to also print the full panel of every response.
+            panel_every (int): With "progress", also print the full panel of every n-th entry, 0 for none.
+            search_output (str): Format returned by `searching`: "text" for the numbered list of the search, "json" to
+                turn it into a list of {title, problem} objects constrained by `LISTING_SCHEMA`, with a second
+                request without the search tool (Gemini rejects a response schema together with tools).
+                `extract_listings` parses both.
 
         Raises:
             ValueError: If any required parameter is missing, empty, or invalid.
@@ -112,13 +522,31 @@ class CoTDatasetGenerator(BaseDatasetGenerator):
         self.role = role
         self.user_query = user_query
         self.max_output_tokens = max_output_tokens
+        self.rate_limiter = RateLimiter(rpm=rpm, tpm=tpm)  # Shared by searching and get_result
+        self.concurrency_controller = AdaptiveConcurrency()  # Adapts requests in flight of get_result
+        self.retry_policy = RetryPolicy()  # Retries transient errors of get_result
+        self.report = RunReport()  # Timings, requests and tokens of every stage, exportable with `report.to_json()`
+        self.cache = cache
+        self.verbosity = verbosity
+        self.panel_every = panel_every
+        self.search_output = search_output
+        self.deduplicate = True  # Send entries equal after normalisation only once in get_result
+        self.output_guard: Optional[OutputGuard] = None  # Opt-in: stream get_result outputs and abort malformed or runaway ones
+        self._single_flight = SingleFlight()  # Coalesces identical requests in flight
+        self._output_tokens_per_item = 512.0  # Estimate refined with every response, for pack_size="auto"
 
         # Validate input parameters
-        if self.google_api_key is None or self.google_api_key == "":
-            logger.error("API key is missing or empty")
-            raise ValueError("API key is missing or empty")
+        if backend is None:
+            if self.google_api_key is None or self.google_api_key == "":
+                logger.error("API key is missing or empty")
+                raise ValueError("API key is missing or empty")
+            backend = GenAIBackend(api_key=self.google_api_key)  # Initialize GenAI client
+
+        # The GenAI types, datasets and huggingface_hub are imported on first use to keep `import snail.cot_dsgen` fast
+        from google.genai.types import Tool, GoogleSearch
 
-        self.client = genai.Client(api_key=self.google_api_key)  # Initialize GenAI client
+        self.backend = backend
+        self.client = getattr(backend, "client", None)  # The GenAI client, None for other backends
         self.google_search_tool = Tool(google_search=GoogleSearch())  # Set up Google Search tool
 
         if self.model_id is None or self.model_id == "":
@@ -137,6 +565,18 @@ class CoTDatasetGenerator(BaseDatasetGenerator):
             logger.error("Max output tokens must be greater than zero")
             raise ValueError(f"Max output tokens must be greater than zero, got {self.max_output_tokens}")
 
+        if self.search_output not in SEARCH_OUTPUTS:
+            logger.error(f"Search output must be one of {', '.join(SEARCH_OUTPUTS)}")
+            raise ValueError(f"Search output must be one of {', '.join(SEARCH_OUTPUTS)}, got '{self.search_output}'")
+
+        if self.verbosity not in VERBOSITY_LEVELS:
+            logger.error(f"Verbosity must be one of {', '.join(VERBOSITY_LEVELS)}")
+            raise ValueError(f"Verbosity must be one of {', '.join(VERBOSITY_LEVELS)}, got '{self.verbosity}'")
+
+        if self.panel_every is None or self.panel_every < 0:
+            logger.error("Panel interval must not be negative")
+            raise ValueError(f"Panel interval must not be negative, got {self.panel_every}")
+
         # Define system instruction for Google Search tool using the provided role
         self.system_instruction_google_search = f"""You are {self.role} expert with 20 years of experience in this field.
         Over the course of your long career, you have done a lot of research on various topics related to your field.
@@ -152,40 +592,411 @@ class CoTDatasetGenerator(BaseDatasetGenerator):
         Ensure your reasoning is clear, concise.
         """
 
-    def searching(self) -> str:
+    def _search_config(self) -> Any:
+        from google.genai.types import GenerateContentConfig
+
+        return GenerateContentConfig(
+            tools=[self.google_search_tool],
+            response_modalities=['TEXT'],
+            system_instruction=self.system_instruction_google_search,
+            max_output_tokens=self.max_output_tokens,
+        )
+
+    def _structure_config(self, text: str) -> Any:
+        from google.genai.types import GenerateContentConfig
+
+        # No tools: a response schema cannot be combined with the search tool.
+        # The JSON repeats the whole search output, plus the overhead of an object per listing
+        return GenerateContentConfig(
+            system_instruction=STRUCTURE_INSTRUCTION,
+            response_mime_type="application/json",
+            response_schema=LISTING_SCHEMA,
+            max_output_tokens=self.max_output_tokens + JSON_ITEM_OVERHEAD_TOKENS * max(1, len(parse_listings(text))),
+        )
+
+    def searching(self, queries: Optional[List[str]] = None, concurrency: Optional[int] = None) -> Union[str, List[str]]:
         """
         Generate content based on the user query using the Google Search tool.
 
+        Without `queries`, `user_query` is sent once and the raw response is returned, to be parsed with
+        `extract_listings`. With `queries`, see `asearching`: the listings of every query are returned
+        already extracted and deduplicated.
+
+        Example:
+            >>> queries = snail.product_queries("List 20 {topic} problems for {level} students", topic=["algebra", "geometry"], level=["school", "university"])
+            >>> instruction = snail.searching(queries)
+
+        Args:
+            queries (Optional[List[str]]): Queries sent concurrently instead of `user_query`.
+            concurrency (Optional[int]): Fixed number of requests in flight for `queries`, None to adapt it
+                with `concurrency_controller`.
+
         Returns:
-            str: The generated text response from the GenAI model.
+            Union[str, List[str]]: The generated text response from the GenAI model,
+            or the merged listings when `queries` is given.
+
+        Raises:
+            ValueError: If `queries` is empty or `concurrency` is invalid.
         """
-        try:
-            response = self.client.models.generate_content(
-            model=self.model_id,
-            contents=self.user_query,
-            config=GenerateContentConfig(
-                tools=[self.google_search_tool],
-                response_modalities=['TEXT'],
-                system_instruction=self.system_instruction_google_search,
-                max_output_tokens=self.max_output_tokens,
+        if queries is not None:
+            return run_sync(self.asearching(queries, concurrency=concurrency))
+
+        config = self._search_config()
+        cache_key = ResponseCache.key(self.model_id, self.user_query, config) if self.cache is not None else None
+        with self.report.timed("search") as stats:
+            cached = self.cache.get(cache_key) if self.cache is not None else None
+            if cached is not None:
+                stats.items += 1
+                if self.search_output == "json" and cached["text"]:
+                    # The structuring request has its own cache entry
+                    return run_sync(self._astructure(cached["text"], self.concurrency_controller, stats))
+                return cached["text"]
+
+            reserved = self.rate_limiter.acquire()
+            response = None
+            sent_at = time.perf_counter()
+            try:
+                response = self.backend.generate(
+                    model=self.model_id,
+                    contents=self.user_query,
+                    config=config
                 )
-            )
+                if self.cache is not None and response.text is not None:
+                    self.cache.set(cache_key, response.text, response.usage_metadata)
+                stats.items += 1
+            except Exception as e:
+                logger.error(f"Error occurred while searching: {e}")
+                stats.failures += 1
+                return ""
+            finally:
+                usage = getattr(response, "usage_metadata", None)
+                self.report.record_request("search", time.perf_counter() - sent_at, usage)
+                self.rate_limiter.record(usage, reserved)
+
+            if self.search_output == "json" and response.text:
+                return run_sync(self._astructure(response.text, self.concurrency_controller, stats))
             return response.text
-        except Exception as e:
-            logger.error(f"Error occurred while searching: {e}")
+
+    async def _asearch(self, query: str, config: Any, controller: AdaptiveConcurrency, stats: Any) -> str:
+        # One search with retries, structured as JSON with `search_output="json"`, an empty text if it failed
+        text = await self._arequest(query, config, controller, stats)
+        if text:
+            stats.items += 1
+            if self.search_output == "json":
+                return await self._astructure(text, controller, stats)
+        return text
+
+    async def _astructure(self, text: str, controller: AdaptiveConcurrency, stats: Any) -> str:
+        # The search response as a JSON list, or unchanged (for the numbered list parser) if that request
+        # fails or its JSON is invalid, e.g. cut at `max_output_tokens`
+        structured = await self._arequest(text, self._structure_config(text), controller, stats)
+        if structured and self._parse_json_listings(structured):
+            return structured
+        if structured:
+            logger.warning("Structured search response has no valid listings, keeping the search text")
+        return text
+
+    async def _arequest(self, query: str, config: Any, controller: AdaptiveConcurrency, stats: Any) -> str:
+        # One request of the search stage with retries, an empty text if it failed
+        cache_key = ResponseCache.key(self.model_id, query, config) if self.cache is not None else None
+        cached = self.cache.get(cache_key) if self.cache is not None else None
+        if cached is not None:
+            return cached["text"]
+
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                async with RequestSlot(self.report, "search", controller, self.rate_limiter) as slot:
+                    response = await self.backend.agenerate(model=self.model_id, contents=query, config=config)
+                    slot.usage, slot.succeeded = getattr(response, "usage_metadata", None), True
+            except Exception as e:
+                if not self.retry_policy.should_retry(e, attempt):
+                    logger.error(f"Error occurred while searching '{query}' after {attempt} attempt(s): {e}")
+                    stats.failures += 1
+                    return ""
+                backoff = self.retry_policy.backoff(attempt)
+                logger.warning(f"Attempt {attempt} failed for query '{query}', retrying in {backoff:.1f}s: {e}")
+                stats.retries += 1
+                await asyncio.sleep(backoff)  # The slot is released while waiting
+                continue
+            if self.cache is not None and response.text is not None:
+                self.cache.set(cache_key, response.text, response.usage_metadata)
+            return response.text or ""
+
+    async def asearching(self, queries: List[str], concurrency: Optional[int] = None) -> List[str]:
+        """
+        Asynchronously send several search queries and merge their listings.
+
+        Queries are sent at the same time, paced by the generator's `rate_limiter` and by
+        `concurrency_controller`; transient errors are retried according to `retry_policy`.
+        Every response is parsed with `extract_listings`, and listings that are equal to an earlier
+        one, exactly or after normalisation, are dropped. Listings keep the order of the queries.
+
+        Args:
+            queries (List[str]): The queries, e.g. built with `product_queries`.
+            concurrency (Optional[int]): Fixed number of requests in flight, None to adapt it with `concurrency_controller`.
+
+        Returns:
+            List[str]: The unique listings of all queries.
+
+        Raises:
+            ValueError: If `queries` is empty or None, or `concurrency` is invalid.
+        """
+        if not queries:
+            logger.error("Queries are missing or empty")
+            raise ValueError("Queries are missing or empty")
+
+        if concurrency is not None and concurrency <= 0:
+            logger.error("Concurrency must be greater than zero")
+            raise ValueError(f"Concurrency must be greater than zero, got {concurrency}")
+
+        config = self._search_config()
+        controller = AdaptiveConcurrency.fixed(concurrency) if concurrency else self.concurrency_controller
+
+        with self.report.timed("search") as stats:
+            texts = await asyncio.gather(*(self._asearch(query, config, controller, stats) for query in queries))
+
+        # Merged in query order, so the result does not depend on which response came first
+        dedup_index = DedupIndex()
+        listings = []
+        duplicates = 0
+        for text in texts:
+            for listing in self.extract_listings(text) if text else []:
+                if dedup_index.add(listing)[1]:
+                    listings.append(listing)
+                else:
+                    duplicates += 1
+        logger.info(f"Merged {len(listings)} unique listings from {len(queries)} queries, {duplicates} duplicates dropped")
+        return listings
+
+    def searching_pages(self, target: int, page_size: int = 20, digest_size: int = 40,
+                        max_pages: Optional[int] = None) -> List[str]:
+        """
+        Search for a long list page by page, asking each time to continue the list.
+        This is a synchronous wrapper around `asearching_pages`.
+
+        Example:
+            >>> instruction = snail.searching_pages(1000, page_size=25)
+
+        Args:
+            target (int): Number of unique listings to collect.
+            page_size (int): Listings asked for in every request, small enough to fit in `max_output_tokens`.
+            digest_size (int): Most recent listings whose titles are sent back as a reminder of the list.
+            max_pages (Optional[int]): Maximum number of requests, None to stop only on `target` or an empty page.
+
+        Returns:
+            List[str]: The unique listings, at most `target`.
+
+        Raises:
+            ValueError: If `target`, `page_size`, `digest_size` or `max_pages` is invalid.
+        """
+        return run_sync(self.asearching_pages(target, page_size=page_size, digest_size=digest_size, max_pages=max_pages))
+
+    async def asearching_pages(self, target: int, page_size: int = 20, digest_size: int = 40,
+                               max_pages: Optional[int] = None) -> List[str]:
+        """
+        Asynchronously search for a long list page by page.
+
+        Asking for a thousand items in `user_query` gets truncated at `max_output_tokens`, so every request
+        asks for the next `page_size` items only. The request repeats `user_query` with the number of items
+        already listed and a digest of the last `digest_size` ones (their bold names, or first words), so the
+        prompt does not grow with the list. Every page is parsed with `extract_listings` and checked against
+        a `DedupIndex` of the listings seen so far.
+
+        The search stops once `target` unique listings are collected, when a page brings no new listing
+        (the model ran out of items or the request failed), or after `max_pages` requests.
+
+        Args:
+            target (int): Number of unique listings to collect.
+            page_size (int): Listings asked for in every request.
+            digest_size (int): Most recent listings whose titles are sent back as a reminder of the list.
+            max_pages (Optional[int]): Maximum number of requests, None for no limit.
+
+        Returns:
+            List[str]: The unique listings, at most `target`.
+
+        Raises:
+            ValueError: If `target`, `page_size`, `digest_size` or `max_pages` is invalid.
+        """
+        if target <= 0 or page_size <= 0:
+            logger.error("Target and page size must be greater than zero")
+            raise ValueError(f"Target and page size must be greater than zero, got {target} and {page_size}")
+
+        if digest_size < 0 or (max_pages is not None and max_pages <= 0):
+            logger.error("Digest size must not be negative and max pages must be greater than zero")
+            raise ValueError(f"Digest size must not be negative and max pages must be greater than zero, got {digest_size} and {max_pages}")
+
+        config = self._search_config()
+        dedup_index = DedupIndex()
+        listings: List[str] = []
+        pages = 0
+        with self.report.timed("search") as stats:
+            while len(listings) < target and (max_pages is None or pages < max_pages):
+                pages += 1
+                size = min(page_size, target - len(listings))
+                query = self.user_query + CONTINUE_INSTRUCTION.format(
+                    page_size=size,
+                    first=len(listings) + 1,
+                    last=len(listings) + size,
+                    seen_count=len(listings),
+                    digest=self._listing_digest(listings[-digest_size:] if digest_size else []),
+                )
+                text = await self._asearch(query, config, self.concurrency_controller, stats)
+
+                new = 0
+                for listing in self.extract_listings(text) if text else []:
+                    if dedup_index.add(listing)[1]:
+                        listings.append(listing)
+                        new += 1
+                logger.info(f"Page {pages}: {new} new listings, {len(listings)}/{target} collected")
+                if new == 0:
+                    break
+
+        return listings[:target]
+
+    @staticmethod
+    def _listing_digest(listings: List[str]) -> str:
+        # Names of the listings, e.g. "Problem name" of "**Problem name** text", or their first words
+        if not listings:
             return ""
+        names = []
+        for listing in listings:
+            title = _TITLE.search(listing)
+            names.append(title.group(1).strip() if title else " ".join(listing.split()[:8]))
+        return " The last ones are: " + "; ".join(names) + "."
+
+    def searching_stream(self, query: Optional[str] = None) -> Iterator[str]:
+        """
+        Stream a search, yielding every listing as soon as its text is complete.
+        This is a synchronous wrapper around `asearching_stream`.
+
+        Args:
+            query (Optional[str]): The query to send, defaults to `user_query`.
+
+        Yields:
+            str: The unique listings, in the order of the response.
+        """
+        return iterate_sync(self.asearching_stream(query))
+
+    async def asearching_stream(self, query: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Asynchronously stream a search, yielding every listing as soon as its text is complete.
+
+        The response is read chunk by chunk with the backend's `astream` and parsed by a `ListingStreamParser`,
+        so the first listings are available long before the response ends. Passed to `aiter_results`
+        (or `iter_results`), they are sent for generation while the search is still running.
+        The numbered list is parsed even with `search_output="json"`, the structuring request would
+        only start once the search is complete. Listings equal to an earlier
+        one are skipped. The request is paced like `searching`; a transient error is retried according to
+        `retry_policy` if no listing was yielded yet, otherwise the stream ends with the listings received.
+
+        Example:
+            >>> for record in snail.iter_results(snail.asearching_stream()):
+            >>>     print(record.instruction, record.output)
+
+        Args:
+            query (Optional[str]): The query to send, defaults to `user_query`.
+
+        Yields:
+            str: The unique listings, in the order of the response.
+        """
+        query = query or self.user_query
+        config = self._search_config()
+        cache_key = ResponseCache.key(self.model_id, query, config) if self.cache is not None else None
+        dedup_index = DedupIndex()
+        stats = self.report.stage("search")
+        stats.calls += 1
+        started = time.perf_counter()
+        try:
+            cached = self.cache.get(cache_key) if self.cache is not None else None
+            if cached is not None:
+                stats.items += 1
+                for listing in self.extract_listings(cached["text"]) if cached["text"] else []:
+                    if dedup_index.add(listing)[1]:
+                        yield listing
+                return
+
+            attempt = 0
+            while True:
+                attempt += 1
+                parser = ListingStreamParser()
+                chunks: List[str] = []
+                try:
+                    async with RequestSlot(self.report, "search", self.concurrency_controller, self.rate_limiter,
+                                           prompt=query) as slot:
+                        stream = self.backend.astream(model=self.model_id, contents=query, config=config)
+                        try:
+                            async for chunk in stream:
+                                slot.usage = getattr(chunk, "usage_metadata", None) or slot.usage
+                                text = getattr(chunk, "text", None) or ""
+                                slot.received(text)
+                                chunks.append(text)
+                                for listing in parser.feed(text):
+                                    if dedup_index.add(listing)[1]:
+                                        yield listing
+                        finally:
+                            # Also ends the request when the consumer stops early
+                            await stream.aclose()
+                        slot.succeeded = True
+                except Exception as e:
+                    failure = e
+                else:
+                    break
+                if len(dedup_index) or not self.retry_policy.should_retry(failure, attempt):
+                    logger.error(f"Error occurred while streaming the search after {attempt} attempt(s), "
+                                 f"{len(dedup_index)} listings received: {failure}")
+                    stats.failures += 1
+                    return
+                backoff = self.retry_policy.backoff(attempt)
+                logger.warning(f"Attempt {attempt} failed for the streamed search, retrying in {backoff:.1f}s: {failure}")
+                stats.retries += 1
+                await asyncio.sleep(backoff)
+
+            # Like the other search paths, the stage counts responses, not listings
+            stats.items += 1
+            text = "".join(chunks)
+            for listing in parser.close():
+                if dedup_index.add(listing)[1]:
+                    yield listing
+            if self.cache is not None and text:
+                self.cache.set(cache_key, text, slot.usage)
+        finally:
+            stats.seconds += time.perf_counter() - started
+
+    @staticmethod
+    def product_queries(template: str, **axes: List[str]) -> List[str]:
+        """
+        Build one search query for every combination of values, e.g. topics × levels.
+
+        Example:
+            >>> snail.product_queries("List 20 {topic} problems for {level} students", topic=["algebra", "geometry"], level=["school", "university"])
+
+        Args:
+            template (str): The query, with a `{name}` placeholder for every axis.
+            **axes (List[str]): The values of every placeholder.
+
+        Returns:
+            List[str]: The queries, one per combination.
+        """
+        names = list(axes)
+        return [template.format(**dict(zip(names, values))) for values in itertools.product(*(axes[name] for name in names))]
 
     @staticmethod
     def extract_listings(listings: str) -> List[str]:
         """
-        Extract text after markers like \n1., \n2., etc., from the input text and return them as a list.
-        Expected format is \n1. **Problem name** Problem text.
+        Extract the listings of a search response and return them as a list.
+
+        A JSON response (see `search_output="json"`) is parsed as a list of {title, problem} objects, each
+        returned as "**title** problem". Otherwise, and if the JSON is invalid, the text after every numbered
+        marker is returned. Expected format is 1. **Problem name** Problem text, a listing continues on the next
+        lines until the next marker or a blank line, unless the lines after the blank line are indented.
 
         Args:
-            listings (str): The input text containing numbered markers (e.g., '\n1. text').
+            listings (str): The input text containing numbered markers (e.g., '\n1. text') or a JSON list.
 
         Returns:
-            List[str]: A list of strings, each being the text after a numbered marker.
+            List[str]: A list of strings, each being the text of one listing.
 
         Raises:
             ValueError: If `listings` is empty or None.
@@ -194,54 +1005,289 @@ class CoTDatasetGenerator(BaseDatasetGenerator):
             logger.error("Listings is missing or empty")
             raise ValueError("Listings is missing or empty")
 
-        # Use regex to find text following numbered markers and strip trailing whitespace
-        quotes = [quote.rstrip() for quote in re.findall(r'\n\d+\.\s+(.*)', listings)]
+        structured = CoTDatasetGenerator._parse_json_listings(listings)
+        if structured is not None:
+            return structured
+
+        return parse_listings(listings)
+
+    @staticmethod
+    def _parse_json_listings(listings: str) -> Optional[List[str]]:
+        # The listings of a JSON response, None if it is not one, so that the numbered list parser is tried
+        text = _CODE_FENCE.sub('', listings.strip())
+        if not text.startswith(('[', '{')):
+            return None
+        try:
+            items = loads(text)
+        except ValueError:
+            logger.warning("Search response looks like JSON but could not be parsed, falling back to the numbered list")
+            return None
+        if isinstance(items, dict):
+            # Some models wrap the list, e.g. {"problems": [...]}
+            items = next((value for value in items.values() if isinstance(value, list)), None)
+        if not isinstance(items, list):
+            return None
+
+        quotes = []
+        for item in items:
+            if isinstance(item, dict):
+                title = str(item.get("title") or "").strip()
+                problem = str(item.get("problem") or "").strip()
+                quote = f"**{title}** {problem}" if title and problem else title or problem
+            else:
+                quote = str(item).strip()
+            if quote:
+                quotes.append(quote)
         return quotes
 
-    def get_result(self, data: List[str], delay: int = 5) -> List[str]:
+    def get_result(self, data: List[str], delay: Optional[float] = None, concurrency: Optional[int] = None,
+                   journal_path: Optional[str] = None, pack_size: Union[int, str, None] = None) -> List[str]:
         """
         Process a list of data entries using the Chain of Thought (CoT) framework and return results.
+        This is a synchronous wrapper around `aget_result`.
+
+        Args:
+            data (List[str]): List of data entries (e.g., statements or quotes) to analyze.
+            delay (Optional[float]): Deprecated, minimum seconds between two requests. Prefer the `rpm`/`tpm`
+                limits of the generator, which are used when this is None.
+            concurrency (Optional[int]): Fixed number of requests in flight, None to adapt it with `concurrency_controller`.
+            journal_path (Optional[str]): JSONL journal of completed entries. Entries found in it are not sent again.
+            pack_size (Union[int, str, None]): Number of entries sent together in one request, "auto" to choose it
+                from `max_output_tokens`, None to send every entry on its own.
+
+        Returns:
+            List[str]: List of generated text responses for each data entry, in input order.
+
+        Raises:
+            ValueError: If `data` is empty or None, or `concurrency` or `pack_size` is invalid.
+        """
+        return run_sync(self.aget_result(data, delay=delay, concurrency=concurrency, journal_path=journal_path, pack_size=pack_size))
+
+    async def aget_result(self, data: List[str], delay: Optional[float] = None, concurrency: Optional[int] = None,
+                          journal_path: Optional[str] = None, pack_size: Union[int, str, None] = None) -> List[str]:
+        """
+        Asynchronously process a list of data entries using the Chain of Thought (CoT) framework.
+        Collects the records of `aiter_results` back into input order.
 
         Args:
             data (List[str]): List of data entries (e.g., statements or quotes) to analyze.
-            delay (int): Time in seconds to wait between processing each entry to avoid rate limits.
+            delay (Optional[float]): Deprecated, minimum seconds between two requests. Prefer the `rpm`/`tpm`
+                limits of the generator, which are used when this is None.
+            concurrency (Optional[int]): Fixed number of requests in flight, None to adapt it with `concurrency_controller`.
+            journal_path (Optional[str]): JSONL journal of completed entries. Entries found in it are not sent again.
+            pack_size (Union[int, str, None]): Number of entries sent together in one request, "auto" to choose it
+                from `max_output_tokens`, None to send every entry on its own.
 
         Returns:
-            List[str]: List of generated text responses for each data entry.
+            List[str]: List of generated text responses for each data entry, in input order.
 
         Raises:
-            ValueError: If `data` is empty or None.
+            ValueError: If `data` is empty or None, or `concurrency` or `pack_size` is invalid.
+        """
+        results: List[Optional[str]] = [None] * len(data or [])
+        async for record in self.aiter_results(data, delay=delay, concurrency=concurrency, journal_path=journal_path, pack_size=pack_size):
+            results[record.index] = record.output
+
+        # Failed entries are skipped, the rest keep their input order
+        return [result for result in results if result is not None]
+
+    def iter_results(self, data: Union[List[str], AsyncIterable[str]], delay: Optional[float] = None, concurrency: Optional[int] = None,
+                     journal_path: Optional[str] = None, pack_size: Union[int, str, None] = None) -> Iterator[CoTRecord]:
+        """
+        Process data entries like `get_result`, yielding every record as soon as it is completed.
+        This is a synchronous wrapper around `aiter_results`.
+
+        Example:
+            >>> saved_json_file, _ = snail.transform_alpaca_format(snail.iter_results(instruction))
+
+        Args:
+            data (Union[List[str], AsyncIterable[str]]): List of data entries (e.g., statements or quotes) to analyze,
+                or an async iterable of them such as `asearching_stream()`.
+            delay (Optional[float]): Deprecated, minimum seconds between two requests.
+            concurrency (Optional[int]): Fixed number of requests in flight, None to adapt it with `concurrency_controller`.
+            journal_path (Optional[str]): JSONL journal of completed entries. Entries found in it are not sent again.
+            pack_size (Union[int, str, None]): Number of entries sent together in one request, "auto" to choose it
+                from `max_output_tokens`, None to send every entry on its own.
+
+        Yields:
+            CoTRecord: The index, instruction, output and usage of each completed entry, in completion order.
+
+        Raises:
+            ValueError: If `data` is empty or None, or `concurrency` or `pack_size` is invalid.
+        """
+        return iterate_sync(self.aiter_results(data, delay=delay, concurrency=concurrency, journal_path=journal_path, pack_size=pack_size))
+
+    async def aiter_results(self, data: Union[List[str], AsyncIterable[str]], delay: Optional[float] = None, concurrency: Optional[int] = None,
+                            journal_path: Optional[str] = None, pack_size: Union[int, str, None] = None) -> AsyncIterator[CoTRecord]:
+        """
+        Asynchronously process data entries, yielding every record as soon as it is completed.
+
+        Requests are sent at the same time through the async API of `backend`, paced by the generator's
+        RPM/TPM `rate_limiter`. By default the number of requests in flight is adapted by
+        `concurrency_controller`. Entries that are equal after normalisation are sent once and share
+        the output, unless `deduplicate` is False. Entries failing with a transient error are sent
+        again according to `retry_policy`. With `pack_size`, several entries are sent in one request
+        and split back by their `### Item <n>` sections; entries whose section is missing or lacks
+        the <thought>/<answer> tags are sent again on their own. Entries that still fail are not yielded, their indices and the attempts
+        of every entry are recorded in `report.generation`. Workers pause when the consumer falls behind,
+        so memory stays bounded. Progress is shown according to `verbosity`.
+
+        With an `output_guard`, entries sent on their own are streamed and checked as chunks arrive;
+        an output without a <thought> tag, with misordered tags or stuck in a repetition loop is cancelled
+        and the entry sent again, up to `retry_policy.max_attempts` times. Complete outputs that are not
+        valid according to `parse_cot_output` (e.g. an unclosed <answer>) are sent again as well. Time to first token and the
+        estimated tokens saved are recorded in the "generation" stage of `report`.
+
+        `data` may also be an async iterable, e.g. `asearching_stream()`: entries are then sent as soon as
+        they arrive, and their index is their position in the iterable.
+
+        Args:
+            data (Union[List[str], AsyncIterable[str]]): List of data entries (e.g., statements or quotes) to analyze,
+                or an async iterable of them such as `asearching_stream()`.
+            delay (Optional[float]): Deprecated, minimum seconds between two requests.
+            concurrency (Optional[int]): Fixed number of requests in flight, None to adapt it with `concurrency_controller`.
+            journal_path (Optional[str]): JSONL journal of completed entries. Entries found in it are not sent again.
+            pack_size (Union[int, str, None]): Number of entries sent together in one request, "auto" to choose it
+                from `max_output_tokens`, None to send every entry on its own.
+
+        Yields:
+            CoTRecord: The index, instruction, output and usage of each completed entry, in completion order.
+
+        Raises:
+            ValueError: If `data` is empty or None, or `concurrency` or `pack_size` is invalid.
+        """
+        # Entries of an async iterable are added to `data` as they arrive
+        source = data if hasattr(data, "__aiter__") else None
+        if source is not None:
+            data = []
+        elif not data:
+            logger.error("Data is missing or empty")
+            raise ValueError("Data is missing or empty")
+
+        if concurrency is not None and concurrency <= 0:
+            logger.error("Concurrency must be greater than zero")
+            raise ValueError(f"Concurrency must be greater than zero, got {concurrency}")
+
+        if pack_size == "auto":
+            pack_size = choose_pack_size(self.max_output_tokens, self._output_tokens_per_item)
+        elif pack_size is not None and (not isinstance(pack_size, int) or pack_size <= 0):
+            logger.error("Pack size must be a positive integer or 'auto'")
+            raise ValueError(f"Pack size must be a positive integer or 'auto', got {pack_size}")
+        pack_size = pack_size or 1
+
+        # A fixed delay is kept for backward compatibility, it is turned into an equivalent RPM limit
+        rate_limiter = RateLimiter.from_delay(delay) if delay else self.rate_limiter
+        controller = AdaptiveConcurrency.fixed(concurrency) if concurrency else self.concurrency_controller
+        generation = _GenerationRun(self, data, source, pack_size, rate_limiter, controller, journal_path)
+        generation.start()
+        try:
+            for record in generation.resumed.values():
+                yield record
+            while True:
+                item = await generation.outputs.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            generation.stop()
+
+    def get_batch_result(self,
+                         data: List[str],
+                         transport: Optional[BatchTransport] = None,
+                         job_path: Optional[str] = None,
+                         poll_interval: float = 30.0,
+                         timeout: Optional[float] = None) -> List[str]:
+        """
+        Process a list of data entries as one offline batch job instead of interactive requests.
+        The requests are serialised to a JSONL job file, submitted, polled until the job finishes,
+        and the results are mapped back to the entries. Suited for very large runs (100k+ entries).
+
+        Example of usage with a local stand-in for the batch service:
+            >>> transport = LocalBatchTransport(handler=lambda request: {...})
+            >>> output = snail.get_batch_result(instruction, transport=transport, poll_interval=1)
+
+        Args:
+            data (List[str]): List of data entries (e.g., statements or quotes) to analyze.
+            transport (Optional[BatchTransport]): The batch service, defaults to the GenAI batch API.
+            job_path (Optional[str]): File path of the job file, defaults to a timestamped name.
+            poll_interval (float): Seconds between two job state checks.
+            timeout (Optional[float]): Seconds to wait for the job before giving up, None to wait forever.
+
+        Returns:
+            List[str]: List of generated text responses for each data entry, in input order.
+
+        Raises:
+            ValueError: If `data` is empty or None, or no `transport` is given for a non-GenAI backend.
+            TimeoutError: If the job does not finish within `timeout`.
+            RuntimeError: If the job does not succeed.
         """
         if not data:
             logger.error("Data is missing or empty")
             raise ValueError("Data is missing or empty")
 
-        results = []
-        for d in data:
-            try:
-                # Generate content for each data entry using CoT configuration
-                response = self.client.models.generate_content(
-                    model=self.model_id,
-                    config=GenerateContentConfig(
-                        system_instruction=self.system_instruction_cot
-                    ),
-                    contents=d
-                )
-                if response:  # Ensure response is valid before appending
-                    results.append(response.text)
-
-                # Print detailed output
-                panel_content = (
-                    f"[bold]Data:[/bold] {d}\n\n"
-                    f"[bold green]Response:[/bold green] {response.text}\n\n"
-                    f"[bold yellow]Usage tokens:[/bold yellow] {response.usage_metadata}"
-                )
-                console.print(Panel(panel_content, title="CoT Processing Output", expand=False))
-                time.sleep(delay)  # Pause to respect rate limits
-            except Exception as e:
-                # Log errors with consistent f-string formatting
-                logger.error(f"Error occurred while processing data '{data}': {e}")
-        return results
+        if transport is None and self.client is None:
+            logger.error("A batch transport is required when the backend is not the GenAI API")
+            raise ValueError("A batch transport is required when the backend is not the GenAI API")
+        transport = transport or GenAIBatchTransport(self.client)
+        with self.report.timed("batch") as stats:
+            if not job_path:
+                timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
+                job_path = f'batch_job_{timestamp}.jsonl'
+
+            # Entries equal after normalisation are requested once, like in `get_result`
+            dedup_index = DedupIndex()
+            leader_of = [dedup_index.add(d, index)[0] if self.deduplicate else index for index, d in enumerate(data)]
+            leaders = [index for index, leader in enumerate(leader_of) if leader == index]
+            count = write_job_file(job_path, ((str(index), build_request(data[index], self.system_instruction_cot)) for index in leaders))
+
+            job_name = transport.submit(job_path, self.model_id)
+            logger.info(f"Submitted batch job '{job_name}' with {count} requests from '{job_path}'")
+
+            started = time.monotonic()
+            state = transport.poll(job_name)
+            while state not in FINISHED_STATES:
+                if timeout is not None and time.monotonic() - started > timeout:
+                    logger.error(f"Batch job '{job_name}' did not finish within {timeout}s")
+                    raise TimeoutError(f"Batch job '{job_name}' did not finish within {timeout}s")
+                time.sleep(poll_interval)
+                state = transport.poll(job_name)
+
+            if state not in (JOB_STATE_SUCCEEDED, JOB_STATE_PARTIALLY_SUCCEEDED):
+                logger.error(f"Batch job '{job_name}' ended in state {state}")
+                raise RuntimeError(f"Batch job '{job_name}' ended in state {state}")
+
+            results_path = f"{os.path.splitext(job_path)[0]}.results.jsonl"
+            transport.download(job_name, results_path)
+
+            outputs: Dict[int, str] = {}
+            for key, text, usage, error in read_results(results_path):
+                if error is not None:
+                    logger.error(f"Error occurred while processing data '{data[int(key)]}' in batch job: {error}")
+                    continue
+                outputs[int(key)] = text
+                self._observe_output_tokens(usage_from_dict(usage))
+                # Requests of a job have no latency of their own, the job time is the stage time
+                self.report.record_request("batch", None, usage_from_dict(usage))
+
+            results = [outputs.get(leader) for leader in leader_of]
+            self.report.generation = GenerationStats(
+                attempts=[1 if leader == index else 0 for index, leader in enumerate(leader_of)],
+                failed=[index for index, result in enumerate(results) if result is None],
+                deduplicated=len(data) - len(leaders),
+            )
+            stats.items += len(data) - len(self.report.generation.failed)
+            stats.failures += len(self.report.generation.failed)
+
+            # Failed entries are skipped, the rest keep their input order
+            return [result for result in results if result is not None]
+
+    def _observe_output_tokens(self, usage: Any) -> None:
+        # Moving average of output tokens per entry, used to choose the pack size
+        tokens = (getattr(usage, "candidates_token_count", None) or 0) + (getattr(usage, "thoughts_token_count", None) or 0)
+        if tokens:
+            self._output_tokens_per_item = 0.9 * self._output_tokens_per_item + 0.1 * tokens
 
     def create_ds(self, instruction: List[str], output: List[str]) -> Dict[str, str]:
         """
@@ -263,78 +1309,216 @@ class CoTDatasetGenerator(BaseDatasetGenerator):
 
         return dict(zip(instruction, output))
 
-    def transform_alpaca_format(self, dataset: Dict[str, str]) -> Tuple[str, List[Dict[str, str]]]:
+    def transform_alpaca_format(self,
+                                dataset: Union[Dict[str, str], Iterable[CoTRecord]],
+                                output_format: str = "jsonl",
+                                keep_data: bool = True,
+                                split_output: bool = False) -> Tuple[str, List[Dict[str, str]]]:
         """
-        Transform a dictionary dataset into Alpaca format and save to a JSON file.
+        Transform a dictionary dataset into Alpaca format and stream it to a JSON Lines (or JSON) file.
+
+        Example:
+            >>> saved_file, _ = snail.transform_alpaca_format(snail.iter_results(instruction), keep_data=False)
 
         Args:
-            dataset (Dict[str, str]): A dictionary of instructions and outputs.
+            dataset (Union[Dict[str, str], Iterable[CoTRecord]]): A dictionary of instructions and outputs,
+                or records as they are produced by `iter_results`.
+            output_format (str): "jsonl" to write one entry per line as it arrives, "json" for the indented
+                JSON array written by earlier versions, "parquet" for a directory of zstd-compressed Parquet shards.
+            keep_data (bool): Also return the transformed entries. Pass False for large datasets,
+                memory then stays flat whatever the number of entries.
+            split_output (bool): Parse every output with `parse_cot_output` and add its "thought" and "answer"
+                fields next to the raw "output". Outputs with missing, duplicated or unclosed tags are
+                logged and left out, so they are not uploaded.
 
         Returns:
             Tuple[str, List[Dict]]:
-            - The filename of the saved JSON file
-            - The list of transformed data entries
+            - The filename of the saved file, or the directory of the Parquet shards
+            - The list of transformed data entries, empty if `keep_data` is False
 
         Raises:
-            ValueError: If `dataset` is empty or None.
+            ValueError: If `dataset` is empty or None, `output_format` is unknown, or no output could be parsed with `split_output`.
         """
         if not dataset:
             logger.error("Dataset is missing or empty")
             raise ValueError("Dataset is missing or empty")
 
-        # Transform the data
-        transformed_data = []
-        for instruction, output in dataset.items():
-            transformed_pair = {
-                "instruction": instruction,
-                "input": "",
-                "output": output
-            }
-            transformed_data.append(transformed_pair)
+        with self.report.timed("transform", record_latency=True) as stats:
+            # Generate output filename with timestamp
+            timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
+            output_file = f'transformed_qa_{timestamp}' + ("" if output_format == "parquet" else f'.{output_format}')
+            writer = open_writer(output_file, output_format)
 
-        # Generate output filename with timestamp
-        timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
-        output_file = f'transformed_qa_{timestamp}.json'
-
-        # Write the transformed data
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(transformed_data, f, ensure_ascii=False, indent=2)
+            # Transform and write the data entry by entry
+            transformed_data = []
+            left_out = 0
+            malformed = None  # An output left out by `split_output`, shown if no entry is left
+            try:
+                for transformed_pair in self._alpaca_entries(dataset):
+                    if split_output:
+                        parsed = parse_cot_output(transformed_pair["output"])
+                        if not parsed.valid:
+                            logger.warning(f"Invalid output for '{transformed_pair['instruction']}' left out: {', '.join(parsed.errors)}")
+                            stats.failures += 1
+                            left_out += 1
+                            malformed = malformed or parsed
+                            continue
+                        transformed_pair = {**transformed_pair, "thought": parsed.thought, "answer": parsed.answer}
+                    writer.write(transformed_pair)
+                    if keep_data:
+                        transformed_data.append(transformed_pair)
+            finally:
+                # Entries written before an error are kept, JSON Lines and Parquet shards stay readable
+                writer.close()
+
+            if writer.count == 0 and malformed is not None:
+                remove_output(writer)
+                logger.error(f"All {left_out} outputs failed to parse, e.g. ({', '.join(malformed.errors)}): {malformed.raw[:300]!r}")
+                raise ValueError(f"All {left_out} outputs failed to parse with split_output=True, none were written")
+            if writer.count == 0:
+                remove_output(writer)
+                logger.error("Dataset is missing or empty")
+                raise ValueError("Dataset is missing or empty")
+            stats.items += writer.count
 
         return output_file, transformed_data
 
-    def push_to_hf(self, json_path: str, repo_id: str) -> None:
+    @staticmethod
+    def _alpaca_entries(dataset: Union[Dict[str, str], Iterable[Any]]) -> Iterator[Dict[str, str]]:
+        # Records are consumed one by one as they are generated, Alpaca entries are passed through
+        if isinstance(dataset, dict):
+            for instruction, output in dataset.items():
+                yield {"instruction": instruction, "input": "", "output": output}
+            return
+        for item in dataset:
+            if isinstance(item, dict):
+                yield item
+            else:
+                yield {"instruction": item.instruction, "input": "", "output": item.output}
+
+    def _build_hf_dataset(self, json_path: Optional[str], data: Any) -> Any:
+        from datasets import Dataset, load_dataset
+
+        # A fingerprint is given, otherwise `datasets` hashes the whole table to compute one
+        fingerprint = uuid.uuid4().hex
+        if data is not None:
+            import pyarrow
+
+            # Built in memory, without writing, re-parsing and caching an intermediate file
+            table = data if isinstance(data, pyarrow.Table) else records_to_table(self._alpaca_entries(data))
+            return Dataset(table, fingerprint=fingerprint)
+        if os.path.isdir(json_path):
+            import pyarrow.parquet
+
+            # The shards are memory-mapped rather than copied into the datasets cache
+            return Dataset(pyarrow.parquet.read_table(json_path, memory_map=True), fingerprint=fingerprint)
+        return load_dataset("json", data_files=json_path)
+
+    def push_to_hf(self, json_path: Optional[str], repo_id: str, data: Any = None) -> None:
         """
         Push a JSON dataset and its dataset card to a new Hugging Face dataset repository.
 
+        Example:
+            >>> snail.push_to_hf(None, repo_id="HF username/Repo name", data=snail.iter_results(instruction))
+
         Args:
-            json_path (str): File path to the JSON file containing the dataset.
+            json_path (Optional[str]): File path to the JSON (or JSON Lines) file containing the dataset,
+                or the directory of Parquet shards written by `transform_alpaca_format`. Not needed with `data`.
             repo_id (str): Repository identifier in the format 'username/reponame'.
+            data (Any): The dataset in memory instead of a file: a dictionary of instructions and outputs,
+                records of `iter_results`, the entries returned by `transform_alpaca_format`, or a `pyarrow.Table`.
 
         Raises:
-            ValueError: If `json_path` or `repo_id` is empty or None.
+            ValueError: If both `json_path` and `data` are missing, or `repo_id` is empty or None.
         """
 
-        if not json_path:
-            logger.error("The JSON file path must be provided and cannot be empty.")
-            raise ValueError("The JSON file path must be provided and cannot be empty.")
+        if not json_path and data is None:
+            logger.error("The JSON file path or the data must be provided and cannot be empty.")
+            raise ValueError("The JSON file path or the data must be provided and cannot be empty.")
         if not repo_id:
             logger.error("The repository ID must be provided and cannot be empty.")
             raise ValueError("The repository ID must be provided and cannot be empty.")
 
-        try:
-            url = create_repo(repo_id=repo_id, repo_type="dataset")
-            username, _ = repo_id.split('/')
+        from huggingface_hub import create_repo, DatasetCard
 
-            content = DATASET_CARD.format(
-                username = username,
-            )
-            card = DatasetCard(content)
-            card.push_to_hub(repo_id)
+        with self.report.timed("push", record_latency=True) as stats:
+            try:
+                url = create_repo(repo_id=repo_id, repo_type="dataset", exist_ok=True)
+                username, _ = repo_id.split('/')
+
+                content = DATASET_CARD.format(
+                    username = username,
+                )
+                card = DatasetCard(content)
+                card.push_to_hub(repo_id)
 
-            dataset = load_dataset("json", data_files=json_path)
-            dataset.push_to_hub(repo_id)
+                dataset = self._build_hf_dataset(json_path, data)
+                dataset.push_to_hub(repo_id)
 
-            panel_content = f"Congratulations on creating a new dataset. [link={url}]Click here to view it[/link]"
-            console.print(Panel(panel_content, title="Success", style="green"))
-        except Exception as e:
-            logger.error(f"Error occurred while pushing dataset: {e}")
+                panel_content = f"Congratulations on creating a new dataset. [link={url}]Click here to view it[/link]"
+                console.print(Panel(panel_content, title="Success", style="green"))
+            except Exception as e:
+                logger.error(f"Error occurred while pushing dataset: {e}")
+                stats.failures += 1
+
+    def stream_to_hf(self,
+                     data: Union[Dict[str, str], Iterable[Any]],
+                     repo_id: str,
+                     client: Optional[HubClient] = None,
+                     work_dir: str = ".snail_shards",
+                     rows_per_shard: int = 10_000,
+                     flush_interval: float = 600.0) -> List[str]:
+        """
+        Mirror a dataset to a Hugging Face dataset repository while it is generated.
+
+        Entries are uploaded as Parquet shards every `rows_per_shard` entries or `flush_interval` seconds,
+        in the background. Running again with the same `work_dir` (and the `journal_path` of the generation)
+        skips the entries already uploaded, so a crash costs at most one shard.
+
+        Example:
+            >>> snail.stream_to_hf(snail.iter_results(instruction, journal_path="run_journal.jsonl"), repo_id="HF username/Repo name")
+
+        Args:
+            data (Union[Dict[str, str], Iterable[Any]]): Records of `iter_results`, a dictionary of instructions
+                and outputs, or Alpaca entries.
+            repo_id (str): Repository identifier in the format 'username/reponame', created if needed.
+            client (Optional[HubClient]): The hub to upload to, defaults to the Hugging Face Hub.
+                Pass a `LocalHubClient` to mirror to a local directory instead.
+            work_dir (str): Directory of the local shards and of the upload manifest.
+            rows_per_shard (int): Entries per shard.
+            flush_interval (float): Seconds after which a shard is uploaded even if it is not full.
+
+        Returns:
+            List[str]: The paths in the repository of the shards uploaded by this call.
+
+        Raises:
+            ValueError: If `data` is None or `repo_id` is empty or None.
+        """
+        if data is None:
+            logger.error("Data is missing or empty")
+            raise ValueError("Data is missing or empty")
+        if not repo_id:
+            logger.error("The repository ID must be provided and cannot be empty.")
+            raise ValueError("The repository ID must be provided and cannot be empty.")
+
+        client = client or HFHubClient()
+        with self.report.timed("push", record_latency=True) as stats:
+            uploader = ShardUploader(client, repo_id, work_dir=work_dir, rows_per_shard=rows_per_shard,
+                                     flush_interval=flush_interval)
+            try:
+                if "README.md" not in client.list_files(repo_id):
+                    card_path = os.path.join(work_dir, "README.md")
+                    with open(card_path, 'w', encoding='utf-8') as f:
+                        f.write(DATASET_CARD.format(username=repo_id.split('/')[0]))
+                    client.commit(repo_id, {"README.md": card_path}, "Add dataset card")
+
+                for entry in self._alpaca_entries(data):
+                    uploader.write(entry)
+            finally:
+                uploader.close()
+                stats.items += uploader.count - uploader.skipped
+                stats.failures += len(uploader.failed)
+
+        if uploader.failed:
+            logger.error(f"{len(uploader.failed)} shard(s) were not uploaded, run again with work_dir='{work_dir}' to retry them")
+        return uploader.uploaded
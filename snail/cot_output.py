@@ -0,0 +1,79 @@
+import re
+from typing import List, NamedTuple, Optional, Tuple
+
+
+# Tags of a CoT output, in the only order they may appear
+TAG_ORDER = ("<thought>", "</thought>", "<answer>", "</answer>")
+TAG = re.compile(r'<(/?)(thought|answer)>')
+
+
+class CoTOutput(NamedTuple):
+    """A CoT output split into its sections."""
+
+    thought: str  # Text of the <thought> section, stripped
+    answer: str  # Text of the <answer> section, stripped
+    raw: str  # The complete output
+    errors: Tuple[str, ...]  # Problems found, empty if the output is valid
+
+    @property
+    def valid(self) -> bool:
+        """bool: True if the output has exactly one closed <thought> section followed by one closed <answer> section."""
+        return not self.errors
+
+
+def parse_cot_output(text: Optional[str]) -> CoTOutput:
+    """
+    Split a CoT output into its <thought> and <answer> sections and validate its structure, in a single pass.
+
+    Missing, duplicated, misordered and unclosed tags are reported in `errors`. The sections that
+    could be read are still returned, e.g. the text of an unclosed <answer> up to the end of the output.
+
+    Example:
+        >>> parsed = parse_cot_output("<thought>2 + 2</thought><answer>4</answer>")
+        >>> parsed.answer, parsed.valid
+        ('4', True)
+
+    Args:
+        text (Optional[str]): The output of the model.
+
+    Returns:
+        CoTOutput: The sections, the raw text and the errors.
+    """
+    text = text or ""
+    sections = {"thought": None, "answer": None}
+    errors: List[str] = []
+    open_name: Optional[str] = None  # Section being read
+    open_end = 0  # End of its opening tag
+    position = 0  # Tags seen in the expected order so far
+
+    for tag in TAG.finditer(text):
+        closing, name = tag.group(1) == "/", tag.group(2)
+        if closing:
+            if open_name != name:
+                errors.append(f"</{name}> without <{name}>" if sections[name] is None else f"duplicated </{name}>")
+                continue
+            if sections[name] is None:  # The first section is kept when a tag is duplicated
+                sections[name] = text[open_end:tag.start()].strip()
+            open_name = None
+        else:
+            if open_name is not None:
+                errors.append(f"unclosed <{open_name}>")
+                if sections[open_name] is None:
+                    sections[open_name] = text[open_end:tag.start()].strip()
+            if sections[name] is not None:
+                errors.append(f"duplicated <{name}>")
+            open_name, open_end = name, tag.end()
+        if position < len(TAG_ORDER) and tag.group(0) == TAG_ORDER[position]:
+            position += 1
+        elif not errors:
+            errors.append(f"{tag.group(0)} out of order")
+
+    if open_name is not None:
+        errors.append(f"unclosed <{open_name}>")
+        if sections[open_name] is None:
+            sections[open_name] = text[open_end:].strip()
+    for name in ("thought", "answer"):
+        if sections[name] is None:
+            errors.append(f"missing <{name}>")
+
+    return CoTOutput(sections["thought"] or "", sections["answer"] or "", text, tuple(errors))
@@ -0,0 +1,131 @@
+import re
+import asyncio
+import unicodedata
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+# Markdown emphasis and code spans (`**x**`, `__x__`, `*x*`, `_x_`, `` `x` ``) opened and closed at word boundaries,
+# so that operators like `12*34`, `a_b` or `5 > 3` are kept
+_EMPHASIS = re.compile(r'(?<![\w*`])(\*\*|__|\*|_|`+)(?=\S)(.+?)(?<=\S)\1(?![\w*`])')
+# Heading and quote markers at the start of a line
+_LINE_MARKERS = re.compile(r'^[ \t]*(?:#{1,6}|>+)[ \t]*', re.MULTILINE)
+_SPACES = re.compile(r'\s+')
+_EDGE_PUNCTUATION = ' \t\n.,;:!?-"\'()[]{}'
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise a text so that entries differing only in formatting compare equal.
+    Applies Unicode NFKC, case folding, removes Markdown emphasis and heading/quote markers, collapses whitespace
+    and strips punctuation at both ends.
+
+    Args:
+        text (str): The text to normalise.
+
+    Returns:
+        str: The normalised text.
+    """
+    text = unicodedata.normalize('NFKC', text).casefold()
+    text = _LINE_MARKERS.sub('', text)
+    for _ in range(2):  # Twice for nested emphasis, e.g. ***x***
+        text = _EMPHASIS.sub(r'\2', text)
+    text = _SPACES.sub(' ', text)
+    return text.strip(_EDGE_PUNCTUATION)
+
+
+class DedupIndex:
+    """Index of seen texts, matching both exact and normalised duplicates in constant time."""
+
+    def __init__(self) -> None:
+        self._exact: Dict[str, int] = {}
+        self._normalized: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._normalized)
+
+    def __contains__(self, text: str) -> bool:
+        return self.find(text) is not None
+
+    def find(self, text: str) -> Optional[int]:
+        """
+        Look up the first text equal to `text`, exactly or after normalisation.
+
+        Args:
+            text (str): The text to look up.
+
+        Returns:
+            Optional[int]: The id given to the first occurrence, or None if the text is new.
+        """
+        found = self._exact.get(text)
+        if found is None:
+            found = self._normalized.get(normalize_text(text))
+        return found
+
+    def add(self, text: str, item_id: Optional[int] = None) -> Tuple[int, bool]:
+        """
+        Add a text to the index unless an equal one is already there.
+
+        Args:
+            text (str): The text to add.
+            item_id (Optional[int]): The id of the text, defaults to the number of unique texts.
+
+        Returns:
+            Tuple[int, bool]: The id of the first occurrence, and True if `text` was new.
+        """
+        found = self.find(text)
+        if found is not None:
+            self._exact.setdefault(text, found)
+            return found, False
+
+        item_id = len(self._normalized) if item_id is None else item_id
+        self._exact[text] = item_id
+        self._normalized[normalize_text(text)] = item_id
+        return item_id, True
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls: while a call for a key is in flight, others await its result."""
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run `call` unless a call with the same key is already in flight.
+
+        Args:
+            key (str): The identity of the call.
+            call (Callable[[], Awaitable[Any]]): Starts the call.
+
+        Returns:
+            Tuple[Any, bool]: The result, and True if it was shared from a call already in flight.
+
+        Raises:
+            Exception: The error raised by the call, for every caller sharing it.
+        """
+        future = self._calls.get(key)
+        while future is not None:
+            try:
+                return await asyncio.shield(future), True
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # The call in flight was cancelled, not this caller: run it again
+                future = self._calls.get(key)
+
+        future = asyncio.get_running_loop().create_future()
+        self._calls[key] = future
+        try:
+            result = await call()
+            future.set_result(result)
+            return result, False
+        except BaseException as e:
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                # The exception is re-raised here, followers retrieve their own copy
+                future.exception()
+            raise
+        finally:
+            del self._calls[key]
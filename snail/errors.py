@@ -0,0 +1,69 @@
+from typing import Optional
+
+
+# HTTP status codes and gRPC status names that mean "the API is overloaded, slow down"
+OVERLOAD_CODES = {429, 503}
+OVERLOAD_STATUSES = {"RESOURCE_EXHAUSTED", "UNAVAILABLE"}
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """
+    Read the HTTP status code of an API error.
+
+    Args:
+        error (BaseException): The exception raised by the GenAI client.
+
+    Returns:
+        Optional[int]: The HTTP status code, or None if the error does not carry one.
+    """
+    for attribute in ("code", "status_code"):
+        code = getattr(error, attribute, None)
+        if isinstance(code, int):
+            return code
+
+    response = getattr(error, "response", None)
+    code = getattr(response, "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_overload(error: BaseException) -> bool:
+    """
+    Check whether an error means the API is rate limiting or temporarily unavailable (429/503).
+
+    Args:
+        error (BaseException): The exception raised by the GenAI client.
+
+    Returns:
+        bool: True if the request should be sent again later at a lower rate.
+    """
+    if status_code(error) in OVERLOAD_CODES:
+        return True
+    return str(getattr(error, "status", "")).upper() in OVERLOAD_STATUSES
+
+
+# Transport level errors of the HTTP clients used by the GenAI SDK, matched by name
+TRANSIENT_ERROR_NAMES = ("Timeout", "TransportError", "NetworkError", "RemoteProtocolError")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Check whether an error is transient, so the same request may succeed when sent again.
+    Rate limits (429), request timeouts (408), server errors (5xx), timeouts and
+    connection errors are retryable, any other error is fatal.
+
+    Args:
+        error (BaseException): The exception raised by the GenAI client.
+
+    Returns:
+        bool: True if the request should be retried.
+    """
+    if is_overload(error):
+        return True
+
+    code = status_code(error)
+    if code is not None:
+        return code == 408 or 500 <= code < 600
+
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return any(name in cls.__name__ for cls in type(error).__mro__ for name in TRANSIENT_ERROR_NAMES)
@@ -0,0 +1,140 @@
+import logging
+from collections import Counter, deque
+from typing import Deque, List, Optional, Tuple
+
+from .cot_output import TAG, TAG_ORDER
+
+
+logger = logging.getLogger('OutputGuard')
+
+# Characters kept from the end of a chunk, enough to find a tag split over two chunks
+_TAG_TAIL = len("</thought>") - 1
+
+
+class OutputAborted(Exception):
+    """Raised when a streamed output is cancelled by an `OutputGuard`."""
+
+    def __init__(self, reason: str, text: str, tokens: int, tokens_saved: int) -> None:
+        super().__init__(f"Output aborted after {tokens} tokens: {reason}")
+        self.reason = reason
+        self.text = text  # The output received before the abort
+        self.tokens = tokens  # Output tokens received
+        self.tokens_saved = tokens_saved  # Estimated output tokens not generated thanks to the abort
+
+
+class OutputGuard:
+    """
+    Settings of the checks run on streamed CoT outputs, see `monitor`.
+
+    An output is aborted when it does not open a <thought> section within `tag_deadline` characters,
+    when its tags are out of order or repeated (e.g. <answer> before </thought>, a second <thought>),
+    or when the same `ngram` words come back more than `max_repeats` times within the last `window` words,
+    which is how runaway generation loops look.
+    """
+
+    def __init__(self, tag_deadline: int = 200, ngram: int = 8, window: int = 512, max_repeats: int = 4) -> None:
+        """
+        Initialise the guard.
+
+        Args:
+            tag_deadline (int): Characters allowed before the opening <thought> tag, 0 to not check the tags.
+            ngram (int): Number of consecutive words compared by the repetition check.
+            window (int): Number of most recent words in which repetitions are counted, 0 to not check repetitions.
+            max_repeats (int): Occurrences of the same n-gram allowed within the window.
+
+        Raises:
+            ValueError: If a value is negative, or `ngram` or `max_repeats` is smaller than one.
+        """
+        if tag_deadline < 0 or window < 0 or ngram < 1 or max_repeats < 1:
+            logger.error("Tag deadline and window must not be negative, n-gram and max repeats must be at least one")
+            raise ValueError(f"Invalid guard settings: tag_deadline={tag_deadline}, ngram={ngram}, "
+                             f"window={window}, max_repeats={max_repeats}")
+        self.tag_deadline = tag_deadline
+        self.ngram = ngram
+        self.window = window
+        self.max_repeats = max_repeats
+
+    def monitor(self) -> "OutputMonitor":
+        """
+        Start checking a new output.
+
+        Returns:
+            OutputMonitor: The monitor to feed with the chunks of the output.
+        """
+        return OutputMonitor(self)
+
+
+class OutputMonitor:
+    """Checks one streamed output as its chunks arrive, in time proportional to the chunk size."""
+
+    def __init__(self, guard: OutputGuard) -> None:
+        self.guard = guard
+        self.text_length = 0  # Characters received
+        self.words = 0  # Complete words received
+        self.looping = False  # True once the repetition check fired, the output would have run to its limit
+        self._tags: List[str] = []  # Tags seen, in order
+        self._tag_tail = ""  # End of the text after the last tag, for tags split over two chunks
+        self._prefix = ""  # Text before the first tag, at most `tag_deadline` characters and a chunk
+        self._partial_word = ""  # Last word of the text received, if it may continue in the next chunk
+        self._recent: Deque[str] = deque(maxlen=guard.ngram)  # The last `ngram` words
+        self._window: Deque[Tuple[str, ...]] = deque()  # N-grams of the last `window` words
+        self._counts: Counter = Counter()
+
+    def feed(self, chunk: str) -> Optional[str]:
+        """
+        Check the next chunk of the output.
+
+        Args:
+            chunk (str): The next chunk of text.
+
+        Returns:
+            Optional[str]: Why the output should be aborted, None if it looks fine so far.
+        """
+        if not chunk:
+            return None
+        self.text_length += len(chunk)
+        return self._check_tags(chunk) or self._check_repetition(chunk)
+
+    def _check_tags(self, chunk: str) -> Optional[str]:
+        if not self.guard.tag_deadline:
+            return None
+        text = self._tag_tail + chunk
+        last_end = 0
+        for tag in TAG.finditer(text):
+            last_end = tag.end()
+            self._tags.append(tag.group(0))
+            if len(self._tags) > len(TAG_ORDER) or self._tags[-1] != TAG_ORDER[len(self._tags) - 1]:
+                return f"unexpected {tag.group(0)} tag"
+        self._tag_tail = text[max(last_end, len(text) - _TAG_TAIL):]
+
+        if not self._tags:
+            self._prefix += chunk
+            if len(self._prefix.lstrip()) > self.guard.tag_deadline:
+                return f"no <thought> tag in the first {self.guard.tag_deadline} characters"
+        return None
+
+    def _check_repetition(self, chunk: str) -> Optional[str]:
+        text = self._partial_word + chunk
+        words = text.split()
+        # The last word may continue in the next chunk
+        self._partial_word = words.pop() if words and not text[-1].isspace() else ""
+        self.words += len(words)
+        if not self.guard.window:
+            return None
+
+        for word in words:
+            self._recent.append(word)
+            if len(self._recent) < self.guard.ngram:
+                continue
+            gram = tuple(self._recent)
+            self._window.append(gram)
+            self._counts[gram] += 1
+            if len(self._window) > self.guard.window:
+                oldest = self._window.popleft()
+                self._counts[oldest] -= 1
+                if not self._counts[oldest]:
+                    del self._counts[oldest]
+            if self._counts[gram] > self.guard.max_repeats:
+                self.looping = True
+                return f"'{' '.join(gram)}' repeated {self._counts[gram]} times in the last {len(self._window)} words"
+        return None
@@ -0,0 +1,369 @@
+import os
+import json
+import time
+import queue
+import shutil
+import hashlib
+import logging
+import threading
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set
+
+from .retry import RetryPolicy
+from .writers import DatasetWriter, records_to_table
+
+
+logger = logging.getLogger('HubUploader')
+
+# Marks the end of the uploads in the queue of `ShardUploader`
+_CLOSE = object()
+
+
+class HubClient(ABC):
+    """The operations of a dataset hub needed to mirror shards: repositories, file listings and commits."""
+
+    @abstractmethod
+    def create_repo(self, repo_id: str) -> str:
+        """
+        Create a dataset repository, or do nothing if it already exists.
+
+        Args:
+            repo_id (str): Repository identifier in the format 'username/reponame'.
+
+        Returns:
+            str: The URL of the repository.
+        """
+        pass
+
+    @abstractmethod
+    def list_files(self, repo_id: str) -> Set[str]:
+        """
+        List the files of a repository.
+
+        Args:
+            repo_id (str): Repository identifier.
+
+        Returns:
+            Set[str]: The paths of the files in the repository.
+        """
+        pass
+
+    @abstractmethod
+    def commit(self, repo_id: str, files: Dict[str, str], message: str) -> None:
+        """
+        Add files to a repository in one commit.
+
+        Args:
+            repo_id (str): Repository identifier.
+            files (Dict[str, str]): Local file path of every path in the repository.
+            message (str): The commit message.
+        """
+        pass
+
+
+class HFHubClient(HubClient):
+    """Client of the Hugging Face Hub."""
+
+    def __init__(self, api: Any = None, token: Optional[str] = None) -> None:
+        """
+        Initialise the client.
+
+        Args:
+            api (Any): An existing `huggingface_hub.HfApi`, used instead of creating one.
+            token (Optional[str]): The Hugging Face token, None to use the one saved by `huggingface-cli login`.
+        """
+        if api is None:
+            from huggingface_hub import HfApi
+            api = HfApi(token=token)
+        self.api = api
+
+    def create_repo(self, repo_id: str) -> str:
+        return str(self.api.create_repo(repo_id=repo_id, repo_type="dataset", exist_ok=True))
+
+    def list_files(self, repo_id: str) -> Set[str]:
+        return set(self.api.list_repo_files(repo_id=repo_id, repo_type="dataset"))
+
+    def commit(self, repo_id: str, files: Dict[str, str], message: str) -> None:
+        from huggingface_hub import CommitOperationAdd
+
+        operations = [CommitOperationAdd(path_in_repo=path, path_or_fileobj=local) for path, local in files.items()]
+        self.api.create_commit(repo_id=repo_id, operations=operations, commit_message=message, repo_type="dataset")
+
+
+class LocalHubClient(HubClient):
+    """
+    File-based stand-in for the Hub, for offline runs and tests.
+    Every repository is a directory under `root`; commits are logged to its `.commits.jsonl`.
+    """
+
+    _COMMITS = ".commits.jsonl"
+
+    def __init__(self, root: str = ".snail_hub") -> None:
+        """
+        Initialise the client.
+
+        Args:
+            root (str): Directory holding the repositories.
+        """
+        self.root = root
+        self._lock = threading.Lock()
+
+    def _repo_dir(self, repo_id: str) -> str:
+        return os.path.join(self.root, *repo_id.split('/'))
+
+    def create_repo(self, repo_id: str) -> str:
+        os.makedirs(self._repo_dir(repo_id), exist_ok=True)
+        return f"file://{os.path.abspath(self._repo_dir(repo_id))}"
+
+    def list_files(self, repo_id: str) -> Set[str]:
+        repo_dir = self._repo_dir(repo_id)
+        if not os.path.isdir(repo_dir):
+            logger.error(f"Repository '{repo_id}' not found")
+            raise ValueError(f"Repository '{repo_id}' not found")
+        files = set()
+        for directory, _, names in os.walk(repo_dir):
+            for name in names:
+                path = os.path.relpath(os.path.join(directory, name), repo_dir).replace(os.sep, '/')
+                if path != self._COMMITS:
+                    files.add(path)
+        return files
+
+    def commit(self, repo_id: str, files: Dict[str, str], message: str) -> None:
+        repo_dir = self._repo_dir(repo_id)
+        if not os.path.isdir(repo_dir):
+            logger.error(f"Repository '{repo_id}' not found")
+            raise ValueError(f"Repository '{repo_id}' not found")
+        with self._lock:
+            # Files are copied next to their destination and renamed, so a crash leaves no partial file
+            for path, local in files.items():
+                destination = os.path.join(repo_dir, *path.split('/'))
+                os.makedirs(os.path.dirname(destination), exist_ok=True)
+                shutil.copyfile(local, destination + ".tmp")
+                os.replace(destination + ".tmp", destination)
+            with open(os.path.join(repo_dir, self._COMMITS), 'a', encoding='utf-8') as f:
+                f.write(json.dumps({"message": message, "files": sorted(files), "time": time.time()}) + "\n")
+
+
+def record_digest(record: Dict[str, Any]) -> str:
+    """
+    Hash a record, to recognise it when a later run yields it again.
+
+    Args:
+        record (Dict[str, Any]): The record.
+
+    Returns:
+        str: A 16 hex digit digest of its values.
+    """
+    content = "\0".join(str(record[name]) for name in sorted(record))
+    return hashlib.blake2b(content.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ShardUploader(DatasetWriter):
+    """
+    Mirrors records to a Hub repository while they are generated.
+
+    Records are cut into zstd-compressed Parquet shards every `rows_per_shard` records or
+    `flush_interval` seconds, even when no new record arrives. A background thread commits the
+    shards waiting for upload together, so shards are batched into fewer commits when uploads are
+    slower than generation.
+
+    Shards are named by the SHA-256 of their content. Every shard is recorded in a local manifest
+    before it is committed. Running again with the same `work_dir` skips records that are already
+    in the repository, and commits the shards left pending by a crash. A crash costs at most the
+    records of the shard being filled, and the generation journal replays those.
+    """
+
+    MANIFEST = "manifest.jsonl"
+
+    def __init__(self,
+                 client: HubClient,
+                 repo_id: str,
+                 work_dir: str = ".snail_shards",
+                 rows_per_shard: int = 10_000,
+                 flush_interval: float = 600.0,
+                 split: str = "train",
+                 retry_policy: Optional[RetryPolicy] = None) -> None:
+        """
+        Create the repository if needed and start the upload thread.
+
+        Args:
+            client (HubClient): The hub to upload to, e.g. `HFHubClient()` or `LocalHubClient()`.
+            repo_id (str): Repository identifier in the format 'username/reponame'.
+            work_dir (str): Directory of the local shards and of the manifest, reused to resume.
+            rows_per_shard (int): A shard is cut after this many records.
+            flush_interval (float): A shard is also cut when this many seconds passed since the last one.
+            split (str): Name of the split, used as the prefix of the shard files.
+            retry_policy (Optional[RetryPolicy]): Retries failed commits, defaults to `RetryPolicy()`.
+
+        Raises:
+            ValueError: If `rows_per_shard` or `flush_interval` is not positive.
+        """
+        if rows_per_shard <= 0 or flush_interval <= 0:
+            logger.error("Rows per shard and flush interval must be greater than zero")
+            raise ValueError(f"Rows per shard and flush interval must be greater than zero, got {rows_per_shard} and {flush_interval}")
+
+        self.client = client
+        self.repo_id = repo_id
+        self.path = work_dir
+        self.rows_per_shard = rows_per_shard
+        self.flush_interval = flush_interval
+        self.split = split
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.count = 0  # Records written by this run, including skipped ones
+        self.bytes_written = 0
+        self.skipped = 0  # Records already in the repository
+        self.uploaded: List[str] = []  # Shard paths committed by this run
+        self.failed: List[str] = []  # Shard paths that could not be committed, retried by the next run
+
+        os.makedirs(work_dir, exist_ok=True)
+        self.url = client.create_repo(repo_id)
+        self._rows: List[Dict[str, Any]] = []
+        self._last_cut = time.monotonic()
+        self._rows_lock = threading.Lock()  # The upload thread cuts shards too, on `flush_interval`
+        self._closed = False
+        self._manifest_lock = threading.Lock()
+        self._seen: Set[str] = set()
+        pending = self._load_manifest()
+
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread = threading.Thread(target=self._upload_loop, name="snail-hub-uploader", daemon=True)
+        self._thread.start()
+        for entry in pending:
+            self._queue.put(entry)
+
+    def _load_manifest(self) -> List[Dict[str, Any]]:
+        # Shards found in the repository are done, shards still on disk were pending when a run stopped
+        path = os.path.join(self.path, self.MANIFEST)
+        if not os.path.exists(path):
+            return []
+        remote = self.client.list_files(self.repo_id)
+        entries: Dict[str, Dict[str, Any]] = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Line cut by a crash
+                entries[entry["path"]] = entry
+
+        pending = []
+        for entry in entries.values():
+            local = os.path.join(self.path, os.path.basename(entry["path"]))
+            if entry["path"] in remote:
+                self._seen.update(entry["records"])
+            elif os.path.exists(local):
+                # Kept when the commit failed or the run stopped before it
+                self._seen.update(entry["records"])
+                pending.append(entry)
+        logger.info(f"Resuming uploads to '{self.repo_id}': {len(self._seen)} records already mirrored, {len(pending)} shards pending")
+        return pending
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self.count += 1
+        digest = record_digest(record)
+        if digest in self._seen:
+            self.skipped += 1
+            return
+        self._seen.add(digest)
+        with self._rows_lock:
+            self._rows.append(record)
+            full = len(self._rows) >= self.rows_per_shard
+        if full:
+            self._cut_shard()
+
+    def _until_cut(self) -> float:
+        # Seconds until the records buffered since the last cut are due
+        return max(0.0, self._last_cut + self.flush_interval - time.monotonic())
+
+    def _cut_shard(self, only_if_due: bool = False) -> None:
+        # Shards are written under the lock, so the writer and the upload thread never cut at the same time
+        with self._rows_lock:
+            if only_if_due and self._until_cut() > 0:
+                return  # Cut by the writer in the meantime
+            self._last_cut = time.monotonic()
+            if not self._rows:
+                return
+            rows, self._rows = self._rows, []
+            self._write_shard(rows)
+
+    def _write_shard(self, rows: List[Dict[str, Any]]) -> None:
+        import pyarrow.parquet
+
+        staging = os.path.join(self.path, f".staging-{os.getpid()}.parquet")
+        pyarrow.parquet.write_table(records_to_table(rows), staging, compression="zstd")
+        digest = hashlib.sha256()
+        with open(staging, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        sha256 = digest.hexdigest()
+        name = f"{self.split}-{sha256[:16]}.parquet"
+        os.replace(staging, os.path.join(self.path, name))
+        self.bytes_written += os.path.getsize(os.path.join(self.path, name))
+
+        entry = {"path": f"data/{name}", "sha256": sha256, "rows": len(rows), "records": [record_digest(r) for r in rows]}
+        # Recorded before the commit, so a crash after a successful commit does not upload the records twice
+        with self._manifest_lock, open(os.path.join(self.path, self.MANIFEST), 'a', encoding='utf-8') as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._queue.put(entry)
+
+    def _upload_loop(self) -> None:
+        closing = False
+        while not closing:
+            try:
+                batch = [self._queue.get(timeout=self._until_cut())]
+            except queue.Empty:
+                # No shard for `flush_interval` seconds, cut one from the records buffered since the last
+                self._cut_shard(only_if_due=True)
+                continue
+            # Shards that piled up during the last commit go together in the next one
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _CLOSE in batch:
+                closing = True
+                batch = [entry for entry in batch if entry is not _CLOSE]
+            if batch:
+                self._commit(batch)
+
+    def _commit(self, batch: List[Dict[str, Any]]) -> None:
+        files = {entry["path"]: os.path.join(self.path, os.path.basename(entry["path"])) for entry in batch}
+        rows = sum(entry["rows"] for entry in batch)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                # A shard committed by an earlier attempt (or run) has the same name and content
+                remote = self.client.list_files(self.repo_id)
+                missing = {path: local for path, local in files.items() if path not in remote}
+                if missing:
+                    self.client.commit(self.repo_id, missing, f"Add {len(missing)} shard(s) with {rows} rows")
+                self.uploaded.extend(files)
+                for local in files.values():
+                    os.remove(local)  # The manifest is enough to skip them from now on
+                logger.info(f"Uploaded {len(files)} shard(s) with {rows} rows to '{self.repo_id}'")
+                return
+            except Exception as e:
+                if not self.retry_policy.should_retry(e, attempt):
+                    logger.error(f"Error occurred while uploading {len(files)} shard(s) to '{self.repo_id}', they are kept for the next run: {e}")
+                    self.failed.extend(files)
+                    return
+                backoff = self.retry_policy.backoff(attempt)
+                logger.warning(f"Upload attempt {attempt} to '{self.repo_id}' failed, retrying in {backoff:.1f}s: {e}")
+                time.sleep(backoff)
+
+    def flush(self) -> None:
+        """Cut a shard from the buffered records and queue it for upload."""
+        self._cut_shard()
+
+    def close(self) -> None:
+        """Upload the buffered records and wait until every shard is committed."""
+        if self._closed:
+            return
+        self._closed = True
+        self._cut_shard()
+        self._queue.put(_CLOSE)
+        self._thread.join()
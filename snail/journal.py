@@ -0,0 +1,130 @@
+import os
+import json
+import hashlib
+import logging
+from typing import Any, Dict, Optional
+
+from .records import usage_to_dict
+
+
+logger = logging.getLogger('Journal')
+
+
+def item_key(instruction: str, system_instruction: str, model_id: str) -> str:
+    """
+    Compute the content hash identifying a generated entry.
+
+    Args:
+        instruction (str): The data entry sent to the model.
+        system_instruction (str): The system instruction used to generate the output.
+        model_id (str): The identifier of the generative model.
+
+    Returns:
+        str: The hexadecimal SHA-256 of the three values.
+    """
+    payload = json.dumps([model_id, system_instruction, instruction], ensure_ascii=False)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Journal:
+    """
+    Append-only JSONL journal of completed entries, used to resume an interrupted run.
+    Every line holds the key, instruction, output and usage of one entry. Writes are
+    flushed and fsync'd every `fsync_every` entries and when the journal is closed.
+    """
+
+    def __init__(self, path: str, fsync_every: int = 32) -> None:
+        """
+        Initialise the journal. The file is created when the first entry is appended.
+
+        Args:
+            path (str): File path of the JSONL journal.
+            fsync_every (int): Number of entries written between two fsync calls.
+
+        Raises:
+            ValueError: If `path` is empty or `fsync_every` is not positive.
+        """
+        if not path:
+            logger.error("Journal path is missing or empty")
+            raise ValueError("Journal path is missing or empty")
+        if fsync_every <= 0:
+            logger.error("Fsync interval must be greater than zero")
+            raise ValueError(f"Fsync interval must be greater than zero, got {fsync_every}")
+
+        self.path = path
+        self.fsync_every = fsync_every
+        self._file = None
+        self._unsynced = 0
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Read the entries journaled by previous runs.
+        A partially written last line (the process died while writing it) is ignored.
+
+        Returns:
+            Dict[str, Dict[str, Any]]: The journaled entries by key.
+        """
+        entries: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return entries
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line_number, line in enumerate(f, 1):
+                try:
+                    entry = json.loads(line)
+                    entries[entry["key"]] = entry
+                except (json.JSONDecodeError, KeyError, TypeError):
+                    logger.warning(f"Skipping corrupted line {line_number} of journal '{self.path}'")
+        return entries
+
+    def append(self, key: str, instruction: str, output: str, usage: Any = None) -> None:
+        """
+        Record a completed entry.
+
+        Args:
+            key (str): The `item_key` of the entry.
+            instruction (str): The data entry sent to the model.
+            output (str): The generated text response.
+            usage (Any): The `usage_metadata` of the response.
+        """
+        if self._file is None:
+            self._file = open(self.path, 'a+', encoding='utf-8')
+            self._terminate_partial_line()
+
+        entry = {"key": key, "instruction": instruction, "output": output, "usage": usage_to_dict(usage)}
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._unsynced += 1
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+
+    def _terminate_partial_line(self) -> None:
+        # Start on a new line if the previous run died in the middle of writing one
+        size = self._file.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        with open(self.path, 'rb') as f:
+            f.seek(size - 1)
+            if f.read(1) != b"\n":
+                self._file.write("\n")
+
+    def sync(self) -> None:
+        """Flush buffered entries and fsync them to disk."""
+        if self._file is None or self._unsynced == 0:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self) -> None:
+        """Sync and close the journal file."""
+        if self._file is None:
+            return
+        self.sync()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info: Optional[Any]) -> None:
+        self.close()
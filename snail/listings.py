@@ -0,0 +1,96 @@
+import re
+from typing import List, Optional
+
+
+# Start of a numbered listing, `1. ` at the start of a line; indented numbers are steps of the listing in progress
+_LISTING_MARKER = re.compile(r'^\d+\.[ \t]+', re.MULTILINE)
+_BLANK_LINES = re.compile(r'\n[ \t]*\n')
+
+
+def _listing_text(text: str) -> str:
+    # A blank line ends the listing, unless the next paragraph is indented like a list continuation
+    paragraphs = _BLANK_LINES.split(text)
+    kept = [paragraphs[0]]
+    for paragraph in paragraphs[1:]:
+        if not paragraph[:1].isspace():
+            break
+        kept.append(paragraph)
+    return "\n".join(line.strip() for line in "\n".join(kept).splitlines() if line.strip())
+
+
+class ListingStreamParser:
+    """
+    Incremental parser of numbered listings, fed with the chunks of a streamed response.
+
+    A listing starts with a `1. ` marker at the start of a line and is complete once the next marker
+    arrives, or when the response ends. It continues on the next lines until then, including indented
+    numbered steps, or until a blank line that is not followed by an indented paragraph. Every listing is returned once, as soon as it is complete.
+    Only the text of the listing in progress is kept, so feeding a chunk costs the same however long the response is.
+    """
+
+    def __init__(self) -> None:
+        self.text_length = 0  # Characters received
+        self._buffer = ""  # From the marker of the listing in progress, or the last line before the first marker
+        self._text_start: Optional[int] = None  # Start of the text of the listing in progress in `_buffer`
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Add a chunk of the response.
+
+        Args:
+            chunk (str): The next chunk of text.
+
+        Returns:
+            List[str]: The listings completed by this chunk.
+        """
+        if not chunk:
+            return []
+        self.text_length += len(chunk)
+        # A marker may be split over two chunks, the last (incomplete) line is scanned again
+        scan_from = self._buffer.rfind("\n") + 1
+        if self._text_start is not None:
+            scan_from = max(scan_from, self._text_start)
+        self._buffer += chunk
+
+        listings = []
+        for marker in _LISTING_MARKER.finditer(self._buffer, scan_from):
+            if self._text_start is not None:
+                listing = _listing_text(self._buffer[self._text_start:marker.start()])
+                if listing:
+                    listings.append(listing)
+            self._text_start = marker.end()
+
+        if self._text_start is None:
+            # Text before the first listing is not needed, except the last line that may start one
+            self._buffer = self._buffer[self._buffer.rfind("\n") + 1:]
+        else:
+            line_start = self._buffer.rfind("\n", 0, self._text_start) + 1
+            self._buffer = self._buffer[line_start:]
+            self._text_start -= line_start
+        return listings
+
+    def close(self) -> List[str]:
+        """
+        End the response.
+
+        Returns:
+            List[str]: The last listing, if any.
+        """
+        listing = _listing_text(self._buffer[self._text_start:]) if self._text_start is not None else ""
+        self._buffer = ""
+        self._text_start = None
+        return [listing] if listing else []
+
+
+def parse_listings(text: str) -> List[str]:
+    """
+    Parse the numbered listings of a complete response, see `ListingStreamParser`.
+
+    Args:
+        text (str): The response text.
+
+    Returns:
+        List[str]: The text of every listing.
+    """
+    parser = ListingStreamParser()
+    return parser.feed(text) + parser.close()
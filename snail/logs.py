@@ -0,0 +1,54 @@
+import sys
+import logging
+from typing import Optional, TextIO
+
+
+LOG_FORMAT = '%(asctime)s : %(name)s : %(levelname)s : %(message)s'
+LOG_DATEFMT = "%m-%d-%Y %H:%M:%S"
+
+# Names of the loggers used by the Snail modules
+SNAIL_LOGGERS = (
+    "CoTDatasetGenerator",
+    "LLMBackend",
+    "AdaptiveConcurrency",
+    "RateLimiter",
+    "RetryPolicy",
+    "ResponseCache",
+    "Journal",
+    "BatchTransport",
+    "ProgressDisplay",
+    "DatasetWriter",
+    "HubUploader",
+    "OutputGuard",
+)
+
+
+def configure_logging(level: int = logging.INFO, stream: Optional[TextIO] = None) -> logging.Handler:
+    """
+    Print the logs of the Snail loggers, without changing the root logger or third-party libraries.
+    Without this, only warnings and errors are printed (by Python's last resort handler).
+
+    Example:
+        >>> from snail.logs import configure_logging
+        >>> configure_logging(logging.DEBUG)
+
+    Args:
+        level (int): The lowest level printed, e.g. `logging.DEBUG`.
+        stream (Optional[TextIO]): The stream the logs are written to, stderr by default.
+
+    Returns:
+        logging.Handler: The handler attached to the Snail loggers.
+    """
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, datefmt=LOG_DATEFMT))
+    handler.set_name("snail")
+
+    for name in SNAIL_LOGGERS:
+        logger = logging.getLogger(name)
+        # Calling this again replaces the handler instead of printing every line twice
+        for existing in [h for h in logger.handlers if h.get_name() == "snail"]:
+            logger.removeHandler(existing)
+        logger.addHandler(handler)
+        logger.setLevel(level)
+        logger.propagate = False
+    return handler
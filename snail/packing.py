@@ -0,0 +1,98 @@
+import re
+from types import SimpleNamespace
+from typing import Any, List, Optional
+
+from .cot_output import parse_cot_output
+
+
+# Appended to the CoT system instruction when several entries are sent in one request
+PACKED_INSTRUCTION = """
+You will receive several independent problems. Each one starts with a line `### Item <number>`.
+Solve every problem separately and in the same order. Start the response to each problem with the same
+`### Item <number>` line, followed by the complete response in the format described above.
+"""
+
+_ITEM_HEADER = re.compile(r'^[ \t]*#{2,4}[ \t]*Item[ \t]+(\d+)[ \t]*:?[ \t]*$', re.MULTILINE | re.IGNORECASE)
+
+# Share of `max_output_tokens` a pack may fill, the rest is headroom for longer than average outputs
+PACK_HEADROOM = 0.75
+
+
+def pack_prompt(items: List[str]) -> str:
+    """
+    Join several entries into one prompt, each under its own `### Item <n>` header.
+
+    Args:
+        items (List[str]): The data entries to pack.
+
+    Returns:
+        str: The packed prompt.
+    """
+    return "\n\n".join(f"### Item {number}\n{item}" for number, item in enumerate(items, 1))
+
+
+def split_packed_response(text: Optional[str], count: int) -> List[Optional[str]]:
+    """
+    Split the response to a packed prompt back into one output per entry.
+
+    Args:
+        text (Optional[str]): The text of the packed response.
+        count (int): The number of packed entries.
+
+    Returns:
+        List[Optional[str]]: The output of every entry, None where the section is missing,
+        duplicated, or is not a valid <thought>/<answer> output (see `parse_cot_output`).
+    """
+    sections: List[Optional[str]] = [None] * count
+    if not text:
+        return sections
+
+    seen = set()
+    headers = list(_ITEM_HEADER.finditer(text))
+    for position, header in enumerate(headers):
+        number = int(header.group(1))
+        end = headers[position + 1].start() if position + 1 < len(headers) else len(text)
+        if not 1 <= number <= count or number in seen:
+            # An unknown or repeated item number makes both sections ambiguous
+            if 1 <= number <= count:
+                sections[number - 1] = None
+            continue
+        seen.add(number)
+
+        section = text[header.end():end].strip()
+        sections[number - 1] = section if parse_cot_output(section).valid else None
+    return sections
+
+
+def split_usage(usage: Any, count: int) -> SimpleNamespace:
+    """
+    Attribute an equal share of a packed response's token usage to each entry.
+
+    Args:
+        usage (Any): The `usage_metadata` of the packed response.
+        count (int): The number of packed entries.
+
+    Returns:
+        SimpleNamespace: The token counts of one entry.
+    """
+    names = ("prompt_token_count", "candidates_token_count", "thoughts_token_count", "total_token_count")
+    return SimpleNamespace(**{
+        name: (getattr(usage, name, None) or 0) // count for name in names
+    })
+
+
+def choose_pack_size(max_output_tokens: int, tokens_per_item: float, max_pack_size: int = 16) -> int:
+    """
+    Choose how many entries fit in one request without hitting `max_output_tokens`.
+
+    Args:
+        max_output_tokens (int): The output token limit of a request.
+        tokens_per_item (float): The expected output tokens of one entry.
+        max_pack_size (int): The largest pack allowed.
+
+    Returns:
+        int: The pack size, at least 1.
+    """
+    if tokens_per_item <= 0:
+        return 1
+    return max(1, min(max_pack_size, int(max_output_tokens * PACK_HEADROOM // tokens_per_item)))
@@ -0,0 +1,156 @@
+import time
+import logging
+import threading
+from collections import deque
+from typing import Any, Callable, Deque, Optional, Tuple
+
+from rich.console import Console
+from rich.errors import LiveError
+from rich.live import Live
+from rich.progress_bar import ProgressBar
+from rich.table import Table
+
+
+logger = logging.getLogger('ProgressDisplay')
+
+# "quiet" prints nothing, "progress" shows one live status line (and sampled panels),
+# "debug" also prints the full panel of every completed entry
+VERBOSITY_LEVELS = ("quiet", "progress", "debug")
+
+
+def _format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+
+class ProgressDisplay:
+    """
+    Live status of a generation run: done, failed and in-flight entries, RPM, TPM and ETA.
+
+    Counters are plain attributes updated by the run; the display reads them at most
+    `refresh_per_second` times per second, so its cost does not grow with the number of entries.
+    """
+
+    def __init__(self,
+                 total: int,
+                 console: Console,
+                 in_flight: Callable[[], int] = lambda: 0,
+                 enabled: bool = True,
+                 refresh_per_second: float = 4.0) -> None:
+        """
+        Initialise the display.
+
+        Args:
+            total (int): The number of entries of the run.
+            console (Console): The console the display is drawn on.
+            in_flight (Callable[[], int]): Returns the number of requests in flight.
+            enabled (bool): False to only keep the counters, e.g. for quiet runs.
+            refresh_per_second (float): Upper bound of the redraw rate.
+        """
+        self.total = total
+        self.console = console
+        self.in_flight = in_flight
+        self.enabled = enabled
+        self.refresh_per_second = refresh_per_second
+
+        self.done = 0
+        self.failed = 0
+        self._initial = 0  # Entries done before the run started, not counted in the rate
+        self._started = time.monotonic()
+        # Finish time and tokens of the requests of the last minute, read by the drawing thread
+        self._requests: Deque[Tuple[float, int]] = deque()
+        self._lock = threading.Lock()
+        self._live: Optional[Live] = None
+
+    def start(self, done: int = 0) -> None:
+        """
+        Start drawing the display.
+
+        Args:
+            done (int): Entries already done when the run starts, e.g. resumed from a journal.
+        """
+        self.done = self._initial = done
+        self._started = time.monotonic()
+        if not self.enabled:
+            return
+        try:
+            self._live = Live(self, console=self.console, refresh_per_second=self.refresh_per_second, transient=False)
+            self._live.start()
+        except LiveError:
+            # Another run already draws on this console, e.g. two concurrent `get_result` calls
+            logger.debug("A live display is already active, progress of this run is not shown")
+            self._live = None
+
+    def stop(self) -> None:
+        """Draw the final state and stop the display."""
+        if self._live is not None:
+            self._live.stop()
+            self._live = None
+
+    def advance(self, done: int = 0, failed: int = 0) -> None:
+        """
+        Count finished entries.
+
+        Args:
+            done (int): Entries completed with an output.
+            failed (int): Entries that ended without an output.
+        """
+        self.done += done
+        self.failed += failed
+
+    def request(self, tokens: Optional[int]) -> None:
+        """
+        Count a finished request for the RPM and TPM rates.
+
+        Args:
+            tokens (Optional[int]): The total tokens of the request, None if unknown.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._requests.append((now, tokens or 0))
+            self._forget_old_requests(now)
+
+    def _forget_old_requests(self, now: float) -> None:
+        while self._requests and now - self._requests[0][0] > 60:
+            self._requests.popleft()
+
+    def rates(self) -> Tuple[float, float]:
+        """
+        Compute the request and token rates of the last minute.
+
+        Returns:
+            Tuple[float, float]: Requests per minute and tokens per minute.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._forget_old_requests(now)
+            requests = len(self._requests)
+            tokens = sum(count for _, count in self._requests)
+        # Scale up during the first minute so the values are comparable to per-minute quotas
+        window = min(60.0, max(now - self._started, 1.0))
+        return requests * 60.0 / window, tokens * 60.0 / window
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Optional[float]: Estimated seconds until every entry is finished, None before the first one."""
+        finished = self.done + self.failed - self._initial
+        if finished <= 0:
+            return None
+        remaining = self.total - self.done - self.failed
+        return remaining * (time.monotonic() - self._started) / finished
+
+    def __rich__(self) -> Any:
+        rpm, tpm = self.rates()
+        eta = self.eta
+        grid = Table.grid(padding=(0, 1))
+        grid.add_row(
+            ProgressBar(total=self.total, completed=self.done + self.failed, width=30),
+            f"[bold]{self.done}[/bold]/{self.total} done",
+            f"[red]{self.failed} failed[/red]",
+            f"{self.in_flight()} in flight",
+            f"{rpm:.0f} RPM",
+            f"{tpm:,.0f} TPM",
+            f"ETA {_format_duration(eta) if eta is not None else '-'}",
+        )
+        return grid
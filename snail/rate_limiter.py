@@ -0,0 +1,214 @@
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Optional, Tuple
+
+
+logger = logging.getLogger('RateLimiter')
+
+
+class TokenBucket:
+    """A token bucket that refills continuously and lets callers reserve capacity ahead of time."""
+
+    def __init__(self, capacity: float, refill_per_second: float) -> None:
+        """
+        Initialise a full token bucket.
+
+        Args:
+            capacity (float): The maximum number of tokens the bucket can hold.
+            refill_per_second (float): How many tokens are added back every second.
+
+        Raises:
+            ValueError: If `capacity` or `refill_per_second` is not positive.
+        """
+        if capacity <= 0 or refill_per_second <= 0:
+            logger.error("Bucket capacity and refill rate must be greater than zero")
+            raise ValueError(f"Bucket capacity and refill rate must be greater than zero, got {capacity} and {refill_per_second}")
+
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take `amount` tokens from the bucket, allowing the balance to go negative.
+
+        Args:
+            amount (float): The number of tokens to take.
+
+        Returns:
+            float: Seconds the caller has to wait until the reserved tokens are actually available.
+        """
+        self._refill()
+        self.tokens -= amount
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.refill_per_second
+
+    def adjust(self, amount: float) -> None:
+        """
+        Correct an earlier reservation by taking (positive) or giving back (negative) tokens.
+
+        Args:
+            amount (float): The number of tokens to take from the bucket.
+        """
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute limiter shared by every request a generator sends."""
+
+    def __init__(self,
+                 rpm: Optional[float] = None,
+                 tpm: Optional[float] = None,
+                 estimated_tokens: int = 1000) -> None:
+        """
+        Initialise the rate limiter. A limit set to None is not enforced.
+
+        Token usage is only known after a response arrives, so every request reserves an estimate
+        (the running average of observed usage) which is corrected by `record` once the
+        response's `usage_metadata` is available.
+
+        Args:
+            rpm (Optional[float]): Maximum requests per minute.
+            tpm (Optional[float]): Maximum tokens (prompt + output) per minute.
+            estimated_tokens (int): Initial estimate of tokens used by one request.
+
+        Raises:
+            ValueError: If a limit or `estimated_tokens` is not positive.
+        """
+        if rpm is not None and rpm <= 0:
+            logger.error("Requests per minute must be greater than zero")
+            raise ValueError(f"Requests per minute must be greater than zero, got {rpm}")
+        if tpm is not None and tpm <= 0:
+            logger.error("Tokens per minute must be greater than zero")
+            raise ValueError(f"Tokens per minute must be greater than zero, got {tpm}")
+        if estimated_tokens <= 0:
+            logger.error("Estimated tokens must be greater than zero")
+            raise ValueError(f"Estimated tokens must be greater than zero, got {estimated_tokens}")
+
+        self.rpm = rpm
+        self.tpm = tpm
+        self.estimated_tokens = float(estimated_tokens)
+        self.request_bucket = TokenBucket(rpm, rpm / 60) if rpm else None
+        self.token_bucket = TokenBucket(tpm, tpm / 60) if tpm else None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_delay(cls, delay: float) -> "RateLimiter":
+        """
+        Build a limiter equivalent to waiting `delay` seconds between requests.
+
+        Args:
+            delay (float): Seconds between two requests.
+
+        Returns:
+            RateLimiter: A limiter allowing one request every `delay` seconds.
+        """
+        limiter = cls(rpm=60 / delay)
+        # Start with a single request in the bucket so that no burst happens
+        limiter.request_bucket.capacity = 1
+        limiter.request_bucket.tokens = 1
+        return limiter
+
+    def reserve(self, tokens: Optional[float] = None) -> Tuple[float, float]:
+        """
+        Reserve one request and `tokens` tokens.
+
+        Args:
+            tokens (Optional[float]): Tokens to reserve, defaults to the running estimate.
+
+        Returns:
+            Tuple[float, float]: Seconds to wait before sending, and the number of tokens reserved.
+        """
+        with self._lock:
+            reserved = self.estimated_tokens if tokens is None else tokens
+            wait = 0.0
+            if self.request_bucket is not None:
+                wait = max(wait, self.request_bucket.reserve(1))
+            if self.token_bucket is not None:
+                wait = max(wait, self.token_bucket.reserve(reserved))
+            return wait, reserved
+
+    def acquire(self, tokens: Optional[float] = None) -> float:
+        """
+        Block until a request may be sent.
+
+        Args:
+            tokens (Optional[float]): Tokens to reserve, defaults to the running estimate.
+
+        Returns:
+            float: The number of tokens reserved, to be passed to `record`.
+        """
+        wait, reserved = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return reserved
+
+    async def aacquire(self, tokens: Optional[float] = None) -> float:
+        """
+        Wait without blocking the event loop until a request may be sent.
+
+        Args:
+            tokens (Optional[float]): Tokens to reserve, defaults to the running estimate.
+
+        Returns:
+            float: The number of tokens reserved, to be passed to `record`.
+        """
+        wait, reserved = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return reserved
+
+    def record(self, usage_metadata: Any, reserved: float, spent: Optional[float] = None) -> None:
+        """
+        Correct the token reservation of a finished request with its real usage.
+
+        Args:
+            usage_metadata (Any): The `usage_metadata` of the response, or None if the request failed.
+            reserved (float): The number of tokens returned by `acquire`/`aacquire`.
+            spent (Optional[float]): Estimated tokens consumed when `usage_metadata` is None, e.g. by a stream
+                cancelled before its usage arrived. None if the request consumed no tokens.
+        """
+        used = total_tokens(usage_metadata)
+        with self._lock:
+            if used is None:
+                # Charge what the request consumed, the rest of the reservation is given back
+                if self.token_bucket is not None:
+                    self.token_bucket.adjust((spent or 0) - reserved)
+                return
+
+            if self.token_bucket is not None:
+                self.token_bucket.adjust(used - reserved)
+            # Exponential moving average of usage for the next reservations
+            self.estimated_tokens = 0.8 * self.estimated_tokens + 0.2 * used
+
+
+def total_tokens(usage_metadata: Any) -> Optional[int]:
+    """
+    Read the total token count from a response's `usage_metadata`.
+
+    Args:
+        usage_metadata (Any): The `usage_metadata` of a GenAI response.
+
+    Returns:
+        Optional[int]: The total tokens used, or None if usage is unknown.
+    """
+    if usage_metadata is None:
+        return None
+
+    total = getattr(usage_metadata, "total_token_count", None)
+    if total is not None:
+        return total
+
+    counts = [getattr(usage_metadata, name, None) or 0
+              for name in ("prompt_token_count", "candidates_token_count", "thoughts_token_count")]
+    return sum(counts) or None
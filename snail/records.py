@@ -0,0 +1,43 @@
+from types import SimpleNamespace
+from typing import Any, Dict, NamedTuple
+
+
+class CoTRecord(NamedTuple):
+    """A completed entry of a generation run."""
+
+    index: int  # Position of the entry in the input data
+    instruction: str  # The data entry sent to the model
+    output: str  # The generated text response
+    usage: Any  # The `usage_metadata` of the response
+
+
+def usage_to_dict(usage: Any) -> Dict[str, Any]:
+    """
+    Convert a response's `usage_metadata` to a JSON serialisable dictionary.
+
+    Args:
+        usage (Any): The `usage_metadata` of a GenAI response, a dictionary, or None.
+
+    Returns:
+        Dict[str, Any]: The token counts that are set.
+    """
+    if usage is None:
+        return {}
+    if isinstance(usage, dict):
+        return dict(usage)
+    if hasattr(usage, "model_dump"):
+        return usage.model_dump(mode="json", exclude_none=True)
+    return {name: value for name, value in vars(usage).items() if value is not None}
+
+
+def usage_from_dict(usage: Dict[str, Any]) -> SimpleNamespace:
+    """
+    Rebuild an object with the same attributes as `usage_metadata` from `usage_to_dict` output.
+
+    Args:
+        usage (Dict[str, Any]): The stored token counts.
+
+    Returns:
+        SimpleNamespace: An object exposing the token counts as attributes.
+    """
+    return SimpleNamespace(**usage)
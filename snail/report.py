@@ -0,0 +1,258 @@
+import json
+import time
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+# Upper bounds in seconds of the latency histogram buckets, the last bucket is unbounded
+LATENCY_BUCKETS: Tuple[float, ...] = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+@dataclass
+class LatencyHistogram:
+    """Fixed-bucket histogram of latencies in seconds."""
+
+    bounds: Tuple[float, ...] = LATENCY_BUCKETS
+    counts: List[int] = field(default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1))
+    count: int = 0
+    total: float = 0.0
+    min: Optional[float] = None
+    max: Optional[float] = None
+
+    def observe(self, seconds: float) -> None:
+        """
+        Add a latency to the histogram.
+
+        Args:
+            seconds (float): The latency in seconds.
+        """
+        bucket = next((i for i, bound in enumerate(self.bounds) if seconds <= bound), len(self.bounds))
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        self.min = seconds if self.min is None else min(self.min, seconds)
+        self.max = seconds if self.max is None else max(self.max, seconds)
+
+    @property
+    def mean(self) -> float:
+        """float: The mean latency in seconds."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """
+        Estimate a percentile as the upper bound of the bucket it falls in.
+
+        Args:
+            q (float): The percentile, between 0 and 100.
+
+        Returns:
+            float: The estimated latency in seconds, capped by the largest latency seen.
+        """
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                bound = self.bounds[bucket] if bucket < len(self.bounds) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the histogram to a JSON serialisable dictionary.
+
+        Returns:
+            Dict[str, Any]: The buckets (by upper bound), count, mean, min, max, p50 and p99.
+        """
+        labels = [f"<={bound}s" for bound in self.bounds] + [f">{self.bounds[-1]}s"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "mean": self.mean,
+            "min": self.min,
+            "max": self.max,
+            "p50": self.percentile(50),
+            "p99": self.percentile(99),
+        }
+
+
+@dataclass
+class StageStats:
+    """Accumulated statistics of one pipeline stage (searching, generation, transform, push)."""
+
+    calls: int = 0  # Calls of the stage method
+    seconds: float = 0.0  # Wall-clock time spent in the stage
+    items: int = 0  # Items produced (search responses, records, rows)
+    requests: int = 0  # API requests sent
+    retries: int = 0  # Requests sent again after a transient error
+    failures: int = 0  # Items or calls that ended without a result
+    prompt_tokens: int = 0
+    candidates_tokens: int = 0
+    thoughts_tokens: int = 0
+    tokens_saved: int = 0  # Estimated output tokens not generated because a streamed output was aborted early
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)  # Per request, or per call without requests
+    ttft: LatencyHistogram = field(default_factory=LatencyHistogram)  # Time to first token of streamed requests
+
+    @property
+    def items_per_second(self) -> float:
+        """float: Items produced per second of wall-clock time."""
+        return self.items / self.seconds if self.seconds else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the statistics to a JSON serialisable dictionary.
+
+        Returns:
+            Dict[str, Any]: The statistics, with the latency and time to first token histograms and the throughput.
+        """
+        stats = {name: value for name, value in asdict(self).items() if name not in ("latency", "ttft")}
+        return {**stats, "items_per_second": self.items_per_second, "latency": self.latency.to_dict(),
+                "ttft": self.ttft.to_dict()}
+
+
+@dataclass
+class GenerationStats:
+    """Statistics of a single `get_result` (or `get_batch_result`) run, by entry."""
+
+    attempts: List[int] = field(default_factory=list)  # Number of requests sent for every entry
+    failed: List[int] = field(default_factory=list)  # Indices of entries without a result
+    resumed: int = 0  # Entries replayed from a journal instead of being sent
+    cached: int = 0  # Entries answered from the response cache
+    deduplicated: int = 0  # Entries sharing the output of an equal entry instead of being sent
+    coalesced: int = 0  # Entries that awaited an identical request already in flight
+    pack_size: int = 1  # Entries sent together in one request
+    unpacked: int = 0  # Packed entries sent again on their own because their section did not parse
+    aborted: int = 0  # Streamed outputs cancelled by the output guard, the entry is sent again
+
+    @property
+    def retries(self) -> int:
+        """int: The number of requests sent again after a failure."""
+        return sum(attempt - 1 for attempt in self.attempts if attempt > 1)
+
+    @property
+    def dedup_ratio(self) -> float:
+        """float: The share of entries that were not sent because an equal entry was."""
+        return self.deduplicated / len(self.attempts) if self.attempts else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the statistics to a JSON serialisable dictionary.
+
+        Returns:
+            Dict[str, Any]: The fields and derived statistics.
+        """
+        return {**asdict(self), "retries": self.retries, "dedup_ratio": self.dedup_ratio}
+
+
+@dataclass
+class RunReport:
+    """
+    Metrics of a generator: wall-clock time, requests, retries, failures, token totals and
+    latency histograms of every stage, and the per-entry statistics of the last generation run.
+    """
+
+    stages: Dict[str, StageStats] = field(default_factory=dict)
+    generation: GenerationStats = field(default_factory=GenerationStats)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def stage(self, name: str) -> StageStats:
+        """
+        Get the statistics of a stage, creating them on first use.
+
+        Args:
+            name (str): The stage name, e.g. "search" or "generation".
+
+        Returns:
+            StageStats: The statistics of the stage.
+        """
+        with self._lock:
+            if name not in self.stages:
+                self.stages[name] = StageStats()
+            return self.stages[name]
+
+    @contextmanager
+    def timed(self, name: str, record_latency: bool = False) -> Iterator[StageStats]:
+        """
+        Count a call of a stage and add its wall-clock time.
+
+        Args:
+            name (str): The stage name.
+            record_latency (bool): Also add the call duration to the latency histogram,
+                for stages that do not send requests.
+
+        Yields:
+            StageStats: The statistics of the stage.
+        """
+        stats = self.stage(name)
+        stats.calls += 1
+        started = time.perf_counter()
+        try:
+            yield stats
+        finally:
+            elapsed = time.perf_counter() - started
+            stats.seconds += elapsed
+            if record_latency:
+                stats.latency.observe(elapsed)
+
+    def record_request(self, name: str, seconds: Optional[float], usage: Any = None, ttft: Optional[float] = None) -> None:
+        """
+        Record an API request of a stage.
+
+        Args:
+            name (str): The stage name.
+            seconds (Optional[float]): The request latency, None if it is not known (e.g. a request of a batch job).
+            usage (Any): The `usage_metadata` of the response, None if the request failed.
+            ttft (Optional[float]): Seconds until the first chunk of a streamed response, None if not streamed.
+        """
+        stats = self.stage(name)
+        stats.requests += 1
+        if seconds is not None:
+            stats.latency.observe(seconds)
+        if ttft is not None:
+            stats.ttft.observe(ttft)
+        if usage is not None:
+            stats.prompt_tokens += getattr(usage, "prompt_token_count", None) or 0
+            stats.candidates_tokens += getattr(usage, "candidates_token_count", None) or 0
+            stats.thoughts_tokens += getattr(usage, "thoughts_token_count", None) or 0
+
+    @property
+    def total_tokens(self) -> Dict[str, int]:
+        """Dict[str, int]: Prompt, candidates and thoughts tokens summed over all stages."""
+        return {
+            "prompt": sum(stats.prompt_tokens for stats in self.stages.values()),
+            "candidates": sum(stats.candidates_tokens for stats in self.stages.values()),
+            "thoughts": sum(stats.thoughts_tokens for stats in self.stages.values()),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Convert the report to a JSON serialisable dictionary.
+
+        Returns:
+            Dict[str, Any]: The statistics of every stage, the token totals and the last generation run.
+        """
+        return {
+            "stages": {name: stats.to_dict() for name, stats in self.stages.items()},
+            "total_tokens": self.total_tokens,
+            "generation": self.generation.to_dict(),
+        }
+
+    def to_json(self, path: Optional[str] = None) -> str:
+        """
+        Export the report as JSON.
+
+        Args:
+            path (Optional[str]): File path to write the JSON to, None to only return it.
+
+        Returns:
+            str: The JSON document.
+        """
+        document = json.dumps(self.to_dict(), indent=2)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(document)
+        return document
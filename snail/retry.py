@@ -0,0 +1,62 @@
+import random
+import logging
+
+from .errors import is_retryable
+
+
+logger = logging.getLogger('RetryPolicy')
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for transient API errors."""
+
+    def __init__(self,
+                 max_attempts: int = 5,
+                 backoff_base: float = 1.0,
+                 backoff_cap: float = 60.0) -> None:
+        """
+        Initialise the retry policy.
+
+        Args:
+            max_attempts (int): The maximum number of times a request is sent, including the first one.
+            backoff_base (float): The backoff in seconds after the first failed attempt, doubled after each attempt.
+            backoff_cap (float): The maximum backoff in seconds.
+
+        Raises:
+            ValueError: If `max_attempts` is smaller than one or a backoff value is negative.
+        """
+        if max_attempts is None or max_attempts < 1:
+            logger.error("Max attempts must be at least one")
+            raise ValueError(f"Max attempts must be at least one, got {max_attempts}")
+        if backoff_base < 0 or backoff_cap < 0:
+            logger.error("Backoff base and cap must not be negative")
+            raise ValueError(f"Backoff base and cap must not be negative, got {backoff_base} and {backoff_cap}")
+
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+    def should_retry(self, error: BaseException, attempt: int) -> bool:
+        """
+        Decide whether a failed request is sent again.
+
+        Args:
+            error (BaseException): The exception raised by the request.
+            attempt (int): The number of attempts made so far, starting at 1.
+
+        Returns:
+            bool: True if the error is transient and attempts are left.
+        """
+        return attempt < self.max_attempts and is_retryable(error)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Compute how long to wait before the next attempt ("full jitter").
+
+        Args:
+            attempt (int): The number of attempts made so far, starting at 1.
+
+        Returns:
+            float: A random delay between zero and the capped exponential backoff.
+        """
+        return random.uniform(0, min(self.backoff_cap, self.backoff_base * 2 ** (attempt - 1)))
@@ -0,0 +1,92 @@
+import time
+from types import TracebackType
+from typing import Any, Callable, Optional, Type
+
+from .concurrency import AdaptiveConcurrency
+from .errors import is_overload
+from .rate_limiter import RateLimiter
+from .report import RunReport
+
+
+class RequestSlot:
+    """
+    Bookkeeping of one model request, shared by every request path of the generator.
+
+    Entering the slot waits for a place in `controller` and for `rate_limiter`. Leaving it records the
+    latency, time to first token and usage in `report`, feeds the real usage back to `rate_limiter`
+    and releases the place, as overloaded if the request failed with a 429/503. Set `usage` (and
+    `succeeded` once the response is complete) inside the block, and call `received` with every chunk
+    when streaming. A stream that ends without usage, e.g. when it is aborted, is charged the estimated
+    prompt tokens and the words received instead of getting its whole reservation back.
+
+    Example:
+        >>> async with RequestSlot(report, "search", controller, rate_limiter) as slot:
+        >>>     response = await backend.agenerate(model=model_id, contents=query, config=config)
+        >>>     slot.usage, slot.succeeded = response.usage_metadata, True
+    """
+
+    def __init__(self,
+                 report: RunReport,
+                 stage: str,
+                 controller: AdaptiveConcurrency,
+                 rate_limiter: RateLimiter,
+                 on_done: Optional[Callable[[Any], None]] = None,
+                 prompt: str = "") -> None:
+        """
+        Initialise the slot.
+
+        Args:
+            report (RunReport): The report the request is recorded in.
+            stage (str): The stage name of the request in `report`.
+            controller (AdaptiveConcurrency): Limits the requests in flight.
+            rate_limiter (RateLimiter): Paces the requests by RPM/TPM.
+            on_done (Optional[Callable[[Any], None]]): Called with `usage` when the request ends, e.g. to update a progress display.
+            prompt (str): The contents sent, to estimate the prompt tokens of a stream that ends without usage.
+        """
+        self.report = report
+        self.stage = stage
+        self.controller = controller
+        self.rate_limiter = rate_limiter
+        self.on_done = on_done
+        self.usage: Any = None  # The `usage_metadata` of the response, None while unknown
+        self.succeeded = False  # True once the complete response was received
+        self.ttft: Optional[float] = None  # Seconds until the first chunk of a streamed response
+        self.prompt_tokens = len(prompt) // 4  # About 4 characters per token
+        self.output_tokens = 0  # Words received by a streamed request, an estimate of its output tokens
+        self.sent_at = 0.0
+        self._token = 0
+        self._reserved = 0.0
+
+    def received(self, text: str) -> None:
+        """
+        Record a chunk of a streamed response, and the time to first token if it is the first one.
+
+        Args:
+            text (str): The text of the chunk.
+        """
+        if self.ttft is None:
+            self.ttft = time.perf_counter() - self.sent_at
+        self.output_tokens += len(text.split())
+
+    async def __aenter__(self) -> "RequestSlot":
+        self._token = await self.controller.acquire()
+        try:
+            self._reserved = await self.rate_limiter.aacquire()
+        except BaseException:
+            # `__aexit__` does not run when entering fails, e.g. when the wait is cancelled
+            await self.controller.release(self._token, succeeded=False)
+            raise
+        self.sent_at = time.perf_counter()
+        return self
+
+    async def __aexit__(self,
+                        exc_type: Optional[Type[BaseException]],
+                        exc: Optional[BaseException],
+                        traceback: Optional[TracebackType]) -> None:
+        self.report.record_request(self.stage, time.perf_counter() - self.sent_at, self.usage, ttft=self.ttft)
+        if self.on_done is not None:
+            self.on_done(self.usage)
+        # A stream cut before its usage arrived still consumed its prompt and the output received so far
+        spent = self.prompt_tokens + self.output_tokens if self.usage is None and self.ttft is not None else None
+        self.rate_limiter.record(self.usage, self._reserved, spent=spent)
+        await self.controller.release(self._token, overloaded=exc is not None and is_overload(exc), succeeded=self.succeeded)
@@ -0,0 +1,357 @@
+import os
+import json
+import shutil
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the standard library is used without it
+    orjson = None
+
+
+logger = logging.getLogger('DatasetWriter')
+
+# Formats accepted by `open_writer`
+OUTPUT_FORMATS = ("jsonl", "json", "parquet")
+
+
+def dumps(record: Dict[str, Any]) -> bytes:
+    """
+    Serialise a record as compact UTF-8 JSON, with orjson when it is installed.
+
+    Args:
+        record (Dict[str, Any]): The record to serialise.
+
+    Returns:
+        bytes: The JSON document, without a trailing newline.
+    """
+    if orjson is not None:
+        return orjson.dumps(record)
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """
+    Parse a JSON document, with orjson when it is installed.
+
+    Args:
+        data (Any): The document, as `str` or `bytes`.
+
+    Returns:
+        Any: The parsed value.
+
+    Raises:
+        ValueError: If `data` is not valid JSON (`json.JSONDecodeError` and `orjson.JSONDecodeError` are both ValueErrors).
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _scalar(value: Any) -> bytes:
+    # orjson and `json` (with ensure_ascii=False) escape strings, integers and constants the same way
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, ensure_ascii=False).encode('utf-8')
+
+
+class DatasetWriter(ABC):
+    """Writes dataset records to disk as they arrive."""
+
+    path: str  # The output file, or directory for sharded formats
+    count: int  # Records written
+    bytes_written: int
+
+    @abstractmethod
+    def write(self, record: Dict[str, Any]) -> None:
+        """
+        Write one record.
+
+        Args:
+            record (Dict[str, Any]): The record, e.g. an Alpaca entry.
+        """
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        """Write the buffered records and close the output."""
+        pass
+
+    def write_all(self, records: Iterable[Dict[str, Any]]) -> int:
+        """
+        Write records one by one, consuming them lazily.
+
+        Args:
+            records (Iterable[Dict[str, Any]]): The records to write.
+
+        Returns:
+            int: The number of records written by this call.
+        """
+        written = self.count
+        for record in records:
+            self.write(record)
+        return self.count - written
+
+    def __enter__(self) -> "DatasetWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class JSONLWriter(DatasetWriter):
+    """
+    Writes records to a JSON Lines file, one record per line, as they arrive.
+
+    Writes go through a buffer of `buffer_size` bytes, so memory stays flat whatever the number of records.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20, append: bool = False) -> None:
+        """
+        Open the file for writing.
+
+        Args:
+            path (str): File path of the JSONL file.
+            buffer_size (int): Size of the write buffer in bytes.
+            append (bool): Add the records to an existing file instead of replacing it.
+        """
+        self.path = path
+        self.count = 0  # Records written
+        self.bytes_written = 0
+        self._file = open(path, 'ab' if append else 'wb', buffering=buffer_size)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        line = dumps(record) + b"\n"
+        self._file.write(line)
+        self.count += 1
+        self.bytes_written += len(line)
+
+    def flush(self) -> None:
+        """Write the buffered records to the file."""
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.close()
+
+
+class JSONArrayWriter(JSONLWriter):
+    """
+    Writes records as an indented JSON array, the format of `json.dump(records, f, indent=2)`.
+    Records are still streamed, only the array brackets and separators are added.
+    """
+
+    def __init__(self, path: str, buffer_size: int = 1 << 20) -> None:
+        """
+        Open the file for writing.
+
+        Args:
+            path (str): File path of the JSON file.
+            buffer_size (int): Size of the write buffer in bytes.
+        """
+        super().__init__(path, buffer_size=buffer_size)
+        self._write_raw(b"[")
+
+    def _write_raw(self, data: bytes) -> None:
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if record and all(isinstance(value, (str, int, bool, type(None))) for value in record.values()):
+            # Flat records (like Alpaca entries) are laid out here, the indenting encoder of `json` is much slower
+            members = b",\n    ".join(_scalar(str(key)) + b": " + _scalar(value) for key, value in record.items())
+            document = b"{\n    " + members + b"\n  }"
+        else:
+            document = json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  ").encode('utf-8')
+        self._write_raw((b",\n  " if self.count else b"\n  ") + document)
+        self.count += 1
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._write_raw(b"\n]" if self.count else b"]")
+        super().close()
+
+
+class ParquetShardWriter(DatasetWriter):
+    """
+    Writes records to zstd-compressed Parquet shards, ready to be memory-mapped by Arrow-based loaders.
+
+    Records are buffered until `row_group_size` rows are collected, then written as one row group.
+    A new shard is started every `rows_per_shard` rows. When closed, shards are renamed to the
+    `<split>-00000-of-00003.parquet` pattern that the Hugging Face Hub recognises.
+    """
+
+    def __init__(self,
+                 path: str,
+                 row_group_size: int = 10_000,
+                 rows_per_shard: int = 250_000,
+                 compression: str = "zstd",
+                 compression_level: Optional[int] = None,
+                 schema: Any = None,
+                 split: str = "train") -> None:
+        """
+        Create the output directory.
+
+        Args:
+            path (str): Directory the shards are written to.
+            row_group_size (int): Rows per row group, the unit that readers load at once.
+            rows_per_shard (int): Rows per shard file, rounded up to whole row groups.
+            compression (str): Parquet compression codec, e.g. "zstd", "snappy" or "none".
+            compression_level (Optional[int]): Level of the codec, None for its default.
+            schema (Any): The `pyarrow.Schema` of the records, None to infer it from the first row group.
+            split (str): Name of the split, used as the prefix of the shard files.
+
+        Raises:
+            ImportError: If pyarrow is not installed.
+            ValueError: If `row_group_size` or `rows_per_shard` is not positive.
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            logger.error("pyarrow is required for the Parquet output, install it with `pip install pyarrow`")
+            raise
+        if row_group_size <= 0 or rows_per_shard <= 0:
+            logger.error("Row group size and rows per shard must be greater than zero")
+            raise ValueError(f"Row group size and rows per shard must be greater than zero, got {row_group_size} and {rows_per_shard}")
+
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.row_group_size = row_group_size
+        self.rows_per_shard = rows_per_shard
+        self.compression = compression
+        self.compression_level = compression_level
+        self.schema = schema
+        self.split = split
+        self.count = 0
+        self.bytes_written = 0
+        self.shards: List[str] = []  # File paths of the shards, final once closed
+
+        self._rows: List[Dict[str, Any]] = []
+        self._writer: Any = None
+        self._shard_rows = 0
+        self._closed = False
+        os.makedirs(path, exist_ok=True)
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._rows.append(record)
+        self.count += 1
+        if len(self._rows) >= self.row_group_size:
+            self._write_row_group()
+
+    def _write_row_group(self) -> None:
+        if not self._rows:
+            return
+        table = self._pa.Table.from_pylist(self._rows, schema=self.schema)
+        self.schema = table.schema
+        self._rows = []
+
+        if self._writer is None:
+            shard = os.path.join(self.path, f"{self.split}-{len(self.shards):05d}.parquet")
+            self.shards.append(shard)
+            self._writer = self._pq.ParquetWriter(shard, self.schema, compression=self.compression,
+                                                  compression_level=self.compression_level)
+        self._writer.write_table(table, row_group_size=self.row_group_size)
+        self._shard_rows += table.num_rows
+        if self._shard_rows >= self.rows_per_shard:
+            self._close_shard()
+
+    def _close_shard(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self.bytes_written += os.path.getsize(self.shards[-1])
+            self._writer = None
+            self._shard_rows = 0
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        self._write_row_group()
+        self._close_shard()
+        self._closed = True
+
+        # The total is only known now, shards get their final `-of-` names
+        renamed = []
+        for number, shard in enumerate(self.shards):
+            final = os.path.join(self.path, f"{self.split}-{number:05d}-of-{len(self.shards):05d}.parquet")
+            os.replace(shard, final)
+            renamed.append(final)
+        self.shards = renamed
+
+
+def records_to_table(records: Iterable[Dict[str, Any]], batch_size: int = 65_536) -> Any:
+    """
+    Build an Arrow table from records, without an intermediate file.
+
+    Records are converted in chunks of `batch_size` rows. Converting everything at once
+    over-allocates the Arrow buffers, which nearly doubles the peak memory at a million rows.
+
+    Args:
+        records (Iterable[Dict[str, Any]]): The records, all with the same keys as the first one.
+        batch_size (int): Rows converted to Arrow at once.
+
+    Returns:
+        Any: The `pyarrow.Table`.
+    """
+    import pyarrow
+
+    chunks: List[Any] = []
+    columns: Dict[str, List[Any]] = {}
+    rows = 0
+    for record in records:
+        if not columns:
+            columns = {name: [] for name in record}
+        for name, values in columns.items():
+            values.append(record.get(name))
+        rows += 1
+        if rows == batch_size:
+            chunks.append(pyarrow.table(columns))
+            columns = {name: [] for name in columns}
+            rows = 0
+    if rows or not chunks:
+        chunks.append(pyarrow.table(columns))
+    # A chunk where a column is all None has a null type, it is promoted to the type of the other chunks
+    return pyarrow.concat_tables(chunks, promote_options="default")
+
+
+def open_writer(path: str, output_format: str = "jsonl", buffer_size: int = 1 << 20) -> DatasetWriter:
+    """
+    Open a streaming writer for an output format.
+
+    Args:
+        path (str): File path of the output file, or directory of the Parquet shards.
+        output_format (str): "jsonl" for one record per line, "json" for an indented JSON array,
+            "parquet" for zstd-compressed Parquet shards.
+        buffer_size (int): Size of the write buffer in bytes, for the JSON formats.
+
+    Returns:
+        DatasetWriter: The writer, to be closed once every record is written.
+
+    Raises:
+        ValueError: If `output_format` is unknown.
+    """
+    if output_format not in OUTPUT_FORMATS:
+        logger.error(f"Output format must be one of {', '.join(OUTPUT_FORMATS)}")
+        raise ValueError(f"Output format must be one of {', '.join(OUTPUT_FORMATS)}, got '{output_format}'")
+    if output_format == "json":
+        return JSONArrayWriter(path, buffer_size=buffer_size)
+    if output_format == "parquet":
+        return ParquetShardWriter(path)
+    return JSONLWriter(path, buffer_size=buffer_size)
+
+
+def remove_output(writer: DatasetWriter) -> None:
+    """
+    Close a writer and delete its output, e.g. when nothing was written.
+
+    Args:
+        writer (DatasetWriter): The writer to discard.
+    """
+    writer.close()
+    if os.path.isdir(writer.path):
+        shutil.rmtree(writer.path)
+    elif os.path.exists(writer.path):
+        os.remove(writer.path)
@@ -0,0 +1,26 @@
+import os
+import sys
+
+import pytest
+
+# The tests import the `snail` modules from the repository root, like the examples and benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snail.backends import FakeBackend
+from snail.cot_dsgen import CoTDatasetGenerator
+
+
+@pytest.fixture
+def make_generator():
+    """Factory of generators running offline against a `FakeBackend`, keyword arguments override the defaults."""
+    def make(**kwargs):
+        kwargs.setdefault("backend", FakeBackend(seed=0, latency=0.0))
+        kwargs.setdefault("verbosity", "quiet")
+        return CoTDatasetGenerator(google_api_key=None, model_id="fake", user_query="List problems",
+                                   role="mathematician", **kwargs)
+    return make
+
+
+@pytest.fixture
+def generator(make_generator):
+    return make_generator()
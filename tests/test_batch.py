@@ -0,0 +1,77 @@
+import pytest
+
+from snail.batch import JOB_STATE_FAILED, JOB_STATE_PARTIALLY_SUCCEEDED, JOB_STATE_SUCCEEDED, LocalBatchTransport
+from snail.cot_output import parse_cot_output
+
+
+class StateBatchTransport(LocalBatchTransport):
+    """Reports `final_state` instead of JOB_STATE_SUCCEEDED once a job is done."""
+
+    def __init__(self, handler, work_dir, final_state):
+        super().__init__(handler, work_dir)
+        self.final_state = final_state
+
+    def poll(self, job_name):
+        state = super().poll(job_name)
+        return self.final_state if state == JOB_STATE_SUCCEEDED else state
+
+
+def failing_handler(backend, failing):
+    def handler(request):
+        if request["contents"][0]["parts"][0]["text"] == failing:
+            raise RuntimeError("internal error")
+        return backend.batch_handler(request)
+    return handler
+
+
+def test_round_trip_keeps_input_order(generator, tmp_path):
+    data = ["problem a", "problem b", "problem c"]
+    transport = LocalBatchTransport(generator.backend.batch_handler, str(tmp_path / "batches"))
+
+    output = generator.get_batch_result(data, transport=transport, job_path=str(tmp_path / "job.jsonl"), poll_interval=0.01)
+
+    assert [parse_cot_output(text).answer.split("'")[1] for text in output] == data
+    assert generator.report.stages["batch"].items == len(data)
+    assert generator.report.generation.failed == []
+
+
+def test_duplicates_are_requested_once(generator, tmp_path):
+    transport = LocalBatchTransport(generator.backend.batch_handler, str(tmp_path / "batches"))
+
+    output = generator.get_batch_result(["Problem A", "problem a", "problem b"], transport=transport,
+                                        job_path=str(tmp_path / "job.jsonl"), poll_interval=0.01)
+
+    assert output[0] == output[1]
+    assert generator.report.generation.deduplicated == 1
+    assert generator.report.stages["batch"].requests == 2
+
+
+def test_partially_succeeded_job_returns_the_successful_entries(generator, tmp_path):
+    transport = StateBatchTransport(failing_handler(generator.backend, "problem b"), str(tmp_path / "batches"),
+                                    JOB_STATE_PARTIALLY_SUCCEEDED)
+
+    output = generator.get_batch_result(["problem a", "problem b", "problem c"], transport=transport,
+                                        job_path=str(tmp_path / "job.jsonl"), poll_interval=0.01)
+
+    assert [parse_cot_output(text).answer.split("'")[1] for text in output] == ["problem a", "problem c"]
+    assert generator.report.generation.failed == [1]
+
+
+def test_failed_job_raises(generator, tmp_path):
+    transport = StateBatchTransport(generator.backend.batch_handler, str(tmp_path / "batches"), JOB_STATE_FAILED)
+
+    with pytest.raises(RuntimeError, match=JOB_STATE_FAILED):
+        generator.get_batch_result(["problem a"], transport=transport, job_path=str(tmp_path / "job.jsonl"),
+                                   poll_interval=0.01)
+
+
+def test_batch_requests_do_not_add_latencies(generator, tmp_path):
+    transport = LocalBatchTransport(generator.backend.batch_handler, str(tmp_path / "batches"))
+
+    generator.get_batch_result(["problem a", "problem b"], transport=transport, job_path=str(tmp_path / "job.jsonl"),
+                               poll_interval=0.01)
+
+    stats = generator.report.stages["batch"]
+    assert stats.requests == 2
+    assert stats.candidates_tokens > 0
+    assert stats.latency.count == 0
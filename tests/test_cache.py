@@ -0,0 +1,102 @@
+from types import SimpleNamespace
+
+import pytest
+
+from snail.backends import FakeBackend
+from snail.cache import ResponseCache
+
+
+class Clock:
+    """Replaces `time` in the cache module, advanced by hand."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr("snail.cache.time", clock)
+    return clock
+
+
+def test_response_is_stored_with_its_usage(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    cache.set("key", "text", SimpleNamespace(total_token_count=12))
+
+    assert cache.get("key") == {"text": "text", "usage": {"total_token_count": 12}}
+    assert cache.get("other") is None
+    assert (cache.hits, cache.misses, cache.hit_rate) == (1, 1, 0.5)
+
+
+def test_entries_persist_across_instances(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(path)
+    cache.set("key", "text")
+    cache.close()
+
+    assert ResponseCache(path).get("key")["text"] == "text"
+
+
+def test_entries_expire_after_the_ttl(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.db"), ttl=60)
+    cache.set("key", "text")
+
+    clock.now += 59
+    assert cache.get("key") is not None
+    clock.now += 2
+    assert cache.get("key") is None
+    assert len(cache) == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_entries=2)
+    cache.set("a", "text a")
+    clock.now += 1
+    cache.set("b", "text b")
+    clock.now += 1
+    cache.get("a")
+    clock.now += 1
+    cache.set("c", "text c")
+
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+
+def test_entries_over_max_bytes_are_evicted(tmp_path, clock):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=10)
+    for key in "abc":
+        cache.set(key, "1234")
+        clock.now += 1
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None and cache.get("c") is not None
+
+
+def test_key_depends_on_the_config():
+    assert ResponseCache.key("model", "problem", {"system_instruction": "a"}) == \
+        ResponseCache.key("model", "problem", {"system_instruction": "a"})
+    assert ResponseCache.key("model", "problem", {"system_instruction": "a"}) != \
+        ResponseCache.key("model", "problem", {"system_instruction": "b"})
+
+
+@pytest.mark.parametrize("kwargs", [{"ttl": 0}, {"max_entries": 0}, {"max_bytes": -1}])
+def test_invalid_limits(tmp_path, kwargs):
+    with pytest.raises(ValueError):
+        ResponseCache(str(tmp_path / "cache.db"), **kwargs)
+
+
+def test_get_result_answers_cached_entries_without_requests(make_generator, tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    data = ["problem a", "problem b", "problem c"]
+    output = make_generator(cache=cache).get_result(data)
+
+    backend = FakeBackend(seed=0, latency=0.0)
+    generator = make_generator(cache=cache, backend=backend)
+    assert generator.get_result(data) == output
+    assert backend.requests == 0
+    assert generator.report.generation.cached == len(data)
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+from snail.backends import FakeBackend
+from snail.concurrency import AdaptiveConcurrency
+from snail.retry import RetryPolicy
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_overload_halves_the_limit():
+    async def scenario():
+        controller = AdaptiveConcurrency(initial=8)
+        token = await controller.acquire()
+        await controller.release(token, overloaded=True)
+        return controller.concurrency
+
+    assert run(scenario()) == 4
+
+
+def test_requests_sent_before_a_decrease_do_not_decrease_again():
+    async def scenario():
+        controller = AdaptiveConcurrency(initial=8)
+        tokens = [await controller.acquire() for _ in range(3)]
+        for token in tokens:
+            await controller.release(token, overloaded=True)
+        return controller.concurrency
+
+    assert run(scenario()) == 4
+
+
+def test_limit_does_not_go_below_the_minimum():
+    async def scenario():
+        controller = AdaptiveConcurrency(initial=4, min_concurrency=3)
+        for _ in range(3):
+            await controller.release(await controller.acquire(), overloaded=True)
+        return controller.concurrency
+
+    assert run(scenario()) == 3
+
+
+def test_limit_grows_by_one_after_a_window_of_successes():
+    async def scenario():
+        controller = AdaptiveConcurrency(initial=2, max_concurrency=3)
+        limits = []
+        for _ in range(8):
+            await controller.release(await controller.acquire())
+            limits.append(controller.concurrency)
+        return limits
+
+    assert run(scenario()) == [2, 3, 3, 3, 3, 3, 3, 3]
+
+
+def test_failures_without_overload_keep_the_limit():
+    async def scenario():
+        controller = AdaptiveConcurrency(initial=2)
+        for _ in range(4):
+            await controller.release(await controller.acquire(), succeeded=False)
+        return controller.concurrency
+
+    assert run(scenario()) == 2
+
+
+def test_acquire_waits_for_a_free_slot():
+    async def scenario():
+        controller = AdaptiveConcurrency.fixed(1)
+        token = await controller.acquire()
+        waiting = asyncio.create_task(controller.acquire())
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        await controller.release(token)
+        await asyncio.wait_for(waiting, 1)
+        return controller.in_flight
+
+    assert run(scenario()) == 1
+
+
+@pytest.mark.parametrize("initial, low, high", [(0, 1, 4), (5, 1, 4), (2, 0, 4), (2, 3, 2)])
+def test_invalid_bounds(initial, low, high):
+    with pytest.raises(ValueError):
+        AdaptiveConcurrency(initial=initial, min_concurrency=low, max_concurrency=high)
+
+
+def test_get_result_backs_off_when_the_api_rejects_concurrent_requests(make_generator):
+    generator = make_generator(backend=FakeBackend(seed=0, latency=0.01, max_concurrency=2))
+    generator.concurrency_controller = AdaptiveConcurrency(initial=8)
+    generator.retry_policy = RetryPolicy(max_attempts=10, backoff_base=0.001, backoff_cap=0.01)
+
+    output = generator.get_result([f"problem {index}" for index in range(40)])
+
+    assert len(output) == 40
+    assert generator.report.stages["generation"].retries > 0
+    assert generator.concurrency_controller.concurrency < 8
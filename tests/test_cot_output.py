@@ -0,0 +1,43 @@
+import pytest
+
+from snail.cot_output import parse_cot_output
+
+
+def test_valid_output():
+    parsed = parse_cot_output("<thought> 2 + 2 </thought>\n<answer> 4 </answer>")
+    assert parsed.valid
+    assert (parsed.thought, parsed.answer, parsed.errors) == ("2 + 2", "4", ())
+
+
+@pytest.mark.parametrize("text, error", [
+    ("<thought>a</thought><thought>b</thought><answer>c</answer>", "duplicated <thought>"),
+    ("<thought>a</thought></thought><answer>c</answer>", "duplicated </thought>"),
+    ("<thought>a</thought><answer>b</answer><answer>c</answer>", "duplicated <answer>"),
+    ("<thought>a<answer>b</answer>", "unclosed <thought>"),
+    ("<thought>a</thought><answer>b", "unclosed <answer>"),
+    ("<answer>b</answer><thought>a</thought>", "<answer> out of order"),
+    ("<thought>a</thought>", "missing <answer>"),
+    ("<answer>b</answer>", "missing <thought>"),
+    ("a</thought><answer>b</answer>", "</thought> without <thought>"),
+])
+def test_invalid_outputs_are_reported(text, error):
+    parsed = parse_cot_output(text)
+    assert not parsed.valid
+    assert error in parsed.errors
+
+
+def test_sections_that_could_be_read_are_kept():
+    parsed = parse_cot_output("<thought>a</thought><answer>unfinished")
+    assert (parsed.thought, parsed.answer) == ("a", "unfinished")
+
+
+def test_first_section_is_kept_when_duplicated():
+    parsed = parse_cot_output("<thought>a</thought><thought>b</thought><answer>c</answer>")
+    assert parsed.thought == "a"
+
+
+@pytest.mark.parametrize("text", [None, ""])
+def test_empty_output(text):
+    parsed = parse_cot_output(text)
+    assert parsed.errors == ("missing <thought>", "missing <answer>")
+    assert parsed.raw == ""
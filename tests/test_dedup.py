@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from snail.backends import FakeBackend
+from snail.dedup import DedupIndex, SingleFlight, normalize_text
+
+
+@pytest.mark.parametrize("first, second", [
+    ("**Problem 1** Solve x + 1 = 2", "Problem 1 Solve x + 1 = 2"),
+    ("__Bold__ and _italic_", "bold and italic"),
+    ("`code` span", "code span"),
+    ("***Nested*** emphasis", "nested emphasis"),
+    ("# Heading", "Heading"),
+    ("> Quoted problem.", "quoted problem"),
+])
+def test_formatting_only_differences_are_duplicates(first, second):
+    assert normalize_text(first) == normalize_text(second)
+
+
+@pytest.mark.parametrize("first, second", [
+    ("a*b", "ab"),
+    ("Compute 12*34", "Compute 1234"),
+    ("Is 5 > 3?", "Is 5 3?"),
+    ("snake_case_name", "snakecasename"),
+    ("2 * 3 * 4", "2 3 4"),
+])
+def test_operators_are_kept(first, second):
+    index = DedupIndex()
+    assert index.add(first) == (0, True)
+    assert index.add(second) == (1, True)
+
+
+def test_duplicate_returns_first_id():
+    index = DedupIndex()
+    index.add("**Find** the area", item_id=7)
+    assert index.add("find the area.") == (7, False)
+    assert "Find the area" in index
+    assert len(index) == 1
+
+
+def test_concurrent_identical_calls_are_coalesced():
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "response"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", call) for _ in range(3)))
+
+    assert asyncio.run(scenario()) == [("response", False), ("response", True), ("response", True)]
+    assert len(calls) == 1
+
+
+def test_error_is_raised_for_every_caller():
+    flight = SingleFlight()
+
+    async def call():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("reset")
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", call) for _ in range(2)), return_exceptions=True)
+
+    assert [type(result) for result in asyncio.run(scenario())] == [ConnectionError, ConnectionError]
+
+
+def test_followers_run_the_call_again_when_the_leader_is_cancelled():
+    flight = SingleFlight()
+    calls = []
+
+    async def call():
+        calls.append(1)
+        await asyncio.sleep(0.02)
+        return "response"
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do("key", call))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do("key", call))
+        await asyncio.sleep(0.005)
+        leader.cancel()
+        return await follower
+
+    assert asyncio.run(scenario()) == ("response", False)
+    assert len(calls) == 2
+
+
+def test_get_result_sends_duplicates_once(make_generator):
+    backend = FakeBackend(seed=0, latency=0.0)
+    generator = make_generator(backend=backend)
+
+    output = generator.get_result(["**Find** the area", "find the area.", "Compute 12*34"])
+
+    assert output[0] == output[1]
+    assert backend.requests == 2
+    assert generator.report.generation.deduplicated == 1
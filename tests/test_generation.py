@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from snail.backends import FakeBackend
+from snail.concurrency import AdaptiveConcurrency
+from snail.cot_output import parse_cot_output
+
+
+DATA = [f"problem {index}" for index in range(30)]
+
+
+def answer_of(text):
+    # The fake backend quotes the instruction in the answer
+    return parse_cot_output(text).answer.split("'")[1]
+
+
+def test_get_result_keeps_the_input_order(make_generator):
+    generator = make_generator(backend=FakeBackend(seed=0, latency=0.01, latency_distribution="exponential"))
+
+    output = generator.get_result(DATA)
+
+    assert [answer_of(text) for text in output] == DATA
+    assert generator.report.stages["generation"].items == len(DATA)
+
+
+class PeakBackend(FakeBackend):
+    """Records the largest number of requests in flight."""
+
+    peak = 0
+
+    async def agenerate(self, model, contents, config):
+        request = super().agenerate(model, contents, config)
+        self.peak = max(self.peak, self.in_flight + 1)
+        return await request
+
+
+def test_requests_are_sent_concurrently(make_generator):
+    backend = PeakBackend(seed=0, latency=0.05)
+    generator = make_generator(backend=backend)
+
+    generator.get_result(DATA, concurrency=6)
+
+    assert backend.peak == 6
+
+
+def test_iter_results_yields_records_in_completion_order(make_generator):
+    generator = make_generator(backend=FakeBackend(seed=1, latency=0.02, latency_distribution="exponential"))
+
+    records = list(generator.iter_results(DATA, concurrency=8))
+
+    assert sorted(record.index for record in records) == list(range(len(DATA)))
+    assert [record.index for record in records] != list(range(len(DATA)))
+    assert all(answer_of(record.output) == record.instruction for record in records)
+
+
+def test_workers_pause_when_the_consumer_falls_behind(make_generator):
+    backend = FakeBackend(seed=0, latency=0.001)
+    generator = make_generator(backend=backend)
+    generator.concurrency_controller = AdaptiveConcurrency.fixed(4)
+
+    async def consume_slowly():
+        records = generator.aiter_results([f"problem {index}" for index in range(200)])
+        await records.__anext__()
+        await asyncio.sleep(0.3)
+        sent = backend.requests
+        await records.aclose()
+        return sent
+
+    # The output queue holds twice the workers, each worker may hold one more finished record
+    assert asyncio.run(consume_slowly()) <= 1 + 2 * 4 + 4
+
+
+def test_async_iterable_entries_are_sent_as_they_arrive(generator):
+    async def entries():
+        for d in ["problem a", "problem b", "problem a"]:
+            await asyncio.sleep(0.01)
+            yield d
+
+    records = sorted(generator.iter_results(entries()), key=lambda record: record.index)
+
+    assert [(record.index, record.instruction) for record in records] == [(0, "problem a"), (1, "problem b"), (2, "problem a")]
+    assert records[0].output == records[2].output
+    assert generator.report.generation.deduplicated == 1
+
+
+@pytest.mark.parametrize("data, kwargs", [(None, {}), ([], {}), (["problem"], {"concurrency": 0}),
+                                          (["problem"], {"pack_size": 0})])
+def test_invalid_arguments(generator, data, kwargs):
+    with pytest.raises(ValueError):
+        generator.get_result(data, **kwargs)
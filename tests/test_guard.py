@@ -0,0 +1,63 @@
+import pytest
+
+from snail.backends import FakeBackend
+from snail.cot_output import parse_cot_output
+from snail.guard import OutputGuard
+
+
+VALID = "<thought>First consider the given values, then apply the rule.</thought>\n<answer>4</answer>"
+
+
+def feed(text, size, guard=None):
+    # The first abort reason of `text` streamed in chunks of `size` characters
+    monitor = (guard or OutputGuard()).monitor()
+    for start in range(0, len(text), size):
+        reason = monitor.feed(text[start:start + size])
+        if reason:
+            return reason
+    return None
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_valid_output_is_not_aborted(size):
+    assert feed(VALID, size) is None
+
+
+@pytest.mark.parametrize("size", [1, 4, 1000])
+def test_misordered_tags_are_aborted(size):
+    assert feed("<thought>a <answer>b</answer>", size) == "unexpected <answer> tag"
+    assert feed("<thought>a</thought><thought>b", size) == "unexpected <thought> tag"
+
+
+def test_output_without_thought_tag_is_aborted():
+    guard = OutputGuard(tag_deadline=20)
+    assert feed("Sure! " * 3, 5, guard) is None
+    assert feed("Sure! " * 10, 5, guard) == "no <thought> tag in the first 20 characters"
+    assert feed("Sure! " * 10, 5, OutputGuard(tag_deadline=0)) is None
+
+
+def test_repetition_loop_is_aborted():
+    monitor = OutputGuard(ngram=4, window=64, max_repeats=3).monitor()
+    reasons = [monitor.feed("we check the result again and ") for _ in range(10)]
+    assert any(reasons) and monitor.looping
+
+
+@pytest.mark.parametrize("kwargs", [{"tag_deadline": -1}, {"ngram": 0}, {"window": -1}, {"max_repeats": 0}])
+def test_invalid_guard(kwargs):
+    with pytest.raises(ValueError):
+        OutputGuard(**kwargs)
+
+
+def test_get_result_sends_aborted_outputs_again(make_generator):
+    backend = FakeBackend(seed=3, latency=0.0, malformed_rate=0.3, runaway_rate=0.3)
+    generator = make_generator(backend=backend)
+    generator.output_guard = OutputGuard()
+    data = [f"problem {index}" for index in range(20)]
+
+    output = generator.get_result(data)
+
+    stats = generator.report.generation
+    assert all(parse_cot_output(text).valid for text in output)
+    assert len(output) + len(stats.failed) == len(data)
+    assert stats.aborted > 0
+    assert generator.report.stages["generation"].tokens_saved > 0
@@ -0,0 +1,108 @@
+import time
+
+import pytest
+
+pytest.importorskip("pyarrow")
+import pyarrow.dataset
+
+from snail.cot_dsgen import CoTDatasetGenerator
+from snail.hub import LocalHubClient, ShardUploader
+from snail.records import CoTRecord
+from snail.retry import RetryPolicy
+
+
+REPO_ID = "me/dataset"
+RECORDS = [CoTRecord(index, f"problem {index}", f"<thought>t</thought><answer>{index}</answer>", None) for index in range(250)]
+
+
+class FailingHubClient(LocalHubClient):
+    """Fails every commit."""
+
+    def commit(self, repo_id, files, message):
+        raise ConnectionError("connection reset")
+
+
+class CrashingHubClient(LocalHubClient):
+    """Accepts the first `commits` commits, then fails every other one with a non-retryable error."""
+
+    def __init__(self, root, commits):
+        super().__init__(root)
+        self.commits = commits
+        self.rejected = 0
+
+    def commit(self, repo_id, files, message):
+        if self.commits <= 0:
+            self.rejected += 1
+            raise PermissionError("upload quota exceeded")
+        self.commits -= 1
+        super().commit(repo_id, files, message)
+
+
+def shard_files(client):
+    return {path for path in client.list_files(REPO_ID) if path.startswith("data/")}
+
+
+def mirrored_instructions(root):
+    table = pyarrow.dataset.dataset(str(root / REPO_ID / "data")).to_table()
+    return table.column("instruction").to_pylist()
+
+
+def test_resume_after_a_crash_uploads_only_the_missing_shards(generator, tmp_path):
+    work_dir = str(tmp_path / "shards")
+    # The Hub stops accepting commits after the dataset card and two shard commits, then the generation crashes
+    crashing = CrashingHubClient(str(tmp_path / "hub"), commits=3)
+
+    def records():
+        yield from RECORDS[:200]
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        generator.stream_to_hf(records(), REPO_ID, client=crashing, work_dir=work_dir, rows_per_shard=30)
+    before = shard_files(crashing)
+    assert before and crashing.rejected
+
+    client = LocalHubClient(str(tmp_path / "hub"))
+    uploaded = generator.stream_to_hf(RECORDS, REPO_ID, client=client, work_dir=work_dir, rows_per_shard=30)
+
+    assert uploaded and not set(uploaded) & before
+    assert before | set(uploaded) == shard_files(client)
+    instructions = mirrored_instructions(tmp_path / "hub")
+    assert len(instructions) == len(set(instructions))
+    assert sorted(instructions) == sorted(record.instruction for record in RECORDS)
+
+
+def test_second_run_skips_mirrored_records(generator, tmp_path):
+    client = LocalHubClient(str(tmp_path / "hub"))
+    work_dir = str(tmp_path / "shards")
+    generator.stream_to_hf(RECORDS, REPO_ID, client=client, work_dir=work_dir, rows_per_shard=100)
+
+    assert generator.stream_to_hf(RECORDS, REPO_ID, client=client, work_dir=work_dir, rows_per_shard=100) == []
+    assert len(mirrored_instructions(tmp_path / "hub")) == len(RECORDS)
+
+
+def test_failed_shards_are_committed_by_the_next_run(generator, tmp_path):
+    work_dir = str(tmp_path / "shards")
+    failing = FailingHubClient(str(tmp_path / "hub"))
+    uploader = ShardUploader(failing, REPO_ID, work_dir=work_dir, rows_per_shard=100,
+                             retry_policy=RetryPolicy(max_attempts=1))
+    # The entries written by `stream_to_hf`
+    for entry in CoTDatasetGenerator._alpaca_entries(RECORDS):
+        uploader.write(entry)
+    uploader.close()
+    assert uploader.failed and not uploader.uploaded
+
+    client = LocalHubClient(str(tmp_path / "hub"))
+    generator.stream_to_hf(RECORDS, REPO_ID, client=client, work_dir=work_dir, rows_per_shard=100)
+    assert sorted(mirrored_instructions(tmp_path / "hub")) == sorted(record.instruction for record in RECORDS)
+
+
+def test_shard_is_cut_on_the_flush_interval_without_new_records(tmp_path):
+    client = LocalHubClient(str(tmp_path / "hub"))
+    uploader = ShardUploader(client, REPO_ID, work_dir=str(tmp_path / "shards"), flush_interval=0.1)
+    uploader.write({"instruction": "problem", "input": "", "output": "answer"})
+
+    deadline = time.monotonic() + 5
+    while not uploader.uploaded and time.monotonic() < deadline:
+        time.sleep(0.02)
+    assert len(uploader.uploaded) == 1
+    uploader.close()
@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from snail.backends import FakeBackend
+from snail.journal import Journal, item_key
+
+
+DATA = [f"problem {index}" for index in range(20)]
+
+
+def test_entries_are_loaded_back(tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    with Journal(path) as journal:
+        journal.append("a", "problem a", "output a")
+        journal.append("b", "problem b", "output b", {"total_token_count": 7})
+
+    entries = Journal(path).load()
+    assert entries["a"]["output"] == "output a"
+    assert entries["b"]["usage"]["total_token_count"] == 7
+
+
+def test_partially_written_line_is_ignored_and_terminated(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    with Journal(str(path)) as journal:
+        journal.append("a", "problem a", "output a")
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"key": "b", "instr')
+
+    journal = Journal(str(path))
+    assert list(journal.load()) == ["a"]
+    journal.append("c", "problem c", "output c")
+    journal.close()
+    assert list(Journal(str(path)).load()) == ["a", "c"]
+
+
+def test_entries_are_fsynced_in_batches(tmp_path, monkeypatch):
+    synced = []
+    monkeypatch.setattr(os, "fsync", synced.append)
+    journal = Journal(str(tmp_path / "journal.jsonl"), fsync_every=4)
+
+    for index in range(10):
+        journal.append(str(index), "problem", "output")
+    assert len(synced) == 2
+    journal.close()
+    assert len(synced) == 3
+
+
+def test_key_depends_on_the_system_instruction_and_model():
+    assert item_key("problem", "system", "model") == item_key("problem", "system", "model")
+    assert item_key("problem", "system", "model") != item_key("problem", "other", "model")
+    assert item_key("problem", "system", "model") != item_key("problem", "system", "other")
+
+
+@pytest.mark.parametrize("path, fsync_every", [("", 1), ("journal.jsonl", 0)])
+def test_invalid_journal(path, fsync_every):
+    with pytest.raises(ValueError):
+        Journal(path, fsync_every=fsync_every)
+
+
+def test_interrupted_run_resumes_without_sending_done_entries(make_generator, tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    first = make_generator()
+    records = first.iter_results(DATA, journal_path=path, concurrency=1)
+    done = [next(records) for _ in range(8)]
+    records.close()
+
+    backend = FakeBackend(seed=0, latency=0.0)
+    second = make_generator(backend=backend)
+    output = second.get_result(DATA, journal_path=path)
+
+    assert len(output) == len(DATA)
+    assert len(done) <= second.report.generation.resumed < len(DATA)
+    assert backend.requests == len(DATA) - second.report.generation.resumed
+    for record in done:
+        assert output[record.index] == record.output
+
+
+def test_completed_run_is_replayed_from_the_journal(make_generator, tmp_path):
+    path = str(tmp_path / "journal.jsonl")
+    output = make_generator().get_result(DATA, journal_path=path)
+
+    backend = FakeBackend(seed=0, latency=0.0)
+    assert make_generator(backend=backend).get_result(DATA, journal_path=path) == output
+    assert backend.requests == 0
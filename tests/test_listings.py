@@ -0,0 +1,83 @@
+import random
+
+import pytest
+
+from snail.listings import ListingStreamParser, parse_listings
+
+
+RESPONSE = """Here are the problems, from easiest to hardest:
+1. **Sum** What is 2 + 2?
+2. **Product** Compute 12*34.
+   Show the intermediate steps.
+3. **Equation** Solve x + 1 = 3.
+
+   Give x as an integer.
+10. **Ten** A listing with a two-digit number.
+11. Ends the list.
+
+These problems cover arithmetic and algebra."""
+
+
+def feed_in_chunks(text, sizes):
+    parser = ListingStreamParser()
+    listings = []
+    position = 0
+    for size in sizes:
+        listings += parser.feed(text[position:position + size])
+        position += size
+    listings += parser.feed(text[position:])
+    return listings + parser.close()
+
+
+def test_parse_listings():
+    assert parse_listings(RESPONSE) == [
+        "**Sum** What is 2 + 2?",
+        "**Product** Compute 12*34.\nShow the intermediate steps.",
+        "**Equation** Solve x + 1 = 3.\nGive x as an integer.",
+        "**Ten** A listing with a two-digit number.",
+        "Ends the list.",
+    ]
+
+
+def test_first_listing_without_leading_newline():
+    assert parse_listings("1. first\n2. second") == ["first", "second"]
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_random_chunk_splits_match_the_complete_parse(seed):
+    rng = random.Random(seed)
+    sizes = [rng.randint(1, 12) for _ in range(len(RESPONSE))]
+    assert feed_in_chunks(RESPONSE, sizes) == parse_listings(RESPONSE)
+
+
+def test_one_character_chunks_match_the_complete_parse():
+    assert feed_in_chunks(RESPONSE, [1] * len(RESPONSE)) == parse_listings(RESPONSE)
+
+
+def test_listings_are_returned_once_complete():
+    parser = ListingStreamParser()
+    assert parser.feed("1. first") == []
+    assert parser.feed("\n2. sec") == ["first"]
+    assert parser.feed("ond\n") == []
+    assert parser.close() == ["second"]
+
+
+NESTED = """1. **Sequence** Given the steps:
+   1. double x
+   2. add 3
+   find x.
+2. **Area** Compute the area of a unit square."""
+
+
+def test_indented_numbered_lines_continue_the_listing():
+    assert parse_listings(NESTED) == [
+        "**Sequence** Given the steps:\n1. double x\n2. add 3\nfind x.",
+        "**Area** Compute the area of a unit square.",
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_indented_numbered_lines_in_random_chunks(seed):
+    rng = random.Random(seed)
+    sizes = [rng.randint(1, 6) for _ in range(len(NESTED))]
+    assert feed_in_chunks(NESTED, sizes) == parse_listings(NESTED)
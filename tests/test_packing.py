@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+
+from snail.backends import FakeBackend
+from snail.cot_output import parse_cot_output
+from snail.packing import choose_pack_size, pack_prompt, split_packed_response, split_usage
+
+
+OUTPUT = "<thought>t</thought><answer>{}</answer>"
+
+
+def answer_of(text):
+    # The fake backend quotes the instruction in the answer
+    return parse_cot_output(text).answer.split("'")[1]
+
+
+def test_pack_prompt_numbers_the_entries():
+    assert pack_prompt(["a", "b"]) == "### Item 1\na\n\n### Item 2\nb"
+
+
+def test_packed_response_is_split_by_item():
+    text = "\n\n".join(f"### Item {number}\n{OUTPUT.format(number)}" for number in (2, 1))
+    assert split_packed_response(text, 2) == [OUTPUT.format(1), OUTPUT.format(2)]
+
+
+@pytest.mark.parametrize("text", [
+    f"### Item 1\n{OUTPUT.format(1)}",
+    f"### Item 1\n{OUTPUT.format(1)}\n### Item 2\n<thought>t</thought>",
+    f"### Item 1\n{OUTPUT.format(1)}\n### Item 2\n{OUTPUT.format(2)}\n### Item 2\n{OUTPUT.format(3)}",
+])
+def test_missing_invalid_or_repeated_sections_are_none(text):
+    assert split_packed_response(text, 2) == [OUTPUT.format(1), None]
+
+
+def test_header_variants_are_accepted():
+    text = f"## item 1:\n{OUTPUT.format(1)}\n  #### ITEM 2\n{OUTPUT.format(2)}"
+    assert split_packed_response(text, 2) == [OUTPUT.format(1), OUTPUT.format(2)]
+
+
+def test_usage_is_shared_equally():
+    usage = split_usage(SimpleNamespace(prompt_token_count=40, candidates_token_count=400, total_token_count=440), 4)
+    assert (usage.prompt_token_count, usage.candidates_token_count, usage.thoughts_token_count, usage.total_token_count) == (10, 100, 0, 110)
+
+
+@pytest.mark.parametrize("max_output_tokens, tokens_per_item, expected", [
+    (2048, 300, 5), (2048, 3000, 1), (65536, 100, 16), (2048, 0, 1),
+])
+def test_pack_size_fits_the_output_limit(max_output_tokens, tokens_per_item, expected):
+    assert choose_pack_size(max_output_tokens, tokens_per_item) == expected
+
+
+def test_get_result_sends_packs(make_generator):
+    backend = FakeBackend(seed=0, latency=0.0)
+    generator = make_generator(backend=backend)
+    data = [f"problem {index}" for index in range(10)]
+
+    output = generator.get_result(data, pack_size=4)
+
+    assert [answer_of(text) for text in output] == data
+    assert backend.requests == 3
+    assert generator.report.generation.pack_size == 4
+
+
+class DroppingBackend(FakeBackend):
+    """Leaves the section of `dropped` out of packed responses."""
+
+    def __init__(self, dropped, **kwargs):
+        super().__init__(**kwargs)
+        self.dropped = dropped
+
+    def respond(self, contents, config=None):
+        response = super().respond(contents, config)
+        if contents.startswith("### Item"):
+            sections = response.text.split("\n\n### ")
+            response.text = "\n\n### ".join(section for section in sections if f"'{self.dropped}'" not in section)
+        return response
+
+
+def test_entries_missing_from_a_pack_are_sent_alone(make_generator):
+    backend = DroppingBackend("problem b", seed=0, latency=0.0)
+    generator = make_generator(backend=backend)
+    data = ["problem a", "problem b", "problem c"]
+
+    output = generator.get_result(data, pack_size=3)
+
+    assert [answer_of(text) for text in output] == data
+    assert backend.requests == 2
+    assert generator.report.generation.unpacked == 1
@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from snail.rate_limiter import RateLimiter, TokenBucket
+
+
+def elapse(bucket, seconds):
+    # Moves the last refill back in time instead of sleeping
+    bucket.updated_at -= seconds
+
+
+def test_bucket_refills_over_time():
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+    assert bucket.reserve(10) == 0.0
+
+    elapse(bucket, 1.5)
+    assert bucket.reserve(3) == 0.0
+    assert bucket.tokens == pytest.approx(0, abs=0.01)
+
+
+def test_bucket_refill_is_capped_at_capacity():
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+    bucket.reserve(4)
+    elapse(bucket, 60)
+    bucket.adjust(0)
+    assert bucket.tokens == 10
+
+
+def test_reservation_over_the_balance_waits_for_the_refill():
+    bucket = TokenBucket(capacity=10, refill_per_second=2)
+    bucket.reserve(10)
+    assert bucket.reserve(4) == pytest.approx(2.0, abs=0.01)
+    # The next caller waits behind the tokens already reserved
+    assert bucket.reserve(2) == pytest.approx(3.0, abs=0.01)
+
+
+@pytest.mark.parametrize("capacity, refill", [(0, 1), (1, 0), (-1, 1)])
+def test_invalid_bucket(capacity, refill):
+    with pytest.raises(ValueError):
+        TokenBucket(capacity, refill)
+
+
+def test_requests_over_the_rpm_limit_wait():
+    limiter = RateLimiter(rpm=60)
+    waits = [limiter.reserve()[0] for _ in range(62)]
+    assert waits[:60] == [0.0] * 60
+    assert waits[60] == pytest.approx(1.0, abs=0.01)
+    assert waits[61] == pytest.approx(2.0, abs=0.01)
+
+
+def test_aacquire_sleeps_until_the_tokens_are_refilled():
+    limiter = RateLimiter(rpm=600)
+    for _ in range(600):
+        limiter.reserve()
+
+    async def acquire():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await limiter.aacquire()
+        return loop.time() - started
+
+    assert asyncio.run(acquire()) == pytest.approx(0.1, abs=0.05)
+
+
+def test_record_replaces_the_reservation_with_the_real_usage():
+    limiter = RateLimiter(tpm=6000, estimated_tokens=1000)
+    _, reserved = limiter.reserve()
+    assert limiter.token_bucket.tokens == pytest.approx(5000, abs=5)
+
+    limiter.record(SimpleNamespace(total_token_count=200), reserved)
+    assert limiter.token_bucket.tokens == pytest.approx(5800, abs=5)
+    # The next reservations move towards the observed usage
+    assert limiter.estimated_tokens == pytest.approx(840)
+
+
+def test_failed_request_gives_its_reservation_back():
+    limiter = RateLimiter(tpm=6000, estimated_tokens=1000)
+    _, reserved = limiter.reserve()
+    limiter.record(None, reserved)
+    assert limiter.token_bucket.tokens == pytest.approx(6000)
+    assert limiter.estimated_tokens == 1000
+
+
+def test_from_delay_sends_one_request_per_delay_without_burst():
+    limiter = RateLimiter.from_delay(0.5)
+    assert limiter.reserve()[0] == 0.0
+    assert limiter.reserve()[0] == pytest.approx(0.5, abs=0.01)
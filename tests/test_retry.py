@@ -0,0 +1,109 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from snail.backends import FakeAPIError, FakeBackend
+from snail.errors import is_overload, is_retryable
+from snail.retry import RetryPolicy
+
+
+class ReadTimeout(Exception):
+    """Named like the transport errors of the HTTP clients."""
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = SimpleNamespace(status_code=status_code)
+
+
+@pytest.mark.parametrize("error", [
+    FakeAPIError(429, "RESOURCE_EXHAUSTED", "quota"),
+    FakeAPIError(503, "UNAVAILABLE", "overloaded"),
+    FakeAPIError(500, "INTERNAL", "internal error"),
+    FakeAPIError(408, "DEADLINE_EXCEEDED", "timeout"),
+    StatusError(502),
+    TimeoutError(),
+    ConnectionResetError(),
+    ReadTimeout(),
+])
+def test_transient_errors_are_retried(error):
+    assert is_retryable(error)
+
+
+@pytest.mark.parametrize("error", [
+    FakeAPIError(400, "INVALID_ARGUMENT", "bad request"),
+    FakeAPIError(403, "PERMISSION_DENIED", "denied"),
+    StatusError(404),
+    ValueError("bad value"),
+    KeyError("missing"),
+])
+def test_other_errors_are_fatal(error):
+    assert not is_retryable(error)
+
+
+def test_overload_is_read_from_the_code_or_the_status():
+    assert is_overload(FakeAPIError(429, "RESOURCE_EXHAUSTED", "quota"))
+    assert is_overload(SimpleNamespace(status="resource_exhausted"))
+    assert not is_overload(FakeAPIError(500, "INTERNAL", "internal error"))
+
+
+def test_should_retry_stops_after_max_attempts():
+    policy = RetryPolicy(max_attempts=3)
+    error = TimeoutError()
+    assert [policy.should_retry(error, attempt) for attempt in (1, 2, 3)] == [True, True, False]
+    assert not policy.should_retry(ValueError(), 1)
+
+
+def test_backoff_is_jittered_below_the_capped_exponential(monkeypatch):
+    policy = RetryPolicy(backoff_base=1.0, backoff_cap=5.0)
+    monkeypatch.setattr(random, "uniform", lambda low, high: high)
+    assert [policy.backoff(attempt) for attempt in range(1, 6)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+    monkeypatch.undo()
+    delays = [policy.backoff(3) for _ in range(200)]
+    assert all(0 <= delay <= 4.0 for delay in delays)
+    assert len(set(delays)) > 1
+
+
+@pytest.mark.parametrize("kwargs", [{"max_attempts": 0}, {"backoff_base": -1}, {"backoff_cap": -1}])
+def test_invalid_policy(kwargs):
+    with pytest.raises(ValueError):
+        RetryPolicy(**kwargs)
+
+
+class FlakyBackend:
+    """Fails the first `failures` requests of every entry with `error`, then answers like `backend`."""
+
+    def __init__(self, backend, failures, error):
+        self.backend = backend
+        self.failures = failures
+        self.error = error
+        self.attempts = {}
+
+    async def agenerate(self, model, contents, config):
+        self.attempts[contents] = self.attempts.get(contents, 0) + 1
+        if self.attempts[contents] <= self.failures:
+            raise self.error
+        return await self.backend.agenerate(model=model, contents=contents, config=config)
+
+
+def test_get_result_retries_transient_errors(make_generator):
+    backend = FlakyBackend(FakeBackend(seed=0, latency=0.0), failures=2, error=FakeAPIError(500, "INTERNAL", "internal error"))
+    generator = make_generator(backend=backend)
+    generator.retry_policy = RetryPolicy(max_attempts=3, backoff_base=0.001)
+
+    assert len(generator.get_result(["problem a", "problem b"])) == 2
+    assert generator.report.generation.attempts == [3, 3]
+    assert generator.report.stages["generation"].retries == 4
+
+
+def test_get_result_does_not_retry_fatal_errors(make_generator):
+    backend = FlakyBackend(FakeBackend(seed=0, latency=0.0), failures=1, error=FakeAPIError(400, "INVALID_ARGUMENT", "bad request"))
+    generator = make_generator(backend=backend)
+    generator.retry_policy = RetryPolicy(max_attempts=3, backoff_base=0.001)
+
+    assert generator.get_result(["problem a", "problem b"]) == []
+    assert generator.report.generation.attempts == [1, 1]
+    assert sorted(generator.report.generation.failed) == [0, 1]
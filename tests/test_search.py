@@ -0,0 +1,159 @@
+import json
+
+import pytest
+
+from snail.backends import FakeAPIError, FakeBackend
+from snail.cache import ResponseCache
+from snail.cot_dsgen import CoTDatasetGenerator
+
+
+class StructuringBackend(FakeBackend):
+    """Counts the responses built and passes the replies to structuring requests through `reply`."""
+
+    def __init__(self, reply=None, **kwargs):
+        super().__init__(seed=0, latency=0.0, **kwargs)
+        self.reply = reply
+        self.responses = 0
+
+    def respond(self, contents, config=None):
+        self.responses += 1
+        response = super().respond(contents, config)
+        if self.reply is not None and getattr(config, "response_mime_type", None) == "application/json":
+            response.text = self.reply(response.text)
+        return response
+
+
+def test_json_search_returns_the_listings_as_json(make_generator):
+    generator = make_generator(backend=StructuringBackend(listing_size=5), search_output="json")
+
+    result = generator.searching()
+
+    assert [item["title"] for item in json.loads(result)] == [f"Problem {number}" for number in range(1, 6)]
+    assert len(generator.extract_listings(result)) == 5
+    assert generator.backend.responses == 2
+
+
+def test_search_tool_and_json_are_not_sent_together(generator):
+    config = generator._search_config()
+    config.response_mime_type = "application/json"
+
+    with pytest.raises(FakeAPIError, match="400"):
+        generator.backend.generate(model="fake", contents="List problems", config=config)
+
+
+@pytest.mark.parametrize("reply", [
+    lambda text: text[:len(text) // 2],  # Cut at the output limit
+    lambda text: "not json",
+    lambda text: "[]",
+])
+def test_invalid_structuring_reply_keeps_the_search_text(make_generator, reply):
+    generator = make_generator(backend=StructuringBackend(reply, listing_size=5), search_output="json")
+
+    result = generator.searching()
+
+    assert result.startswith("Here are the problems")
+    assert generator.extract_listings(result)[0].startswith("**Problem 1**")
+    assert len(generator.extract_listings(result)) == 5
+
+
+def test_cached_search_is_structured_again(make_generator, tmp_path):
+    backend = StructuringBackend(listing_size=5)
+    generator = make_generator(backend=backend, search_output="json",
+                               cache=ResponseCache(str(tmp_path / "cache.sqlite")))
+
+    first = generator.searching()
+    second = generator.searching()
+
+    assert second == first
+    assert json.loads(second)
+    assert backend.responses == 2  # Both requests of the second call are answered from the cache
+
+
+def test_structuring_request_has_room_for_the_json_overhead(make_generator):
+    generator = make_generator(backend=StructuringBackend(listing_size=5), search_output="json")
+    text = generator.backend.respond("List problems", generator._search_config()).text
+
+    assert generator._structure_config(text).max_output_tokens > generator.max_output_tokens
+
+
+@pytest.mark.parametrize("search", [
+    lambda generator: generator.searching(),
+    lambda generator: generator.searching(["List problems"]),
+    lambda generator: list(generator.searching_stream()),
+])
+def test_search_stage_counts_responses(make_generator, search):
+    generator = make_generator(backend=StructuringBackend(listing_size=5))
+
+    search(generator)
+
+    assert generator.report.stages["search"].items == 1
+
+
+class ListingBackend(FakeBackend):
+    """Answers search requests with the numbered listings returned by `listings(contents)`."""
+
+    def __init__(self, listings):
+        super().__init__(seed=0, latency=0.0)
+        self.listings = listings
+        self.queries = []
+
+    def respond(self, contents, config=None):
+        response = super().respond(contents, config)
+        if getattr(config, "tools", None):
+            self.queries.append(contents)
+            response.text = "\n".join(f"{number}. {listing}" for number, listing in enumerate(self.listings(contents), 1))
+        return response
+
+
+def test_fan_out_merges_listings_without_duplicates(make_generator):
+    answers = {
+        "algebra": ["**Sum** What is 2 + 2?", "**Equation** Solve x + 1 = 3."],
+        "geometry": ["**Area** Area of a unit square?", "__Sum__ what is 2 + 2"],
+        "failing": [],
+    }
+    backend = ListingBackend(lambda query: answers[query])
+    generator = make_generator(backend=backend)
+
+    listings = generator.searching(["algebra", "geometry", "failing"], concurrency=2)
+
+    assert listings == ["**Sum** What is 2 + 2?", "**Equation** Solve x + 1 = 3.", "**Area** Area of a unit square?"]
+    assert sorted(backend.queries) == ["algebra", "failing", "geometry"]
+
+
+def test_product_queries_cover_every_combination():
+    queries = CoTDatasetGenerator.product_queries("{topic} for {level}", topic=["algebra", "geometry"], level=["school", "university"])
+    assert queries == ["algebra for school", "algebra for university", "geometry for school", "geometry for university"]
+
+
+
+def test_pages_continue_the_list_until_the_target(make_generator):
+    def page(query):
+        first = len(backend.queries) * 20
+        return [f"**Problem {number}** text {number}" for number in range(first - 19, first + 1)]
+
+    backend = ListingBackend(page)
+    generator = make_generator(backend=backend)
+
+    listings = generator.searching_pages(50, page_size=20, digest_size=2)
+
+    assert listings == [f"**Problem {number}** text {number}" for number in range(1, 51)]
+    assert len(backend.queries) == 3
+    assert "numbered from 41 to 50" in backend.queries[2]
+    assert "40 items are already listed" in backend.queries[2]
+    assert "The last ones are: Problem 39; Problem 40." in backend.queries[2]
+
+
+def test_pages_stop_when_no_new_listing_arrives(make_generator):
+    backend = ListingBackend(lambda query: ["**Sum** What is 2 + 2?", "**Area** Area of a unit square?"])
+    generator = make_generator(backend=backend)
+
+    assert len(generator.searching_pages(100, page_size=20)) == 2
+    assert len(backend.queries) == 2
+
+
+def test_pages_stop_after_max_pages(make_generator):
+    backend = ListingBackend(lambda query: [f"**Problem {len(backend.queries)}** text"])
+    generator = make_generator(backend=backend)
+
+    assert len(generator.searching_pages(100, page_size=20, max_pages=3)) == 3
+    assert len(backend.queries) == 3
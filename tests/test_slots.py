@@ -0,0 +1,80 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from snail.concurrency import AdaptiveConcurrency
+from snail.rate_limiter import RateLimiter
+from snail.report import RunReport
+from snail.slots import RequestSlot
+
+
+def make_slot(rate_limiter, prompt="x" * 400):
+    return RequestSlot(RunReport(), "generation", AdaptiveConcurrency.fixed(2), rate_limiter, prompt=prompt)
+
+
+async def aborted_stream(slot, chunks):
+    async with slot:
+        for text in chunks:
+            slot.received(text)
+        raise RuntimeError("aborted")
+
+
+def test_aborted_stream_is_charged_its_prompt_and_output():
+    rate_limiter = RateLimiter(tpm=6000, estimated_tokens=1000)
+    before = rate_limiter.token_bucket.tokens
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(aborted_stream(make_slot(rate_limiter), ["one two three ", "four five"]))
+
+    # 100 prompt tokens (400 characters) and 5 words, not the 1000 reserved nor nothing
+    assert before - rate_limiter.token_bucket.tokens == pytest.approx(105, abs=5)
+
+
+def test_failed_request_without_output_gets_its_reservation_back():
+    rate_limiter = RateLimiter(tpm=6000, estimated_tokens=1000)
+    before = rate_limiter.token_bucket.tokens
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(aborted_stream(make_slot(rate_limiter), []))
+
+    assert before - rate_limiter.token_bucket.tokens == pytest.approx(0, abs=5)
+
+
+def test_usage_replaces_the_estimate():
+    rate_limiter = RateLimiter(tpm=6000, estimated_tokens=1000)
+    before = rate_limiter.token_bucket.tokens
+
+    async def request(slot):
+        async with slot:
+            slot.received("partial output")
+            slot.usage = SimpleNamespace(total_token_count=300)
+            slot.succeeded = True
+
+    asyncio.run(request(make_slot(rate_limiter)))
+
+    assert before - rate_limiter.token_bucket.tokens == pytest.approx(300, abs=5)
+
+
+def test_cancelled_rate_limit_wait_releases_the_concurrency_slot():
+    controller = AdaptiveConcurrency.fixed(2)
+    rate_limiter = RateLimiter(rpm=1)
+    rate_limiter.acquire()  # The next request waits for a minute
+
+    async def cancel_while_waiting():
+        slot = RequestSlot(RunReport(), "generation", controller, rate_limiter)
+
+        async def request():
+            async with slot:
+                pass
+
+        task = asyncio.create_task(request())
+        await asyncio.sleep(0.05)
+        assert controller.in_flight == 1
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(cancel_while_waiting())
+
+    assert controller.in_flight == 0
@@ -0,0 +1,32 @@
+import logging
+
+import pytest
+
+
+def test_split_output_adds_the_sections(generator, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dataset = {"problem": "<thought>2 + 2</thought><answer>4</answer>"}
+
+    _, entries = generator.transform_alpaca_format(dataset, split_output=True)
+
+    assert (entries[0]["thought"], entries[0]["answer"]) == ("2 + 2", "4")
+
+
+def test_split_output_leaves_out_malformed_outputs(generator, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    dataset = {"good": "<thought>a</thought><answer>b</answer>", "bad": "<thought>a</thought><answer>b"}
+
+    _, entries = generator.transform_alpaca_format(dataset, split_output=True)
+
+    assert [entry["instruction"] for entry in entries] == ["good"]
+
+
+def test_split_output_without_valid_outputs_says_how_many_failed(generator, tmp_path, monkeypatch, caplog):
+    monkeypatch.chdir(tmp_path)
+    dataset = {"first": "<thought>a", "second": "no tags at all"}
+
+    with caplog.at_level(logging.ERROR), pytest.raises(ValueError, match="All 2 outputs failed to parse"):
+        generator.transform_alpaca_format(dataset, split_output=True)
+
+    assert "unclosed <thought>" in caplog.text
+    assert list(tmp_path.iterdir()) == []